@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from tornados_approx import StratifiedSample, estimate_total
+
+
+def _population(seed=0):
+    # Strata of very different sizes and scales; some events have several (fatality) rows
+    rng = np.random.default_rng(seed)
+    sizes = {('Texas', 2010): 400, ('Texas', 2011): 250, ('Kansas', 2010): 120, ('Kansas', 2011): 60, ('Iowa', 2011): 15}
+    frames = []
+    for (state, year), size in sizes.items():
+        frames.append(pd.DataFrame({'state': state, 'year': year,
+                                    'damages': rng.gamma(4, 10 if state == 'Texas' else 50, size)}))
+    events = pd.concat(frames, ignore_index=True)
+    events['event_id'] = np.arange(len(events))
+    repeats = rng.integers(1, 4, len(events))
+    return events.loc[events.index.repeat(repeats)].reset_index(drop=True)
+
+
+def test_total_is_unbiased_and_covered_by_the_interval():
+    df = _population()
+    true_events = df['event_id'].nunique()
+    true_total = df['damages'].sum()
+    estimates, covered = [], []
+    for seed in range(200):
+        sample = StratifiedSample(df, fraction=0.1, min_events=5, seed=seed)
+        events, _ = sample.total(sample.frame)
+        assert np.isclose(events, true_events)
+        total, half_width = estimate_total(sample.frame, sample.frame['damages'], sample)
+        estimates.append(total)
+        covered.append(abs(total - true_total) <= half_width)
+    # Standard error of the mean of 200 estimates is about 1.5% here
+    assert abs(np.mean(estimates) / true_total - 1) < 0.05
+    assert np.mean(covered) >= 0.88
+
+
+def test_filtered_totals_are_estimated_per_domain():
+    df = _population(1)
+    texas = df[df['state'] == 'Texas']
+    estimates = []
+    for seed in range(200):
+        sample = StratifiedSample(df, seed=seed)
+        frame = sample.frame[sample.frame['state'] == 'Texas']
+        estimates.append(estimate_total(frame, frame['damages'], sample)[0])
+    assert abs(np.mean(estimates) / texas['damages'].sum() - 1) < 0.05
+
+
+def test_single_event_strata_are_exact():
+    df = pd.DataFrame({'event_id': [1, 2, 3, 3], 'state': ['Iowa', 'Ohio', 'Utah', 'Utah'], 'year': 2011,
+                       'damages': [1.0, 2.0, 3.0, 4.0]})
+    sample = StratifiedSample(df, fraction=0.1, min_events=1)
+    total, half_width = estimate_total(sample.frame, sample.frame['damages'], sample)
+    assert total == 10.0
+    assert half_width == 0.0
+    assert sample.total(sample.frame) == (3.0, 0.0)
+    mean, half_width = sample.mean(sample.frame, sample.frame['damages'])
+    assert mean == 2.5 and half_width == 0.0
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tornados_core import (DAY_PARTS, WEEKDAYS, add_time_columns, code_labels, day_part, filter_tornados, model_frame,
+                           timezone_offset)
+
+
+INJURIES_ROW = {'event_narrative': 'damage to homes', 'log_tor_length': 1.0, 'log_tor_width': 4.0,
+                'log_tor_duration_minutes': 1.0, 'tor_f_scale': 'F2', 'state': 'Texas', 'month_name': 'May'}
+
+
+def test_model_frame_keeps_the_model_features_in_order():
+    X = model_frame('injuries_model', [{**INJURIES_ROW, 'extra': 1}, {**INJURIES_ROW, 'log_tor_width': 3}])
+    assert list(X.columns) == ['event_narrative', 'log_tor_length', 'log_tor_width', 'log_tor_duration_minutes',
+                               'tor_f_scale', 'state', 'month_name']
+    assert X['log_tor_width'].tolist() == [4.0, 3.0]
+
+
+@pytest.mark.parametrize('change, invalid', [({'event_narrative': None}, 'event_narrative'),
+                                             ({'state': 3}, 'state'),
+                                             ({'log_tor_width': 'wide'}, 'log_tor_width'),
+                                             ({'log_tor_width': None}, 'log_tor_width'),
+                                             ({'log_tor_width': float('nan')}, 'log_tor_width'),
+                                             ({'log_tor_width': np.inf}, 'log_tor_width'),
+                                             ({'log_tor_width': True}, 'log_tor_width')])
+def test_model_frame_rejects_wrong_types(change, invalid):
+    with pytest.raises(ValueError, match=f'row 1 .*{invalid}'):
+        model_frame('injuries_model', [INJURIES_ROW, {**INJURIES_ROW, **change}])
+
+
+def test_model_frame_reports_missing_features():
+    with pytest.raises(ValueError, match='Missing features .*TOR_WIDTH'):
+        model_frame('next_date_model', [{'TOR_F_SCALE': 1, 'TOR_LENGTH': 3.0}])
+    with pytest.raises(ValueError, match='row 1 .*TOR_WIDTH'):
+        model_frame('next_date_model', [{'TOR_F_SCALE': 1, 'TOR_LENGTH': 3.0, 'TOR_WIDTH': 1}, {'TOR_F_SCALE': 1, 'TOR_LENGTH': 3.0}])
+
+
+def _times(begins, zones, minutes=30):
+    begin = pd.to_datetime(pd.Series(begins))
+    return add_time_columns(pd.DataFrame({'begin_date_time': begin, 'end_date_time': begin + pd.Timedelta(minutes=minutes),
+                                          'cz_timezone': zones}))
+
+
+@pytest.mark.parametrize('zone, offset', [('CST-6', -6), ('EST-5', -5), ('MST-7', -7), ('AKST-9', -9), ('HST-10', -10),
+                                          ('GST10', 10), ('EST', -5), ('cst', -6), (' PST ', -8), ('AKST', -9)])
+def test_timezone_offsets(zone, offset):
+    assert timezone_offset(zone) == offset
+
+
+@pytest.mark.parametrize('zone', ['XYZ', 'CST-x', '', None, np.nan])
+def test_unknown_timezones_have_no_offset(zone):
+    assert np.isnan(timezone_offset(zone))
+
+
+def test_utc_rolls_over_midnight_and_the_year():
+    df = _times(['2019-12-31 20:30', '2019-12-31 17:45', '2020-06-30 23:10', '2020-03-01 02:00', '2020-03-01 02:00', None],
+                ['CST-6', 'EST', 'PST-8', 'GST10', 'XYZ', 'CST-6'], minutes=45)
+    utc = df['begin_date_time_utc']
+    assert utc[0] == pd.Timestamp('2020-01-01 02:30')
+    assert utc[1] == pd.Timestamp('2019-12-31 22:45')
+    assert utc[2] == pd.Timestamp('2020-07-01 07:10')
+    assert utc[3] == pd.Timestamp('2020-02-29 16:00')
+    assert pd.isna(utc[4]) and pd.isna(utc[5])
+    assert df['end_date_time_utc'][0] == pd.Timestamp('2020-01-01 03:15')
+    assert df['begin_hour'].tolist() == [20, 17, 23, 2, 2, -1]
+    assert df['begin_hour_utc'].tolist() == [2, 22, 7, 16, -1, -1]
+    # Weekday and day part stay local: 2019-12-31 is a Tuesday in Texas even though it is Wednesday in UTC
+    assert code_labels(df['begin_weekday'], WEEKDAYS).tolist()[:4] == ['Tuesday', 'Tuesday', 'Tuesday', 'Sunday']
+    assert df['begin_weekday'][5] == -1
+    assert code_labels(df['begin_day_part'], DAY_PARTS).tolist()[:4] == [day_part(h) for h in [20, 17, 23, 2]]
+    assert pd.isna(code_labels(df['begin_day_part'], DAY_PARTS)[5])
+    for column in ['begin_hour', 'begin_hour_utc', 'begin_weekday', 'begin_day_part']:
+        assert df[column].dtype == np.int8
+
+
+def test_time_codes_match_the_timestamps():
+    begins = pd.Timestamp('2015-01-01') + pd.to_timedelta(np.random.default_rng(0).integers(0, 10 * 365 * 24 * 60, 2000), unit='min')
+    df = _times(begins, 'CST-6')
+    assert (code_labels(df['begin_weekday'], WEEKDAYS) == df['begin_date_time'].dt.day_name()).all()
+    assert (code_labels(df['begin_day_part'], DAY_PARTS) == df['begin_date_time'].dt.hour.apply(day_part)).all()
+    assert (df['begin_hour_utc'] == (df['begin_date_time'] + pd.Timedelta(hours=6)).dt.hour).all()
+
+
+def test_time_filters():
+    df = _times(['2020-03-02 03:00', '2020-03-02 13:00', '2020-03-03 03:30', None], 'CST-6')
+    df['year'], df['month_name'], df['begin_day'], df['tor_f_scale'] = 2020, 'March', [2, 2, 3, 3], 'F1'
+    assert filter_tornados(df, [], [], [], ['Monday'], [], []).index.tolist() == [0, 1]
+    assert filter_tornados(df, [], [], [], [], [3], []).index.tolist() == [0, 2]
+    assert filter_tornados(df, [], [], [], ['Tuesday'], [3, 13], []).index.tolist() == [2]
+    # Unknown weekdays match nothing instead of raising
+    assert filter_tornados(df, [], [], [], ['Funday'], [], []).empty
+    assert filter_tornados(df, [], [], [], ['monday'], [], []).empty
+    assert filter_tornados(df, [], [], [], ['Monday', 'Funday'], [], []).index.tolist() == [0, 1]
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tornados_outbreaks import Outbreaks, _haversine_km
+
+
+def _events(n, seed):
+    # A few dense swarms, so that linked groups straddle the time windows and space cubes of the sweep,
+    # plus scattered events
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform([30, -100, 0], [45, -80, 24 * 60], (6, 3))
+    swarm = rng.integers(0, len(centers) + 1, n)
+    lat = np.where(swarm < len(centers), centers[np.minimum(swarm, 5), 0] + rng.normal(0, 2, n), rng.uniform(25, 49, n))
+    lon = np.where(swarm < len(centers), centers[np.minimum(swarm, 5), 1] + rng.normal(0, 2, n), rng.uniform(-110, -70, n))
+    hours = np.where(swarm < len(centers), centers[np.minimum(swarm, 5), 2] + rng.normal(0, 4, n), rng.uniform(0, 24 * 60, n))
+    begin = pd.Timestamp('2020-04-01') + pd.to_timedelta(hours, unit='h')
+    frame = pd.DataFrame({'event_id': np.arange(n), 'begin_date_time': begin, 'begin_date_time_utc': begin,
+                          'begin_lat': lat, 'begin_lon': lon, 'state': rng.choice(['Kansas', 'Texas'], n),
+                          'tor_f_scale': rng.choice(['F0', 'F1', 'F2'], n)})
+    for column in ['damage_property', 'damage_crops', 'deaths_direct', 'deaths_indirect', 'injuries_direct', 'injuries_indirect']:
+        frame[column] = 0.0
+    return frame
+
+
+def _brute_force(df, hours, km, min_events):
+    t = (df['begin_date_time_utc'] - pd.Timestamp('2000-01-01')).dt.total_seconds().to_numpy() / 3600
+    lat, lon = df['begin_lat'].to_numpy(), df['begin_lon'].to_numpy()
+    linked = (np.abs(t[:, None] - t[None, :]) <= hours) & (_haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :]) <= km)
+    groups, seen = [], np.zeros(len(df), dtype=bool)
+    for start in range(len(df)):
+        if seen[start]:
+            continue
+        group, stack = [], [start]
+        seen[start] = True
+        while stack:
+            i = stack.pop()
+            group.append(i)
+            for j in np.flatnonzero(linked[i] & ~seen):
+                seen[j] = True
+                stack.append(j)
+        if len(group) >= min_events:
+            groups.append(frozenset(df['event_id'].to_numpy()[group].tolist()))
+    return set(groups)
+
+
+@pytest.mark.parametrize('hours, km, min_events, seed', [(6.0, 300.0, 6, 0), (3.0, 150.0, 4, 1), (12.0, 500.0, 10, 2)])
+def test_outbreaks_match_brute_force(hours, km, min_events, seed):
+    df = _events(600, seed)
+    outbreaks = Outbreaks(df, hours, km, min_events)
+    labels = outbreaks.by_index.to_numpy()
+    found = {frozenset(df['event_id'].to_numpy()[labels == k].tolist()) for k in range(len(outbreaks.table))}
+    expected = _brute_force(df, hours, km, min_events)
+    assert expected
+    assert found == expected
+    assert (outbreaks.table['events'].to_numpy() == [np.sum(labels == k) for k in range(len(outbreaks.table))]).all()
+
+
+def test_outbreaks_are_numbered_chronologically():
+    outbreaks = Outbreaks(_events(600, 0))
+    assert outbreaks.table['start'].is_monotonic_increasing
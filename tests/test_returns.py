@@ -0,0 +1,61 @@
+import datetime as dt
+import numpy as np
+import pandas as pd
+
+from tornados_returns import ALL, SEASONS, ReturnPeriods
+
+
+def _frame(begins, states=None, fscales=None):
+    n = len(begins)
+    return pd.DataFrame({'event_id': np.arange(n), 'begin_date_time': pd.to_datetime(begins),
+                         'state': states or ['Texas'] * n, 'tor_f_scale': fscales or ['F1'] * n})
+
+
+# Ten tornados on six calendar days of 2020: an outbreak of four on April 3, two on May 1, and a late and an
+# early tornado twenty minutes apart on two different days
+BEGINS = ['2020-03-01 12:00', '2020-04-03 01:00', '2020-04-03 09:30', '2020-04-03 18:00', '2020-04-03 23:59',
+          '2020-05-01 10:00', '2020-05-01 11:00', '2020-05-10 23:50', '2020-05-11 00:10', '2020-06-20 15:00']
+
+
+def test_tornados_on_one_day_count_once():
+    periods = ReturnPeriods(_frame(BEGINS))
+    result = periods.query(today=dt.date(2021, 1, 1))
+    assert result['event_days'] == 6
+    assert result['per_year'] == 6.0
+    assert np.isclose(result['return_days'], 365.25 / 6)
+    # Gaps between the distinct days: 33, 28, 9, 1, 40
+    assert result['median_gap_days'] == 28
+    assert result['last'] == dt.date(2020, 6, 20)
+
+
+def test_seasonal_gaps_do_not_cross_the_off_season():
+    begins = BEGINS + ['2021-03-05 12:00', '2021-03-05 13:00', '2021-05-30 08:00']
+    periods = ReturnPeriods(_frame(begins))
+    spring = periods.query(months=SEASONS["Spring"], today=dt.date(2021, 7, 1))
+    # Spring days: 2020-03-01, 04-03, 05-01, 05-10, 05-11 and 2021-03-05, 05-30; gaps within each spring only
+    assert spring['event_days'] == 7
+    assert spring['per_year'] == 3.5
+    assert spring['median_gap_days'] == np.median([33, 28, 9, 1, 86])
+    assert spring['last'] == dt.date(2021, 5, 30)
+    summer = periods.query(months=SEASONS["Summer"], today=dt.date(2021, 7, 1))
+    assert summer['event_days'] == 1 and np.isnan(summer['median_gap_days'])
+
+
+def test_groups_count_their_own_days():
+    states = ['Texas', 'Kansas', 'Texas', 'Kansas', 'Texas', 'Texas', 'Texas', 'Kansas', 'Kansas', 'Texas']
+    fscales = ['F1', 'F2', 'F1', 'F1', 'F2', 'F1', 'F1', 'F1', 'F1', 'F1']
+    periods = ReturnPeriods(_frame(BEGINS, states, fscales))
+    today = dt.date(2021, 1, 1)
+    assert periods.query('Texas', ALL, today=today)['event_days'] == 4
+    assert periods.query('Kansas', ALL, today=today)['event_days'] == 3
+    assert periods.query('Texas', 'F1', today=today)['event_days'] == 4
+    assert periods.query(ALL, 'F2', today=today)['event_days'] == 1
+    assert periods.query('Iowa', ALL, today=today)['event_days'] == 0
+
+
+def test_waiting_time_follows_the_monthly_rates():
+    periods = ReturnPeriods(_frame(BEGINS))
+    result = periods.query(today=dt.date(2021, 5, 1))
+    # Three May days in one year: 3 / 31 a day, so 1 - exp(-30 * 3 / 31) within 30 days
+    assert np.isclose(result['chance_30_days'], 1 - np.exp(-30 * 3 / 31))
+    assert result['median_wait_date'] == dt.date(2021, 5, 1) + dt.timedelta(days=int(np.log(2) / (3 / 31)))
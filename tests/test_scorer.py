@@ -0,0 +1,94 @@
+import warnings
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("sklearn")
+from sklearn.compose import ColumnTransformer, TransformedTargetRegressor
+from sklearn.ensemble import GradientBoostingClassifier, HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression, Ridge
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from tornados_scorer import check_parity, export_model, load_scorer, _sigmoid
+
+
+STATES = ['Alabama', 'Kansas', 'Oklahoma', 'Texas']
+WORDS = ['tornado', 'touched', 'down', 'barn', 'destroyed', 'trees', 'uprooted', 'roof', 'damage', 'power', 'lines']
+
+
+def _frame(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'tor_width': np.round(rng.lognormal(4, 1, n), 1),
+                         'tor_length': np.round(rng.lognormal(1, 1, n), 2),
+                         'state': rng.choice(STATES, n),
+                         'tor_f_scale': rng.choice(['F0', 'F1', 'F2', 'F3'], n),
+                         'event_narrative': [' '.join(rng.choice(WORDS, 8)) for _ in range(n)]})
+
+
+def _preprocessor(text=True):
+    transformers = [('numeric', Pipeline([('impute', SimpleImputer()), ('scale', StandardScaler())]), ['tor_width', 'tor_length']),
+                    ('category', OneHotEncoder(handle_unknown='ignore'), ['state', 'tor_f_scale'])]
+    if text:
+        transformers.append(('text', TfidfVectorizer(), 'event_narrative'))
+    return ColumnTransformer(transformers)
+
+
+def _models():
+    X = _frame()
+    damage = X['tor_width'] * X['tor_length'] * (1 + X['tor_f_scale'].str[1].astype(int))
+    death = (X['tor_f_scale'] >= 'F2') & (X['tor_width'] > 60)
+    yield 'ridge', Pipeline([('pre', _preprocessor()), ('model', Ridge())]).fit(X, damage), X
+    yield 'logistic', Pipeline([('pre', _preprocessor()), ('model', LogisticRegression(C=1e4, max_iter=5000))]).fit(X, death), X
+    yield 'boosting', Pipeline([('pre', _preprocessor(False)), ('model', GradientBoostingClassifier(n_estimators=20))]).fit(X, death), X
+    yield 'forest', Pipeline([('pre', _preprocessor(False)), ('model', RandomForestRegressor(n_estimators=10, random_state=0))]).fit(X, damage), X
+    regressor = Pipeline([('pre', _preprocessor(False)), ('model', HistGradientBoostingRegressor(max_iter=20))])
+    yield 'transformed', TransformedTargetRegressor(regressor, func=np.log1p, inverse_func=np.expm1).fit(X, damage), X
+
+
+@pytest.mark.parametrize('name, model, X', list(_models()), ids=lambda value: value if isinstance(value, str) else '')
+def test_parity_with_sklearn(tmp_path, name, model, X):
+    scorer, _ = export_model(model, str(tmp_path / f'{name}.npz'))
+    scorer = load_scorer(str(tmp_path / f'{name}.npz'))
+    # Rows the model was fitted on, not only the generated ones export_model checks
+    rows = {column: X[column].to_numpy() for column in X}
+    methods = ['predict'] + (['predict_proba'] if scorer.classes_ is not None else [])
+    for method in methods:
+        assert check_parity(model, scorer, rows, method) == 0
+
+
+@pytest.mark.parametrize('name, model, X', list(_models()), ids=lambda value: value if isinstance(value, str) else '')
+def test_parity_with_long_unknown_categories(tmp_path, name, model, X):
+    # Unknown values that start with a known category must not be cut to it
+    scorer, _ = export_model(model, str(tmp_path / f'{name}.npz'))
+    rows = {column: X[column].to_numpy()[:50].copy() for column in X}
+    rows['state'] = np.where(rows['state'] == 'Kansas', 'Kansas City', rows['state'] + 'ville')
+    assert check_parity(model, scorer, rows) == 0
+
+
+def test_unknown_category_error_reports_the_full_value(tmp_path):
+    X = _frame()
+    model = Pipeline([('pre', ColumnTransformer([('category', OneHotEncoder(), ['state']),
+                                                 ('numeric', 'passthrough', ['tor_width'])])),
+                      ('model', Ridge())]).fit(X, X['tor_width'])
+    scorer, _ = export_model(model, str(tmp_path / 'error.npz'))
+    with pytest.raises(ValueError, match='Texasville'):
+        scorer.predict({'state': np.array(['Texasville']), 'tor_width': np.array([10.0])})
+
+
+def test_large_margins_do_not_overflow():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        p = _sigmoid(np.array([-1000.0, -40.0, 0.0, 40.0, 1000.0]))
+    assert np.allclose(p, [0.0, np.exp(-40.0) / (1 + np.exp(-40.0)), 0.5, 1 / (1 + np.exp(-40.0)), 1.0])
+
+
+def test_missing_text_is_rejected(tmp_path):
+    name, model, X = next(_models())
+    scorer, _ = export_model(model, str(tmp_path / f'{name}.npz'))
+    rows = {column: X[column].to_numpy()[:2] for column in X}
+    rows['event_narrative'] = np.array([None, 'barn destroyed'], dtype=object)
+    with pytest.raises(ValueError):
+        scorer.predict(rows)
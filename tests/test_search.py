@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+from tornados_search import SearchIndex, canonical_query, tokenize
+
+
+WORDS = ['mobile', 'home', 'roof', 'barn', 'trees', 'down', 'power', 'lines', 'damage', 'destroyed']
+
+
+def _corpus(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    texts = [' '.join(rng.choice(WORDS, rng.integers(0, 15))) for _ in range(2 * n)]
+    return pd.DataFrame({'event_narrative': texts[:n], 'episode_narrative': [t.upper() or None for t in texts[n:]]})
+
+
+def _documents(df):
+    # Both narratives of a row, with a break between them that phrases must not span
+    return [[tokenize(event), tokenize(episode)] for event, episode in zip(df['event_narrative'], df['episode_narrative'])]
+
+
+def _has_phrase(parts, phrase):
+    return any(words[i: i + len(phrase)] == phrase for words in parts for i in range(len(words) - len(phrase) + 1))
+
+
+def _bm25(documents, terms, k1=1.2, b=0.75):
+    lengths = np.array([sum(len(words) for words in parts) for parts in documents], dtype=np.float64)
+    scores = np.zeros(len(documents))
+    for term in terms:
+        tf = np.array([sum(words.count(term) for words in parts) for parts in documents], dtype=np.float64)
+        df = (tf > 0).sum()
+        idf = np.log(1 + (len(documents) - df + 0.5) / (df + 0.5))
+        scores += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths / lengths.mean()))
+    return scores
+
+
+def _scan(df, words, phrases=()):
+    documents = _documents(df)
+    terms = list(dict.fromkeys(words + [w for p in phrases for w in p]))
+    hits = [i for i, parts in enumerate(documents)
+            if all(any(term in w for w in parts) for term in terms) and all(_has_phrase(parts, p) for p in phrases)]
+    return hits, _bm25(documents, terms)
+
+
+def test_and_query_matches_brute_force():
+    df = _corpus()
+    index = SearchIndex(df)
+    for query in ['mobile', 'mobile home', 'Roof BARN trees', 'power lines damage']:
+        docs, scores = index.search(query)
+        hits, expected = _scan(df, tokenize(query))
+        assert sorted(docs.tolist()) == hits
+        assert np.allclose(scores, expected[docs], rtol=1e-5)
+
+
+def test_phrase_query_matches_brute_force():
+    df = _corpus(seed=1)
+    index = SearchIndex(df)
+    for query, words, phrases in [('"mobile home"', [], [['mobile', 'home']]),
+                                  ('"power lines" damage', ['damage'], [['power', 'lines']]),
+                                  ('"trees down barn"', [], [['trees', 'down', 'barn']])]:
+        docs, _ = index.search(query)
+        hits, _ = _scan(df, words, phrases)
+        assert hits
+        assert sorted(docs.tolist()) == hits
+
+
+def test_phrase_does_not_span_narratives():
+    df = pd.DataFrame({'event_narrative': ['trees mobile'], 'episode_narrative': ['home barn']})
+    assert len(SearchIndex(df).search('"mobile home"')[0]) == 0
+    assert len(SearchIndex(df).search('mobile home')[0]) == 1
+
+
+def test_results_are_ranked_by_bm25():
+    df = _corpus(seed=2)
+    docs, scores = SearchIndex(df).search('barn destroyed')
+    _, expected = _scan(df, ['barn', 'destroyed'])
+    assert (np.diff(scores) <= 0).all()
+    assert np.allclose(np.sort(expected[docs])[::-1], scores, rtol=1e-5)
+
+
+def test_unknown_or_empty_query_matches_nothing():
+    index = SearchIndex(_corpus())
+    assert len(index.search('tornadic')[0]) == 0
+    assert len(index.search('mobile tornadic')[0]) == 0
+    assert len(index.search('  ')[0]) == 0
+
+
+def test_canonical_query_gives_the_same_results():
+    index = SearchIndex(_corpus())
+    for a, b in [('Mobile Home', 'home  mobile'), ('"Power Lines" damage', 'DAMAGE "power, lines" damage'),
+                 ('"roof"', 'roof'), ('', '  ""  ')]:
+        assert canonical_query(a) == canonical_query(b)
+        for query in (a, b):
+            docs, scores = index.search(query)
+            canonical_docs, canonical_scores = index.search(canonical_query(query))
+            assert docs.tolist() == canonical_docs.tolist() and np.allclose(scores, canonical_scores)
+    assert canonical_query('"mobile home"') != canonical_query('mobile home')
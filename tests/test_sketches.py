@@ -0,0 +1,70 @@
+import io
+import numpy as np
+import pytest
+
+from tornados_approx import estimate_events, estimate_mean, estimate_mode, estimate_total
+from tornados_core import filter_tornados, read_tornados
+from tornados_loadtest import make_stub_data
+from tornados_sketches import (ALPHA, MODE_MEASURES, PERCENTILES, QUANTILE_MEASURES, SUM_MEASURES, SketchCube,
+                               exact_quantiles, metric_values, sketch_values)
+
+
+@pytest.fixture(scope='module')
+def tornados():
+    return read_tornados(io.StringIO(make_stub_data(3000).to_csv(index=False)))
+
+
+def _selections(df, n=40, seed=0):
+    rng = np.random.default_rng(seed)
+    years, months = sorted(df['year'].unique()), sorted(df['month_name'].dropna().unique())
+    fscales = sorted(df['tor_f_scale'].dropna().unique())
+    yield [], [], []
+    for _ in range(n):
+        yield ([int(y) for y in rng.choice(years, rng.integers(0, 4), replace=False)],
+               list(rng.choice(months, rng.integers(0, 3), replace=False)),
+               list(rng.choice(fscales, rng.integers(0, 3), replace=False)))
+
+
+def test_merged_cells_match_exact_counts_and_sums(tornados):
+    cube = SketchCube(tornados)
+    for years, months, fscales in _selections(tornados):
+        df = filter_tornados(tornados, years, months, [], [], [], fscales)
+        selection = cube.select(years, months, fscales)
+        values, categories = sketch_values(df)
+        assert selection.events()[0] == df['event_id'].nunique()
+        for name in SUM_MEASURES:
+            assert np.isclose(selection.total(name)[0], values[name].sum())
+            assert np.isclose(selection.mean(name)[0], values[name].mean(), equal_nan=True)
+            assert np.isclose(selection.max(name), values[name].max(), equal_nan=True)
+        for name in MODE_MEASURES:
+            assert list(selection.mode(name)) == list(categories[name].dropna().mode()[:1])
+
+
+def test_merged_quantiles_are_within_the_relative_error(tornados):
+    cube = SketchCube(tornados)
+    for years, months, fscales in _selections(tornados, seed=1):
+        df = filter_tornados(tornados, years, months, [], [], [], fscales)
+        values, _ = sketch_values(df)
+        for name in QUANTILE_MEASURES:
+            exact = exact_quantiles(values[name], PERCENTILES)
+            approximate = cube.select(years, months, fscales).quantiles(name, PERCENTILES)
+            assert np.allclose(approximate, exact, rtol=ALPHA * (1 + 1e-9), atol=1e-6, equal_nan=True)
+
+
+def test_metric_rows_match_the_exact_path(tornados):
+    # The metrics the app answers from the cube, against the estimate_* functions it falls back on
+    cube = SketchCube(tornados)
+    for years, months, fscales in _selections(tornados, n=15, seed=2):
+        df = filter_tornados(tornados, years, months, [], [], [], fscales)
+        selection = cube.select(years, months, fscales)
+        assert selection.events() == estimate_events(df)
+        assert np.isclose(selection.total('damage_property', 1e6)[0], estimate_total(df, metric_values(df, 'damage_property') / 1e6)[0])
+        assert np.isclose(selection.mean('tor_duration_minutes')[0], estimate_mean(df, metric_values(df, 'tor_duration_minutes'))[0],
+                          equal_nan=True)
+        assert np.isclose(selection.total('fatalities')[0], df['fatality_id'].count())
+        for name in ['weekday', 'day_part', 'fatality_location', 'fatality_sex']:
+            assert list(selection.mode(name)) == list(estimate_mode(df, metric_values(df, name).dropna())[:1])
+
+
+def test_quantiles_of_an_empty_selection_are_nan(tornados):
+    assert np.isnan(SketchCube(tornados).select([1900]).quantiles('tor_width')).all()
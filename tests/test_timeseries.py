@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from tornados_timeseries import LEVELS, MEASURES, RollupStore
+
+
+def _events(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({'event_id': np.arange(n),
+                          'begin_date_time': pd.Timestamp('2019-11-20') + pd.to_timedelta(rng.integers(0, 3 * 365 * 24, n), unit='h')})
+    for column in MEASURES[:7] + ['damage_property', 'damage_crops', 'injuries_direct', 'injuries_indirect',
+                                  'deaths_direct', 'deaths_indirect']:
+        frame[column] = np.where(rng.random(n) < 0.2, np.nan, rng.gamma(2, 5, n))
+    # Fatality rows repeat their event
+    return frame.loc[frame.index.repeat(rng.integers(1, 3, n))].reset_index(drop=True)
+
+
+def _assert_same(store, expected):
+    for level in LEVELS:
+        pdt.assert_frame_equal(store.levels[LEVELS[level]], expected.levels[LEVELS[level]], check_freq=False)
+
+
+@pytest.mark.parametrize('order', ['chronological', 'shuffled'])
+def test_appending_matches_a_full_rebuild(order):
+    df = _events()
+    expected = RollupStore(df)
+    events = df['event_id'].unique()
+    if order == 'chronological':
+        events = df.sort_values('begin_date_time')['event_id'].unique()
+    else:
+        np.random.default_rng(1).shuffle(events)
+    store = RollupStore()
+    for chunk in np.array_split(events, 7):
+        store.append(df[df['event_id'].isin(chunk)])
+    _assert_same(store, expected)
+
+
+def test_update_appends_new_events_and_rebuilds_after_removals():
+    df = _events()
+    cutoff = df['begin_date_time'].quantile(0.8)
+    store = RollupStore().update(df[df['begin_date_time'] < cutoff], 'v1')
+    store.update(df, 'v2')
+    _assert_same(store, RollupStore(df))
+    # Known events again under the same version are not added twice
+    store.update(df, 'v2')
+    _assert_same(store, RollupStore(df))
+    smaller = df[df['event_id'] % 3 != 0]
+    store.update(smaller, 'v3')
+    _assert_same(store, RollupStore(smaller))
+
+
+def test_rollups_sum_to_the_daily_totals():
+    store = RollupStore(_events())
+    daily = store.series("Daily", 'damages', 'sum').sum()
+    for level in LEVELS:
+        assert np.isclose(store.series(level, 'damages', 'sum').sum(), daily)
+        assert store.series(level).sum() == _events()['event_id'].nunique()
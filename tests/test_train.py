@@ -0,0 +1,35 @@
+import io
+import json
+import os
+import numpy as np
+
+from tornados_core import load_model, model_inputs, predict, read_tornados
+from tornados_loadtest import make_stub_data
+from tornados_train import SPECS, publish, train, training_frame
+
+
+def test_path_distance_is_the_served_path_length():
+    frame = training_frame(read_tornados(io.StringIO(make_stub_data(500).to_csv(index=False))))
+    assert np.array_equal(frame['path_distance_km'].to_numpy(), frame['tor_length'].to_numpy(), equal_nan=True)
+    served = model_inputs('any_death_model', width=100.0, length=3.5, duration=10.0)
+    assert served['path_distance_km'].tolist() == served['tor_length'].tolist() == [3.5]
+
+
+def test_train_and_publish_on_stub_data(tmp_path, monkeypatch):
+    data_dir, models_dir, cache_dir = (str(tmp_path / name) for name in ('data', 'models', 'cache'))
+    os.makedirs(data_dir)
+    os.makedirs(models_dir)
+    make_stub_data(1500).to_csv(os.path.join(data_dir, "tornados_usa_xxi.csv"), index=False)
+    names = ['injuries_model', 'any_death_model']
+    for name in names:
+        monkeypatch.setitem(SPECS[name], "grid", {key: values[:1] for key, values in SPECS[name]["grid"].items()})
+    version_dir, metadata = train(names, data_dir, models_dir, cache_dir, n_folds=2, jobs=2)
+    assert sorted(metadata["models"]) == sorted(names)
+    publish(version_dir, models_dir)
+    with open(os.path.join(models_dir, "metadata.json")) as f:
+        assert json.load(f)["version"] == metadata["version"]
+    for name in names:
+        model = load_model(name, models_dir)
+        p = predict(model, name, model_inputs(name, width=[50.0, 500.0], length=[1.0, 20.0], duration=[5.0, 40.0],
+                                              state='Texas', fscale='F2', month='May', narrative='roof damage'))
+        assert p.shape == (2,) and ((p >= 0) & (p <= 1)).all()
@@ -1,15 +1,27 @@
 import streamlit as st
-import io
+import os
+import json
 import base64
-import duckdb
 import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 import requests
-import joblib
 import math
 import datetime as dt
+from tornados_core import (DATA_DIR, MODELS, EXPORT_FORMATS, EXPORT_APP_MAX_ROWS, load_tornados, dataset_version,
+                           add_measures, filter_key, filter_by_key, encode_filter_key, decode_filter_key, code_labels,
+                           WEEKDAYS, sensitivity_surface, export_bytes)
+from tornados_core import load_model as load_core_model
+from tornados_search import SearchIndex, canonical_query
+from tornados_grid import GRID_RESOLUTIONS, grid_column, track_cells, aggregate_grid, grid_geojson
+from tornados_timeseries import LEVELS, RollupStore, rolling, year_over_year, seasonal_decomposition
+from tornados_returns import ALL, SEASONS, ReturnPeriods
+from tornados_outbreaks import OUTBREAK_HOURS, OUTBREAK_KM, OUTBREAK_MIN_EVENTS, Outbreaks
+from tornados_sketches import PERCENTILES, SketchCube, exact_quantiles, metric_values
+from tornados_approx import (SAMPLE_COLUMNS, StratifiedSample, estimate_total, estimate_events, estimate_mean,
+                             estimate_mode, estimate_total_by_state, with_ci)
 
 
 # <>>>--- FUNCTIONS ---<<<>
@@ -20,73 +32,166 @@ def get_base64_of_bin_file(bin_file):
     return base64.b64encode(data).decode()
 
 
-def convert_damage(x):
-    if not isinstance(x, str) or x.strip() == '':
-        return np.nan
-    try:
-        if 'K' in x:
-            return int(float(x.replace('K', '')) * 1_000)
-        elif 'M' in x:
-            return int(float(x.replace('M', '')) * 1_000_000)
-        elif 'B' in x:
-            return int(float(x.replace('M', '')) * 1_000_000_000)
-        else:
-            return np.nan
-    except ValueError:
-        return np.nan
-
-
 @st.cache_data
 def load_tornados_data():
-    file_url = "https://drive.google.com/uc?export=download&id=1agsHgi2sd2DUP7RmuR6G1TuHmG_OW7EN"
-    response = requests.get(file_url)
-    if response.status_code != 200:
-        st.error("Failed to download data file.")
+    try:
+        return load_tornados(DATA_DIR)
+    except RuntimeError as e:
+        st.error(str(e))
         st.stop()
-    csv_buffer = io.StringIO(response.content.decode('utf-8'))
-    pandas_df = pd.read_csv(csv_buffer)
-    query = f"""SELECT * FROM pandas_df"""
-    df = duckdb.query(query).to_df()
-    df.columns = df.columns.map(lambda x: x.lower())
-    columns_to_keep = ['begin_yearmonth', 'begin_day', 'begin_time', 'end_yearmonth', 'end_day', 'end_time', 
-                       'episode_id', 'event_id', 'state', 'year', 'month_name', 'begin_date_time', 
-                       'cz_timezone', 'end_date_time', 'injuries_direct', 'injuries_indirect', 'deaths_direct', 'deaths_indirect',
-                       'damage_property', 'damage_crops', 'magnitude', 'magnitude_type', 'tor_f_scale', 'tor_length',
-                       'tor_width', 'begin_range', 'begin_azimuth', 'begin_location', 'end_range', 'end_azimuth',
-                       'end_location', 'begin_lat', 'begin_lon', 'end_lat', 'end_lon', 'episode_narrative',
-                       'event_narrative', 'fat_yearmonth', 'fat_day', 'fat_time', 'fatality_id', 'fatality_type',
-                       'fatality_date', 'fatality_age', 'fatality_sex', 'fatality_location', 'event_yearmonth']
-    df = df[columns_to_keep]
-    date_columns = ['begin_date_time', 'end_date_time', 'fatality_date']
-    df[date_columns[:2]] = df[date_columns[:2]].apply(lambda column: pd.to_datetime(column, format='%d-%b-%y %H:%M:%S', errors='coerce'))
-    df[date_columns[2]] = df[date_columns[2]].apply(lambda column: pd.to_datetime(column, format='%m/%d/%Y %H:%M:%S', errors='coerce'))
-    damage_columns = ['damage_property', 'damage_crops']
-    df[damage_columns] =df[damage_columns].fillna('')
-    df[damage_columns] = df[damage_columns].map(convert_damage)
-    fat_columns = ['fat_yearmonth', 'fat_day', 'fat_time', 'fatality_id']
-    df[fat_columns] =df[fat_columns].astype('Int32')
-    df['tor_f_scale'] = df['tor_f_scale'].map(lambda x: x.replace('E', '').replace('FU', 'unknown'))
-    df['tor_length'] = round(df['tor_length'] * 1.60934, 2)
-    df['tor_width'] = round(df['tor_width'] * 0.9144, 2)
-    df['state'] = df['state'].map(lambda x: x.title())
-    df['tor_duration_minutes'] = (df['end_date_time'] - df['begin_date_time']).map(lambda x: round(x.total_seconds() /60, 2))
-    return df
+
+
+@st.cache_resource
+def load_search_index(_df, version):
+    return SearchIndex(_df)
+
+
+@st.cache_resource
+def load_stratified_sample(_df, version):
+    return StratifiedSample(_df)
+
+
+@st.cache_resource
+def load_sketches(_df, version):
+    return SketchCube(_df)
+
+
+def filter_view(key, approximate=False, search='', outbreaks=(), outbreak_params=()):
+    # Everything that selects rows, in canonical form: equal views share cached frames, metrics and maps
+    # across sessions
+    outbreaks = tuple(sorted(outbreaks))
+    return key, bool(approximate), canonical_query(search), outbreaks, tuple(outbreak_params) if outbreaks else ()
+
+
+def sketch_cells(view):
+    # Views that only filter on the sketch cells are answered by merging cells, finer ones scan the frame
+    key, approximate, search, outbreaks, _ = view
+    filters = dict(key)
+    if approximate or search or outbreaks or filters['day'] or filters['weekday'] or filters['hour']:
+        return None
+    return filters['year'], filters['month'], filters['fscale']
+
+
+@st.cache_resource
+def load_measured(_df, version, approximate):
+    # A shallow copy: the measure columns are added without copying the data columns
+    return add_measures((load_stratified_sample(_df, version).frame if approximate else _df).copy(deep=False))
+
+
+@st.cache_resource(max_entries=128)
+def load_filtered_rows(_df, version, view):
+    # Positions of the view's rows in the measured frame, shared by every session with the same view; a view
+    # costs 4 bytes per row instead of a filtered copy of the frame
+    key, approximate, search, outbreaks, outbreak_params = view
+    measured = load_measured(_df, version, approximate)
+    df = filter_by_key(measured, key)
+    if search:
+        search_positions, _ = load_search_index(_df, version).search(search)
+        search_index = _df.index[search_positions]
+        df = df.loc[search_index[search_index.isin(df.index)]]
+    if outbreaks:
+        df = load_outbreaks(_df, version, *outbreak_params).select(df, list(outbreaks))
+    rows = measured.index.get_indexer(df.index).astype(np.int32)
+    rows.flags.writeable = False
+    return rows
+
+
+def load_filtered(_df, version, view):
+    return load_measured(_df, version, view[1]).iloc[load_filtered_rows(_df, version, view)]
+
+
+@st.cache_data(max_entries=1024)
+def load_estimate(_df, version, view, estimate, column=None, scale=1):
+    cells = sketch_cells(view)
+    if cells is not None:
+        sketch = load_sketches(_df, version).select(*cells)
+        if estimate == 'events':
+            return sketch.events()
+        if estimate == 'mode':
+            return sketch.mode(column)
+        if estimate == 'quantiles':
+            return sketch.quantiles(column, PERCENTILES, scale)
+        return getattr(sketch, estimate)(column, scale)
+    df = load_filtered(_df, version, view)
+    sample = load_stratified_sample(_df, version) if view[1] else None
+    if estimate == 'events':
+        return estimate_events(df, sample)
+    if estimate == 'mode':
+        return estimate_mode(df, metric_values(df, column).dropna(), sample)
+    values = metric_values(df, column) / scale
+    if estimate == 'total':
+        return estimate_total(df, values, sample)
+    if estimate == 'mean':
+        return estimate_mean(df, values, sample)
+    if estimate == 'max':
+        return values.max()
+    return exact_quantiles(values, PERCENTILES, None if sample is None else df['_weight'])
+
+
+@st.cache_data(max_entries=256)
+def load_map_totals(_df, version, view, resolution, column=None, name='tor_num', along_tracks=False):
+    df = load_filtered(_df, version, view)
+    if resolution == 'States':
+        sample = load_stratified_sample(_df, version) if view[1] else None
+        return estimate_total_by_state(df, None if column is None else df[column], name, sample), name
+    return grid_totals(_df, version, df, resolution, column, along_tracks)
+
+
+def percentiles_text(values, unit, approximate=False):
+    if np.isnan(values).all():
+        return '-'
+    text = ' / '.join('-' if np.isnan(value) else f"{value:,.1f}" for value in values)
+    return f"{'≈ ' if approximate else ''}{text} {unit}"
+
+
+@st.cache_resource
+def load_track_cells(_df, version, size):
+    return track_cells(_df, size)
+
+
+@st.cache_resource(max_entries=8)
+def load_outbreaks(_df, version, hours, km, min_events):
+    return Outbreaks(_df, hours, km, min_events)
+
+
+@st.cache_resource
+def load_return_periods(_df, version):
+    return ReturnPeriods(_df)
+
+
+@st.cache_resource
+def load_rollups():
+    return RollupStore()
+
+
+@st.cache_data(max_entries=64)
+def load_dynamics_grouped(_df, version, group_by_col, agg_wrt_col):
+    groups = code_labels(_df['begin_weekday'], WEEKDAYS).rename('week_day') if group_by_col == 'week_day' else _df[group_by_col]
+    return _df[agg_wrt_col].groupby(groups).mean().reset_index()
+
+
+def clear_outbreak_filter():
+    st.session_state["outbreak_filter_tab3"] = []
 
 
 @st.cache_data
 def load_states_geojson():
+    local_path = os.path.join(DATA_DIR, "us-states.json")
+    if os.path.exists(local_path):
+        with open(local_path, "r") as f:
+            return json.load(f)
     url = "https://raw.githubusercontent.com/PublicaMundi/MappingAPI/master/data/geojson/us-states.json"
     response = requests.get(url)
     return response.json() if response.status_code == 200 else None
 
 
-def draw_map(df, column):
-    states_geojson = load_states_geojson()
+def draw_map(df, column, geojson=None, locations="state", featureidkey="properties.name"):
+    states_geojson = load_states_geojson() if geojson is None else geojson
     fig = px.choropleth(
         df,
         geojson=states_geojson,
-        locations="state",
-        featureidkey="properties.name",
+        locations=locations,
+        featureidkey=featureidkey,
         color=column,
         color_continuous_scale='RdYlGn_r',
         projection="mercator",)
@@ -107,26 +212,106 @@ def draw_map(df, column):
     return fig
 
 
+def grid_totals(df, version, df_filtered, resolution, column=None, along_tracks=False):
+    size = GRID_RESOLUTIONS[resolution]
+    # Fatality rows repeat their event: cells count distinct events, like the state map, and sum the values of
+    # all rows of an event on its first row
+    events = df_filtered[df_filtered['event_id'].notna()].drop_duplicates('event_id')
+    weights = None
+    if column is not None:
+        weights = df_filtered[column].groupby(df_filtered['event_id']).sum().reindex(events['event_id']).to_numpy(dtype=float)
+    df_filtered = events
+    if '_weight' in df_filtered:
+        # Rows of the stratified sample stand for _weight rows of the full data
+        weights = df_filtered['_weight'].to_numpy() * (1 if weights is None else weights)
+        column = column or 'tor_num_estimate'
+    if along_tracks:
+        track_rows, cells = load_track_cells(df, version, size)
+        filtered_rows = np.full(len(df), -1)
+        filtered_rows[df.index.get_indexer(df_filtered.index)] = np.arange(len(df_filtered))
+        filtered_rows = filtered_rows[track_rows]
+        cells = cells[filtered_rows >= 0]
+        weights = None if weights is None else weights[filtered_rows[filtered_rows >= 0]]
+    else:
+        cells = df_filtered[grid_column(size)].to_numpy()
+    grid = aggregate_grid(cells, size, None if column is None else {column: weights})
+    return grid, 'tor_num' if column is None else column
+
+
+def draw_totals_map(totals, column, resolution):
+    if resolution == 'States':
+        return draw_map(totals, column)
+    return draw_map(totals, column, geojson=grid_geojson(totals['cell'], GRID_RESOLUTIONS[resolution]),
+                    locations='cell', featureidkey='id')
+
+
+def export_popover(df, key, file_name):
+    with st.popover("Export filtered data", use_container_width=True):
+        columns = st.multiselect("Columns", list(df.columns), key=f"export_columns_{key}", placeholder="All columns")
+        fmt = st.radio("Format", list(EXPORT_FORMATS), horizontal=True, key=f"export_format_{key}")
+        if '_weight' in df:
+            st.caption("Approximate mode exports the sampled rows, each standing for _weight rows of the full data")
+        if len(df) > EXPORT_APP_MAX_ROWS:
+            st.info(f"{len(df):,} rows are more than the {EXPORT_APP_MAX_ROWS:,} the app exports; narrow the filters "
+                    "or use GET /export of the API, which streams any selection")
+            return
+        # The file is only serialized when the button is clicked; Streamlit keeps the finished file in memory
+        # to serve it, hence the row cap above
+        st.download_button("Download",
+                           data=lambda: export_bytes(df, columns, fmt),
+                           file_name=f"{file_name}.{fmt}",
+                           mime=EXPORT_FORMATS[fmt],
+                           on_click="ignore",
+                           use_container_width=True,
+                           key=f"export_download_{key}")
+
+
 @st.cache_resource
-def load_model_from_gdrive(file_id: str):
-    file_url = f"https://drive.google.com/uc?export=download&id={file_id}"
-    response = requests.get(file_url)
-    if response.status_code != 200:
-        st.error(f"Failed to download model (status code: {response.status_code})")
+def load_model(name: str):
+    try:
+        return load_core_model(name)
+    except RuntimeError as e:
+        st.error(str(e))
         st.stop()
-    model = joblib.load(io.BytesIO(response.content))
-    return model
-
-def day_part(x):
-    if x in range(6, 13):
-        return 'Morning'
-    elif x in range(12, 19):
-        return 'Day'
-    elif x in range(18, 25):
-        return 'Evening'
+
+
+@st.cache_data
+def load_sensitivity_ranges(_df, version):
+    # Width and length axes run up to the 99th percentile of the data
+    return {"width": tuple(np.linspace(0, _df['tor_width'].quantile(0.99), 30).round(1).tolist()),
+            "length": tuple(np.linspace(0, _df['tor_length'].quantile(0.99), 30).round(2).tolist())}
+
+
+@st.cache_data(max_entries=256)
+def load_sensitivity(name, axes, inputs):
+    return sensitivity_surface(load_model(name), name, dict(axes), **dict(inputs))
+
+
+def sensitivity_options(name):
+    features = MODELS[name]["features"]
+    used = {"state": "state" in features,
+            "fscale": "tor_f_scale" in features or "TOR_F_SCALE" in features,
+            "month": "month_name" in features}
+    return [label for label, axes in sensitivity_axis_map.items() if len(axes) == 2 or used[axes[0]]]
+
+
+def draw_sensitivity(name, axes_label, inputs, value_label):
+    axes = tuple((axis, sensitivity_values[axis]) for axis in sensitivity_axis_map[axes_label])
+    surface = load_sensitivity(name, axes, tuple(sorted(inputs.items())))
+    if len(axes) == 2:
+        (y_axis, y_values), (x_axis, x_values) = axes
+        fig = go.Figure(go.Heatmap(z=surface, x=x_values, y=y_values, colorscale='RdYlGn_r', colorbar=dict(title='')))
+        fig.update_layout(xaxis_title=sensitivity_axis_labels[x_axis], yaxis_title=sensitivity_axis_labels[y_axis])
     else:
-        return 'Night'
-    
+        (axis, values), = axes
+        fig = px.bar(x=list(values), y=surface)
+        fig.update_traces(marker_color='#8D8D8D')
+        fig.update_layout(xaxis_title=sensitivity_axis_labels[axis], yaxis_title=value_label)
+    fig.update_layout(template="plotly_white",
+                      height=400,
+                      title={'text': f"{value_label} by {axes_label.lower()}", 'x': 0.04, 'xanchor': 'left'})
+    return fig
+
 
 def apply_custom_sort(df, column, sort_list):
     df[column] = pd.Categorical(df[column], categories=sort_list, ordered=True)
@@ -134,34 +319,57 @@ def apply_custom_sort(df, column, sort_list):
 
 
 def init_session_state():
+    if "query_params_loaded" not in st.session_state:
+        # A shared link seeds the filters of a new session, values outside the filter options are dropped
+        st.session_state["query_params_loaded"] = True
+        for tab, prefix in filter_link_prefixes.items():
+            for name, values in decode_filter_key(st.query_params, prefix):
+                if values:
+                    st.session_state[f"{name}_filter_{tab}"] = [value for value in values if value in filter_options[name]]
+        if "summary_search" in st.query_params:
+            st.session_state["search_filter_tab3"] = st.query_params["summary_search"]
     defaults = {"year_filter_tab3": [],
                 "month_filter_tab3": [],
                 "day_filter_tab3": [],
                 "weekday_filter_tab3": [],
                 "hour_filter_tab3": [],
                 "fscale_filter_tab3": [],
+                "search_filter_tab3": "",
+                "outbreak_filter_tab3": [],
+                "outbreak_hours_tab3": OUTBREAK_HOURS,
+                "outbreak_km_tab3": OUTBREAK_KM,
+                "outbreak_min_events_tab3": OUTBREAK_MIN_EVENTS,
+                "approximate_tab3": False,
                 "year_filter_tab5": [],
                 "month_filter_tab5": [],
                 "day_filter_tab5": [],
                 "weekday_filter_tab5": [],
                 "hour_filter_tab5": [],
                 'fscale_filter_tab5': [],
+                "approximate_tab5": False,
                 "year_filter_tab6": [],
                 "month_filter_tab6": [],
                 "day_filter_tab6": [],
                 "weekday_filter_tab6": [],
                 "hour_filter_tab6": [],
                 'fscale_filter_tab6': [],
+                "approximate_tab6": False,
                 "year_filter_tab7": [],
                 "month_filter_tab7": [],
                 "day_filter_tab7": [],
                 "weekday_filter_tab7": [],
                 "hour_filter_tab7": [],
                 'fscale_filter_tab7': [],
+                "approximate_tab7": False,
+                "sensitivity_tab5": False,
+                "sensitivity_tab6": False,
+                "sensitivity_tab7": False,
                 "input_1_tab4": "",
                 "input_2_tab4": "",
                 "input_3_tab4": "F0",
                 "clear_inputs_tab4": False,
+                "return_state_tab4": ALL,
+                "return_season_tab4": "All year",
                 "input_1_tab5": "",
                 "input_2_tab5": "",
                 "input_3_tab5": "",
@@ -193,6 +401,16 @@ def init_session_state():
 
 # <>>>--- SESSION SETTINGS ---<<<>
 
+year_list = list(range(2000, 2025))
+month_list = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December']
+day_list = list(range(1, 32))
+weekday_list = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+hour_list = list(range(0, 25))
+fscale_list = ['F0', 'F1', 'F2', 'F3', 'F4', 'F5', 'unknown']
+filter_options = {"year": year_list, "month": month_list, "day": day_list,
+                  "weekday": weekday_list, "hour": hour_list, "fscale": fscale_list}
+filter_link_prefixes = {"tab3": "summary_", "tab5": "damages_", "tab6": "injuries_", "tab7": "deaths_"}
+
 init_session_state()
 
 year_selected_tab3 = st.session_state.get("year_filter_tab3", [])
@@ -201,6 +419,12 @@ day_selected_tab3 = st.session_state.get("day_filter_tab3", [])
 weekday_selected_tab3 = st.session_state.get("weekday_filter_tab3", [])
 hour_selected_tab3 = st.session_state.get("hour_filter_tab3", [])
 fscale_selected_tab3 = st.session_state.get('fscale_filter_tab3', [])
+approximate_selected_tab3 = st.session_state.get("approximate_tab3", False)
+search_selected_tab3 = st.session_state.get("search_filter_tab3", "")
+outbreak_selected_tab3 = st.session_state.get("outbreak_filter_tab3", [])
+outbreak_hours_tab3 = st.session_state.get("outbreak_hours_tab3", OUTBREAK_HOURS)
+outbreak_km_tab3 = st.session_state.get("outbreak_km_tab3", OUTBREAK_KM)
+outbreak_min_events_tab3 = st.session_state.get("outbreak_min_events_tab3", OUTBREAK_MIN_EVENTS)
 
 year_selected_tab5 = st.session_state.get("year_filter_tab5", [])
 month_selected_tab5 = st.session_state.get("month_filter_tab5", [])
@@ -208,6 +432,7 @@ day_selected_tab5 = st.session_state.get("day_filter_tab5", [])
 weekday_selected_tab5 = st.session_state.get("weekday_filter_tab5", [])
 hour_selected_tab5 = st.session_state.get("hour_filter_tab5", [])
 fscale_selected_tab5 = st.session_state.get('fscale_filter_tab5', [])
+approximate_selected_tab5 = st.session_state.get("approximate_tab5", False)
 damage_type_selected = st.session_state.get("damage_type", "damages")
 damage_column = damage_type_selected
 
@@ -217,6 +442,7 @@ day_selected_tab6 = st.session_state.get("day_filter_tab6", [])
 weekday_selected_tab6 = st.session_state.get("weekday_filter_tab6", [])
 hour_selected_tab6 = st.session_state.get("hour_filter_tab6", [])
 fscale_selected_tab6 = st.session_state.get('fscale_filter_tab6', [])
+approximate_selected_tab6 = st.session_state.get("approximate_tab6", False)
 injury_type_selected = st.session_state.get("injury_type", "injuries")
 injury_column = injury_type_selected
 
@@ -226,9 +452,19 @@ day_selected_tab7 = st.session_state.get("day_filter_tab7", [])
 weekday_selected_tab7 = st.session_state.get("weekday_filter_tab7", [])
 hour_selected_tab7 = st.session_state.get("hour_filter_tab7", [])
 fscale_selected_tab7 = st.session_state.get('fscale_filter_tab7', [])
+approximate_selected_tab7 = st.session_state.get("approximate_tab7", False)
 death_type_selected = st.session_state.get("death_type", "deaths")
 death_column = death_type_selected
 
+filter_key_tab3 = filter_key(year_selected_tab3, month_selected_tab3, day_selected_tab3,
+                             weekday_selected_tab3, hour_selected_tab3, fscale_selected_tab3)
+filter_key_tab5 = filter_key(year_selected_tab5, month_selected_tab5, day_selected_tab5,
+                             weekday_selected_tab5, hour_selected_tab5, fscale_selected_tab5)
+filter_key_tab6 = filter_key(year_selected_tab6, month_selected_tab6, day_selected_tab6,
+                             weekday_selected_tab6, hour_selected_tab6, fscale_selected_tab6)
+filter_key_tab7 = filter_key(year_selected_tab7, month_selected_tab7, day_selected_tab7,
+                             weekday_selected_tab7, hour_selected_tab7, fscale_selected_tab7)
+
 if "active_tab" not in st.session_state:
     st.session_state["active_tab"] = "Home"
 
@@ -248,9 +484,21 @@ layout_css = f"""
     background-repeat: no-repeat;}}</style>"""
 st.markdown(layout_css, unsafe_allow_html=True)
 
+# The URL carries the canonical filters of every tab, so a view can be shared as a link
+query_params = {}
+for tab, key in [("tab3", filter_key_tab3), ("tab5", filter_key_tab5), ("tab6", filter_key_tab6), ("tab7", filter_key_tab7)]:
+    query_params.update(encode_filter_key(key, filter_link_prefixes[tab]))
+if search_selected_tab3.strip():
+    query_params["summary_search"] = search_selected_tab3.strip()
+if query_params != st.query_params.to_dict():
+    st.query_params.from_dict(query_params)
+
 # <>>>--- DATA TO USE ---<<<>
 
 tornados = load_tornados_data()
+tornados_version = dataset_version(tornados)
+# The search index is built with the data, so the first search of a dataset version is answered from it
+load_search_index(tornados, tornados_version)
 
 # <>>>--- TABS ---<<<>
 
@@ -285,68 +533,78 @@ with tab2:
 
 # <>>>--- TAB 3 ---<<<> SUMMARY
 
-year_list = list(range(2000, 2025))
-month_list = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December']
-day_list = list(range(1, 32))
-weekday_list = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-hour_list = list(range(0, 25))
-fscale_list = ['F0', 'F1', 'F2', 'F3', 'F4', 'F5', 'unknown']
 state_list = sorted(tornados['state'].unique())
+map_resolution_list = ['States'] + list(GRID_RESOLUTIONS)
+approximate_help = ("Answer metrics and maps from a 10% sample stratified by state and year, "
+                    "with 95% confidence intervals; switch off for exact values")
+sensitivity_axis_map = {"Width × length": ("width", "length"), "State": ("state",), "F-scale": ("fscale",), "Month": ("month",)}
+sensitivity_axis_labels = {"width": "Width in meters", "length": "Trajectory length in kilometers", "state": "State",
+                           "fscale": "F-scale value", "month": "Month"}
+sensitivity_values = {**load_sensitivity_ranges(tornados, tornados_version),
+                      "state": tuple(state_list),
+                      "fscale": tuple(fscale_list),
+                      "month": tuple(month_list)}
+sensitivity_help = "Predict over a grid of inputs, keeping the other fields as entered above"
 
 with tab3:
 
     if st.session_state["active_tab"] != "Summary":
         st.session_state["active_tab"] = "Summary"
 
-    tornados_filtered = tornados.copy()
-
-    tornados_filtered = tornados_filtered[tornados_filtered['year'].isin(year_selected_tab3)] if year_selected_tab3 else tornados_filtered
-    tornados_filtered = tornados_filtered[tornados_filtered['month_name'].isin(month_selected_tab3)] if month_selected_tab3 else tornados_filtered
-    tornados_filtered = tornados_filtered[tornados_filtered['begin_day'].isin(day_selected_tab3)] if day_selected_tab3 else tornados_filtered
-    tornados_filtered = tornados_filtered[tornados_filtered['begin_date_time'].dt.day_name().isin(weekday_selected_tab3)] if weekday_selected_tab3 else tornados_filtered
-    tornados_filtered = tornados_filtered[tornados_filtered["begin_time"].astype(str).str.zfill(4).str[:2].isin(str(h) for h in hour_selected_tab3)] if hour_selected_tab3 else tornados_filtered
-    tornados_filtered = tornados_filtered[tornados_filtered['tor_f_scale'].isin(fscale_selected_tab3)] if fscale_selected_tab3 else tornados_filtered
+    outbreaks_tab3 = load_outbreaks(tornados, tornados_version, outbreak_hours_tab3, outbreak_km_tab3, outbreak_min_events_tab3)
+    view_tab3 = filter_view(filter_key_tab3, approximate_selected_tab3, search_selected_tab3, outbreak_selected_tab3,
+                            (outbreak_hours_tab3, outbreak_km_tab3, outbreak_min_events_tab3))
+    tornados_filtered = load_filtered(tornados, tornados_version, view_tab3)
 
     cols = st.columns([0.14, 0.14, 0.14, 0.14, 0.14, 0.3])
 
     with cols[0]:
-        total_amount = tornados_filtered['event_id'].nunique()
+        total_amount, total_amount_ci = load_estimate(tornados, tornados_version, view_tab3, 'events')
         st.metric("Total amount", 
-                  total_amount, 
+                  with_ci(total_amount, total_amount_ci), 
                   help="Total amount of tornados")
     
     with cols[1]:
-        weekday_mode = tornados_filtered['begin_date_time'].dt.day_name().mode()
+        weekday_mode = load_estimate(tornados, tornados_version, view_tab3, 'mode', 'weekday')
         most_weekday = weekday_mode[0][:3] if not weekday_mode.empty else '-'
         st.metric("Usually starts on", 
                   most_weekday, 
                   help="Day of the week when tornado appears")
     
     with cols[2]:
-        daypart_mode = tornados_filtered['begin_date_time'].dropna().dt.hour.apply(day_part).mode()
+        daypart_mode = load_estimate(tornados, tornados_version, view_tab3, 'mode', 'day_part')
         most_daypart = daypart_mode[0] if not daypart_mode.empty else "-"
         st.metric("Usually starts in", 
                   most_daypart, 
                   help="Time of the day when tornado appears, 6-12: morning, 12-18: day, 18-24: evening, 24-6: night")
     
     with cols[3]:
-        avg_duration = tornados_filtered['tor_duration_minutes'].mean(skipna=True)
-        average_duration = str(round(avg_duration)) + ' min' if pd.notna(avg_duration) else "-"
+        avg_duration, avg_duration_ci = load_estimate(tornados, tornados_version, view_tab3, 'mean', 'tor_duration_minutes')
+        average_duration = str(with_ci(avg_duration, avg_duration_ci)) + ' min' if pd.notna(avg_duration) else "-"
         st.metric("Average duration", 
                   average_duration, 
                   help="Average duration of a tornado in minutes")
     
     with cols[4]:
+        total_fatalities, total_fatalities_ci = load_estimate(tornados, tornados_version, view_tab3, 'total', 'fatalities')
         st.metric("Total fatalities", 
-                  tornados_filtered['fatality_id'].count() if total_amount > 0 else '-',
+                  with_ci(total_fatalities, total_fatalities_ci) if total_amount > 0 else '-',
                   help="Total amount of direct or indirect injuries or deaths")
     
     with cols[5]:
-        fatality_mode = tornados_filtered['fatality_location'].dropna().mode()
+        fatality_mode = load_estimate(tornados, tornados_version, view_tab3, 'mode', 'fatality_location')
         most_fatality = fatality_mode[0] if not fatality_mode.empty else "-"
         st.metric("Usual fatality",
                   most_fatality, 
                   help="Place of the most often fatality - injury or death")
+
+    percentiles_tab3 = {column: load_estimate(tornados, tornados_version, view_tab3, 'quantiles', column)
+                        for column in ['tor_duration_minutes', 'tor_width', 'tor_length']}
+    approximate_tab3 = approximate_selected_tab3 or sketch_cells(view_tab3) is not None
+    st.caption(f"Median / 90th / 99th percentile — "
+               f"duration: {percentiles_text(percentiles_tab3['tor_duration_minutes'], 'min', approximate_tab3)}, "
+               f"width: {percentiles_text(percentiles_tab3['tor_width'], 'm', approximate_tab3)}, "
+               f"length: {percentiles_text(percentiles_tab3['tor_length'], 'km', approximate_tab3)}")
     
     st.divider()
            
@@ -359,7 +617,33 @@ with tab3:
             st.session_state["active_tab"] = "Summary"
             for key in filter_keys:
                 st.session_state[key] = []
+            st.session_state["search_filter_tab3"] = ""
+            st.session_state["outbreak_filter_tab3"] = []
             st.rerun()
+
+        st.toggle('Approximate', key='approximate_tab3', help=approximate_help)
+        export_popover(tornados_filtered, 'tab3', 'tornados_summary')
+
+        search_selected_tab3 = st.text_input('Search narratives', key='search_filter_tab3',
+                                             placeholder='mobile home, "school" debris',
+                                             help='Events whose narratives mention all words, quoted text is matched as a phrase')
+
+        col13, col14 = st.columns([3, 1])
+
+        with col13:
+            outbreak_selected_tab3 = st.multiselect('Outbreaks', outbreaks_tab3.table.sort_values('events', ascending=False).index.tolist(),
+                                                    key='outbreak_filter_tab3', format_func=outbreaks_tab3.label,
+                                                    placeholder='All events',
+                                                    help='Groups of tornados that began close to each other in time and space')
+
+        with col14:
+            with st.popover('Thresholds', use_container_width=True):
+                st.number_input('Hours apart', min_value=0.5, max_value=72.0, step=0.5,
+                                key='outbreak_hours_tab3', on_change=clear_outbreak_filter)
+                st.number_input('Kilometers apart', min_value=10.0, max_value=2000.0, step=10.0,
+                                key='outbreak_km_tab3', on_change=clear_outbreak_filter)
+                st.number_input('Minimum tornados', min_value=2, max_value=100, step=1,
+                                key='outbreak_min_events_tab3', on_change=clear_outbreak_filter)
         
         col11, col12 = st.columns(2)
 
@@ -374,13 +658,30 @@ with tab3:
             fscale_selected_tab3 = st.multiselect('F-scale', fscale_list, key='fscale_filter_tab3')
 
     with col2:
-        tornados_locations = tornados_filtered.groupby('state').agg(tor_num=('event_id', 'nunique')).reset_index()
-        fig_tab3 = draw_map(tornados_locations, 'tor_num')
+        col31, col32 = st.columns([3, 1])
+
+        with col31:
+            resolution_tab3 = st.selectbox('Map resolution', map_resolution_list, key='map_resolution_tab3')
+
+        with col32:
+            tracks_tab3 = st.toggle('Along tracks', key='map_tracks_tab3', disabled=resolution_tab3 == 'States',
+                                    help='Count every tornado in each grid cell its path crosses')
+
+        totals_tab3, column_tab3 = load_map_totals(tornados, tornados_version, view_tab3, resolution_tab3, None, 'tor_num',
+                                                   tracks_tab3 and resolution_tab3 != 'States')
+        fig_tab3 = draw_totals_map(totals_tab3, column_tab3, resolution_tab3)
         st.plotly_chart(fig_tab3, key='map_tab3')
 
     st.divider()
 
-    st.dataframe(tornados_filtered)
+    if approximate_selected_tab3:
+        st.caption("Rows of the stratified sample matching the filters")
+    st.dataframe(tornados_filtered.drop(columns=SAMPLE_COLUMNS, errors='ignore'))
+
+    outbreaks_filtered_tab3 = np.unique(outbreaks_tab3.by_index.loc[tornados_filtered.index].to_numpy())
+    outbreaks_filtered_tab3 = outbreaks_filtered_tab3[outbreaks_filtered_tab3 >= 0]
+    st.caption(f"{len(outbreaks_filtered_tab3)} outbreaks with tornados matching the filters, totals over whole outbreaks")
+    st.dataframe(outbreaks_tab3.table.loc[outbreaks_filtered_tab3].sort_values('events', ascending=False))
 
 # <>>>--- TAB 4 ---<<<> DYNAMICS
 
@@ -389,9 +690,6 @@ with tab4:
     if st.session_state["active_tab"] != "Dynamics":
         st.session_state["active_tab"] = "Dynamics"
 
-    tornados_dynamics = tornados.copy()
-    tornados_dynamics['week_day'] = tornados_dynamics['begin_date_time'].dt.day_name()
-
     col1, col2 = st.columns(2)
 
     with col1:
@@ -407,11 +705,15 @@ with tab4:
     with col2:
         measurement_label_map = {'Duration in minutes': 'tor_duration_minutes',
                                 'Path length in kilometers': 'tor_length',
-                                'Width in meters': 'tor_width'}
+                                'Width in meters': 'tor_width',
+                                'Straight path distance in kilometers': 'path_distance_km',
+                                'Path bearing in degrees': 'path_bearing',
+                                'Path midpoint latitude': 'path_mid_lat',
+                                'Path midpoint longitude': 'path_mid_lon'}
         measurement_label = st.selectbox("Measurement", list(measurement_label_map.keys()), index=0)
         agg_wrt_col = measurement_label_map[measurement_label]
 
-    tornados_dynamics_grouped = tornados_dynamics.groupby(group_by_col)[agg_wrt_col].mean().reset_index()
+    tornados_dynamics_grouped = load_dynamics_grouped(tornados, tornados_version, group_by_col, agg_wrt_col)
     sorting_order = {"year": year_list, 
                      "month_name": month_list, 
                      "begin_day": day_list,
@@ -436,6 +738,69 @@ with tab4:
 
     st.divider()
 
+    rollups = load_rollups().update(tornados, tornados_version)
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        granularity_tab4 = st.selectbox("Granularity", list(LEVELS.keys()), index=2, key='granularity_tab4')
+
+    with col2:
+        trend_label_map = {"Number of tornados": None,
+                           **measurement_label_map,
+                           "Damages in dollars": 'damages',
+                           "Injuries": 'injuries',
+                           "Deaths": 'deaths'}
+        trend_label_tab4 = st.selectbox("Series", list(trend_label_map.keys()), key='trend_series_tab4')
+        trend_column_tab4 = trend_label_map[trend_label_tab4]
+
+    with col3:
+        trend_view_tab4 = st.selectbox("View", ["Rolling average", "Year over year", "Seasonal decomposition"], key='trend_view_tab4')
+
+    with col4:
+        trend_window_tab4 = st.number_input("Rolling window in periods", min_value=1, max_value=120, value=3, step=1,
+                                            key='trend_window_tab4', disabled=trend_view_tab4 != "Rolling average")
+
+    trend_stat_tab4 = 'sum' if trend_column_tab4 in ('damages', 'injuries', 'deaths') else 'mean'
+    trend_tab4 = rollups.series(granularity_tab4, trend_column_tab4, trend_stat_tab4)
+    trend_period_tab4 = {"Daily": "day", "Weekly": "week", "Monthly": "month", "Yearly": "year"}[granularity_tab4]
+    trend_title_tab4 = f"{trend_label_tab4.capitalize()}, {'total' if trend_stat_tab4 == 'sum' else 'average'} per {trend_period_tab4}"
+    if trend_column_tab4 is None:
+        trend_title_tab4 = f"Number of tornados per {trend_period_tab4}"
+
+    if trend_view_tab4 == "Rolling average":
+        fig_tab44 = go.Figure()
+        fig_tab44.add_trace(go.Scatter(x=trend_tab4.index, y=trend_tab4, mode='lines', name=granularity_tab4,
+                                       line=dict(width=1, color='#D6D5D5')))
+        fig_tab44.add_trace(go.Scatter(x=trend_tab4.index, y=rolling(trend_tab4, trend_window_tab4), mode='lines',
+                                       name=f"Rolling average of {trend_window_tab4}", line=dict(width=2, color='#9B202B')))
+    elif trend_view_tab4 == "Year over year":
+        trend_yoy_tab4 = year_over_year(trend_tab4, granularity_tab4)
+        fig_tab44 = px.bar(trend_yoy_tab4, x=trend_yoy_tab4.index, y='change')
+        fig_tab44.update_traces(marker_color=np.where(trend_yoy_tab4['change'] > 0, '#9B202B', '#8D8D8D'))
+        fig_tab44.update_layout(xaxis_title='', yaxis_title='Change to the year before, %')
+        trend_title_tab4 = f"{trend_title_tab4}, year over year"
+    else:
+        try:
+            trend_parts_tab4 = seasonal_decomposition(trend_tab4, granularity_tab4)
+        except ValueError as e:
+            trend_parts_tab4 = None
+            st.info(str(e))
+        fig_tab44 = make_subplots(rows=4, cols=1, shared_xaxes=True, vertical_spacing=0.04,
+                                  subplot_titles=["Observed", "Trend", "Seasonal", "Residual"])
+        if trend_parts_tab4 is not None:
+            for row, part in enumerate(["observed", "trend", "seasonal", "residual"], start=1):
+                fig_tab44.add_trace(go.Scatter(x=trend_parts_tab4.index, y=trend_parts_tab4[part], mode='lines',
+                                               line=dict(width=1, color='#9B202B' if part == 'trend' else '#8D8D8D'),
+                                               showlegend=False), row=row, col=1)
+        fig_tab44.update_layout(height=700)
+        trend_title_tab4 = f"{trend_title_tab4}, seasonal decomposition"
+    fig_tab44.update_layout(template="plotly_white",
+                            title={'text': trend_title_tab4, 'x': 0.04, 'xanchor': 'left'})
+    st.plotly_chart(fig_tab44, use_container_width=True)
+
+    st.divider()
+
     col1, col2 = st.columns(2)
     
     with col1:
@@ -469,28 +834,26 @@ with tab4:
 
     with col2:   
         fig_tab43 = go.Figure()
-        sample = tornados_dynamics.sample(n=100, random_state=42)
-        for _, row in sample.iterrows():
-            fig_tab43.add_trace(go.Scattergeo(
-                lon=[row["begin_lon"], row["end_lon"]],
-                lat=[row["begin_lat"], row["end_lat"]],
-                mode="lines",
-                line=dict(width=2, color="crimson"),
-                showlegend=False,
-                opacity=0.6))
-            fig_tab43.add_trace(go.Scattergeo(
-                lon=[row["end_lon"]],
-                lat=[row["end_lat"]],
-                mode="markers",
-                marker=dict(
-                    symbol="triangle-up",
-                    size=10,
-                    color="#9B202B",
-                    angle=np.rad2deg(np.arctan2(
-                        row["end_lat"] - row["begin_lat"],
-                        row["end_lon"] - row["begin_lon"]))),
-                showlegend=False,
-                opacity=0.7))
+        sample = tornados.sample(n=100, random_state=42)
+        gaps = np.full(len(sample), np.nan)
+        fig_tab43.add_trace(go.Scattergeo(
+            lon=np.column_stack([sample["begin_lon"], sample["end_lon"], gaps]).ravel(),
+            lat=np.column_stack([sample["begin_lat"], sample["end_lat"], gaps]).ravel(),
+            mode="lines",
+            line=dict(width=2, color="crimson"),
+            showlegend=False,
+            opacity=0.6))
+        fig_tab43.add_trace(go.Scattergeo(
+            lon=sample["end_lon"],
+            lat=sample["end_lat"],
+            mode="markers",
+            marker=dict(
+                symbol="triangle-up",
+                size=10,
+                color="#9B202B",
+                angle=sample["path_bearing"]),
+            showlegend=False,
+            opacity=0.7))
         fig_tab43.update_geos(
             center={"lat": 39, "lon": -98},
             projection_scale=7,
@@ -535,14 +898,13 @@ with tab4:
                 width_tab4 = 0 if input_1_tab4 == '' else float(input_1_tab4.replace(',', '.'))
                 distance_tab4 = 0 if input_2_tab4 == '' else float(input_2_tab4.replace(',', '.'))
                 scale_tab4 = int(input_3_tab4[1]) if input_3_tab4 != 'unknown' else 0
-                features_tab4 = ['TOR_F_SCALE', 'TOR_LENGTH', 'TOR_WIDTH']
+                features_tab4 = MODELS["next_date_model"]["features"]
                 X_pred_tab4 = pd.DataFrame({'TOR_F_SCALE': scale_tab4,
                                             'TOR_LENGTH': distance_tab4,
                                             'TOR_WIDTH': width_tab4}, 
                                             columns=features_tab4, 
                                             index=[0])
-                days_left_model_id = "1xiX838Ox_ZoDL3k6EBIte_F3Tpx_Hiwu"
-                days_left_model = load_model_from_gdrive(days_left_model_id)
+                days_left_model = load_model("next_date_model")
                 days_left_prediction = round(days_left_model.predict(X_pred_tab4)[0])
                 today = dt.datetime.today().date()
                 next_tornado_date = str(today + dt.timedelta(days=days_left_prediction))
@@ -561,6 +923,47 @@ with tab4:
                     # st.metric("", next_tornado_date)
             except Exception as e:
                 st.error(f'Prediction failed: {e}')
+
+    col7, col8, col9 = st.columns(3)
+
+    with col7:
+        return_state_tab4 = st.selectbox("State", [ALL] + state_list, key="return_state_tab4")
+
+    with col8:
+        return_season_tab4 = st.selectbox("Season", list(SEASONS.keys()), key="return_season_tab4")
+
+    with col9:
+        st.caption(f"Historical baseline for {input_3_tab4} tornados: Poisson rates of every calendar month "
+                   f"over {load_return_periods(tornados, tornados_version).years} years of events")
+
+    returns_tab4 = load_return_periods(tornados, tornados_version).query(return_state_tab4, input_3_tab4,
+                                                                          SEASONS[return_season_tab4])
+    cols = st.columns(6)
+
+    with cols[0]:
+        st.metric("Per year", round(returns_tab4["per_year"], 2), help="Average number of days with tornados per year in the season")
+
+    with cols[1]:
+        st.metric("Return period",
+                  f"{round(returns_tab4['return_days'])} days" if pd.notna(returns_tab4['return_days']) else '-',
+                  help="Average days of the season between two days with tornados")
+
+    with cols[2]:
+        st.metric("Median gap",
+                  f"{round(returns_tab4['median_gap_days'])} days" if pd.notna(returns_tab4['median_gap_days']) else '-',
+                  help="Median days between consecutive days with tornados within the same season")
+
+    with cols[3]:
+        st.metric("Last seen", str(returns_tab4["last"]) if returns_tab4["last"] is not None else '-',
+                  help="Date of the latest tornado in the season")
+
+    with cols[4]:
+        st.metric("Within 30 days", f"{round(returns_tab4['chance_30_days'] * 100)}%",
+                  help="Chance of at least one tornado in the next 30 days")
+
+    with cols[5]:
+        st.metric("Baseline date", str(returns_tab4["median_wait_date"]) if returns_tab4["median_wait_date"] is not None else '-',
+                  help="Date by which a tornado is more likely than not, to compare with the model prediction")
     
 # <>>>--- TAB 5 ---<<<> DAMAGES
 
@@ -569,54 +972,53 @@ with tab5:
     if st.session_state["active_tab"] != "Damages":
         st.session_state["active_tab"] = "Damages"
     
-    tornados_damage_filtered = tornados.copy()
-    tornados_damage_filtered["damages"] = tornados_damage_filtered[["damage_property", "damage_crops"]].sum(axis=1, min_count=1)
-
-    tornados_damage_filtered = tornados_damage_filtered[tornados_damage_filtered['year'].isin(year_selected_tab5)] if year_selected_tab5 else tornados_damage_filtered
-    tornados_damage_filtered = tornados_damage_filtered[tornados_damage_filtered['month_name'].isin(month_selected_tab5)] if month_selected_tab5 else tornados_damage_filtered
-    tornados_damage_filtered = tornados_damage_filtered[tornados_damage_filtered['begin_day'].isin(day_selected_tab5)] if day_selected_tab5 else tornados_damage_filtered
-    tornados_damage_filtered = tornados_damage_filtered[tornados_damage_filtered['begin_date_time'].dt.day_name().isin(weekday_selected_tab5)] if weekday_selected_tab5 else tornados_damage_filtered
-    tornados_damage_filtered = tornados_damage_filtered[tornados_damage_filtered["begin_time"].astype(str).str.zfill(4).str[:2].isin(str(h) for h in hour_selected_tab5)] if hour_selected_tab5 else tornados_damage_filtered
-    tornados_damage_filtered = tornados_damage_filtered[tornados_damage_filtered['tor_f_scale'].isin(fscale_selected_tab5)] if fscale_selected_tab5 else tornados_damage_filtered
+    view_tab5 = filter_view(filter_key_tab5, approximate_selected_tab5)
+    tornados_damage_filtered = load_filtered(tornados, tornados_version, view_tab5)
     
     cols = st.columns([0.14, 0.14, 0.14, 0.14, 0.14, 0.3])
 
     with cols[0]:
-        total_damage = tornados_damage_filtered[damage_column].sum(skipna=True) / 1_000_000
+        total_damage, total_damage_ci = load_estimate(tornados, tornados_version, view_tab5, 'total', damage_column, 1_000_000)
         st.metric("Total",
-                  round(total_damage) if (damage_column == 'damages' and pd.notna(total_damage)) else '-',
+                  with_ci(total_damage, total_damage_ci) if (damage_column == 'damages' and pd.notna(total_damage)) else '-',
                   help="Total damage, millions of dollars")
     
     with cols[1]:
-        property_damage = tornados_damage_filtered['damage_property'].sum(skipna=True) / 1_000_000
+        property_damage, property_damage_ci = load_estimate(tornados, tornados_version, view_tab5, 'total', 'damage_property', 1_000_000)
         st.metric("Property",
-                  round(property_damage) if (damage_column != 'damage_crops' and pd.notna(property_damage)) else '-',
+                  with_ci(property_damage, property_damage_ci) if (damage_column != 'damage_crops' and pd.notna(property_damage)) else '-',
                   help="Property damage, millions of dollars")
     
     with cols[2]:
-        crops_damage = tornados_damage_filtered['damage_crops'].sum(skipna=True) / 1_000_000
+        crops_damage, crops_damage_ci = load_estimate(tornados, tornados_version, view_tab5, 'total', 'damage_crops', 1_000_000)
         st.metric("Crops",
-                  round(crops_damage) if (damage_column != 'damage_property'and pd.notna(crops_damage)) else '-',
+                  with_ci(crops_damage, crops_damage_ci) if (damage_column != 'damage_property'and pd.notna(crops_damage)) else '-',
                   help="Crops damage, millions of dollars")
     
     with cols[3]:
-        average_damage = tornados_damage_filtered[damage_column].mean(skipna=True) / 1_000_000
+        average_damage, average_damage_ci = load_estimate(tornados, tornados_version, view_tab5, 'mean', damage_column, 1_000_000)
         st.metric("Average",
-                  round(average_damage) if pd.notna(average_damage) else '-',
+                  with_ci(average_damage, average_damage_ci) if pd.notna(average_damage) else '-',
                   help="Average damage, millions of dollars")
     
     with cols[4]:
-        max_damage = tornados_damage_filtered[damage_column].max() / 1_000_000
+        max_damage = load_estimate(tornados, tornados_version, view_tab5, 'max', damage_column, 1_000_000)
         st.metric("Maximum",
-                  round(max_damage) if pd.notna(max_damage) else '-',
+                  (round(max_damage) if not approximate_selected_tab5 else f"≥ {round(max_damage)}") if pd.notna(max_damage) else '-',
                   help="The largest damage, millions of dollars")
     
     with cols[5]:
-        fatality_mode = tornados_damage_filtered['fatality_location'].dropna().mode()
-        most_fatality = fatality_mode[0] if (tornados_damage_filtered[damage_column].sum() > 0 and not fatality_mode.empty) else '-'
+        fatality_mode = load_estimate(tornados, tornados_version, view_tab5, 'mode', 'fatality_location')
+        any_damage = load_estimate(tornados, tornados_version, view_tab5, 'total', damage_column)[0] > 0
+        most_fatality = fatality_mode[0] if (any_damage and not fatality_mode.empty) else '-'
         st.metric("Usual place",
                   most_fatality,
                   help="Place of the most often damage")
+
+    percentiles_tab5 = load_estimate(tornados, tornados_version, view_tab5, 'quantiles', damage_column, 1_000_000)
+    approximate_tab5 = approximate_selected_tab5 or sketch_cells(view_tab5) is not None
+    st.caption(f"Median / 90th / 99th percentile of a damage: "
+               f"{percentiles_text(percentiles_tab5, 'millions of dollars', approximate_tab5)}")
     
     st.divider()
            
@@ -647,6 +1049,9 @@ with tab5:
                 st.session_state["damage_type"] = 'damage_crops'
                 st.rerun()
 
+        st.toggle('Approximate', key='approximate_tab5', help=approximate_help)
+        export_popover(tornados_damage_filtered, 'tab5', 'tornados_damages')
+
         col21, col22 = st.columns(2)
 
         with col21:
@@ -660,8 +1065,18 @@ with tab5:
             fscale_selected_tab5 = st.multiselect('F-scale', fscale_list, key='fscale_filter_tab5')
 
     with col2:
-        tornados_damages = tornados_damage_filtered.groupby('state').agg(damages_sum=(damage_column, 'sum')).reset_index()
-        fig_tab5 = draw_map(tornados_damages, 'damages_sum')
+        col31, col32 = st.columns([3, 1])
+
+        with col31:
+            resolution_tab5 = st.selectbox('Map resolution', map_resolution_list, key='map_resolution_tab5')
+
+        with col32:
+            tracks_tab5 = st.toggle('Along tracks', key='map_tracks_tab5', disabled=resolution_tab5 == 'States',
+                                    help='Count every tornado in each grid cell its path crosses')
+
+        totals_tab5, column_tab5 = load_map_totals(tornados, tornados_version, view_tab5, resolution_tab5, damage_column, 'damages_sum',
+                                                   tracks_tab5 and resolution_tab5 != 'States')
+        fig_tab5 = draw_totals_map(totals_tab5, column_tab5, resolution_tab5)
         st.plotly_chart(fig_tab5, key='map_tab5')
 
     st.divider()
@@ -694,7 +1109,7 @@ with tab5:
                 duration_tab5 = 0 if input_3_tab5 == '' else float(input_3_tab5.replace(',', '.'))
                 yearmonth_tab5 = 20260101 if input_4_tab5 == '' else input_4_tab5
                     
-                features_property_tab5 = ['tor_duration_minutes', 'state', 'event_yearmonth', 'tor_length', 'tor_width']
+                features_property_tab5 = MODELS["damage_property_model"]["features"]
                 X_pred_property_tab5 = pd.DataFrame({'tor_duration_minutes': duration_tab5,
                                                     'state': input_5_tab5,
                                                     'event_yearmonth': yearmonth_tab5,
@@ -702,19 +1117,17 @@ with tab5:
                                                     'tor_width': width_tab5}, 
                                                     columns=features_property_tab5, 
                                                     index=[0])
-                features_crops_tab5 = ['tor_f_scale', 'tor_length', 'tor_width']
+                features_crops_tab5 = MODELS["damage_crops_model"]["features"]
                 X_pred_crops_tab5 = pd.DataFrame({'tor_f_scale': input_6_tab5,
                                                   'tor_length': length_tab5,
                                                   'tor_width': width_tab5}, 
                                                   columns=features_crops_tab5, 
                                                   index=[0])
                 
-                property_damage_model_id = "1anmECDiFGAFVewp23OQVbF-bKq3Q_kHP"
-                property_damage_model = load_model_from_gdrive(property_damage_model_id)
+                property_damage_model = load_model("damage_property_model")
                 property_damage_prediction = property_damage_model.predict(X_pred_property_tab5)
 
-                crops_damage_model_id = "1z3BWuB44QbEE_u_NiMNTNv97jydFxKHA"
-                crops_damage_model = load_model_from_gdrive(crops_damage_model_id)
+                crops_damage_model = load_model("damage_crops_model")
                 crops_damage_prediction = crops_damage_model.predict(X_pred_crops_tab5)
                 
                 with col3:
@@ -727,6 +1140,29 @@ with tab5:
             except Exception as e:
                 st.error(f'Prediction failed: {e}')
 
+    if st.toggle('Sensitivity', key='sensitivity_tab5', help=sensitivity_help):
+        col41, col42 = st.columns([1, 3])
+        
+        with col41:
+            sensitivity_model_map_tab5 = {"Property damage": "damage_property_model", "Crops damage": "damage_crops_model"}
+            sensitivity_model_tab5 = st.selectbox("Prediction", list(sensitivity_model_map_tab5.keys()), key='sensitivity_model_tab5')
+            sensitivity_name_tab5 = sensitivity_model_map_tab5[sensitivity_model_tab5]
+            sensitivity_axes_tab5 = st.selectbox("Vary", sensitivity_options(sensitivity_name_tab5), key='sensitivity_axes_tab5')
+        
+        with col42:
+            try:
+                sensitivity_inputs_tab5 = {'width': 0 if input_1_tab5 == '' else float(input_1_tab5.replace(',', '.')),
+                                           'length': 0 if input_2_tab5 == '' else float(input_2_tab5.replace(',', '.')),
+                                           'duration': 0 if input_3_tab5 == '' else float(input_3_tab5.replace(',', '.')),
+                                           'yearmonth': 20260101 if input_4_tab5 == '' else int(input_4_tab5),
+                                           'state': input_5_tab5,
+                                           'fscale': input_6_tab5}
+                st.plotly_chart(draw_sensitivity(sensitivity_name_tab5, sensitivity_axes_tab5, sensitivity_inputs_tab5,
+                                                 f"{sensitivity_model_tab5}, dollars"),
+                                use_container_width=True)
+            except Exception as e:
+                st.error(f'Sensitivity failed: {e}')
+
 # <>>>--- TAB 6 ---<<<> INJURIES
 
 with tab6:
@@ -734,52 +1170,47 @@ with tab6:
     if st.session_state["active_tab"] != "Injuries":
         st.session_state["active_tab"] = "Injuries"
     
-    tornados_injury_filtered = tornados.copy()
-    tornados_injury_filtered['injuries'] = tornados_injury_filtered['injuries_direct'] + tornados_injury_filtered['injuries_indirect']
-
-    tornados_injury_filtered = tornados_injury_filtered[tornados_injury_filtered['year'].isin(year_selected_tab6)] if year_selected_tab6 else tornados_injury_filtered
-    tornados_injury_filtered = tornados_injury_filtered[tornados_injury_filtered['month_name'].isin(month_selected_tab6)] if month_selected_tab6 else tornados_injury_filtered
-    tornados_injury_filtered = tornados_injury_filtered[tornados_injury_filtered['begin_day'].isin(day_selected_tab6)] if day_selected_tab6 else tornados_injury_filtered
-    tornados_injury_filtered = tornados_injury_filtered[tornados_injury_filtered['begin_date_time'].dt.day_name().isin(weekday_selected_tab6)] if weekday_selected_tab6 else tornados_injury_filtered
-    tornados_injury_filtered = tornados_injury_filtered[tornados_injury_filtered["begin_time"].astype(str).str.zfill(4).str[:2].isin(str(h) for h in hour_selected_tab6)] if hour_selected_tab6 else tornados_injury_filtered
-    tornados_injury_filtered = tornados_injury_filtered[tornados_injury_filtered['tor_f_scale'].isin(fscale_selected_tab6)] if fscale_selected_tab6 else tornados_injury_filtered
+    view_tab6 = filter_view(filter_key_tab6, approximate_selected_tab6)
+    tornados_injury_filtered = load_filtered(tornados, tornados_version, view_tab6)
     
     cols = st.columns([0.14, 0.14, 0.14, 0.14, 0.14, 0.3])
 
     with cols[0]:
-        total_injuries = tornados_injury_filtered[injury_column].sum()
+        total_injuries, total_injuries_ci = load_estimate(tornados, tornados_version, view_tab6, 'total', injury_column)
         st.metric("Total",
-                  total_injuries if (injury_column == 'injuries' and pd.notna(total_injuries)) else '-',
+                  with_ci(total_injuries, total_injuries_ci) if (injury_column == 'injuries' and pd.notna(total_injuries)) else '-',
                   help="Total amount of injuries")
     
     with cols[1]:
-        direct_injuries = tornados_injury_filtered['injuries_direct'].sum()
+        direct_injuries, direct_injuries_ci = load_estimate(tornados, tornados_version, view_tab6, 'total', 'injuries_direct')
         st.metric("Direct",
-                   direct_injuries if (injury_column != 'injuries_indirect' and pd.notna(direct_injuries)) else '-',
+                   with_ci(direct_injuries, direct_injuries_ci) if (injury_column != 'injuries_indirect' and pd.notna(direct_injuries)) else '-',
                   help="Total amount of direct injuries")
     
     with cols[2]:
-        indirect_injuries = tornados_injury_filtered['injuries_indirect'].sum()
+        indirect_injuries, indirect_injuries_ci = load_estimate(tornados, tornados_version, view_tab6, 'total', 'injuries_indirect')
         st.metric("Indirect",
-                   indirect_injuries if (injury_column != 'injuries_direct' and pd.notna(indirect_injuries)) else '-',
+                   with_ci(indirect_injuries, indirect_injuries_ci) if (injury_column != 'injuries_direct' and pd.notna(indirect_injuries)) else '-',
                   help="Total amount of indirect injuries")
     
     with cols[3]:
-        average_injury_age = tornados_injury_filtered['fatality_age'].mean(skipna=True)
+        average_injury_age, average_injury_age_ci = load_estimate(tornados, tornados_version, view_tab6, 'mean', 'fatality_age')
+        selected_injuries = load_estimate(tornados, tornados_version, view_tab6, 'total', injury_column)[0]
         st.metric("Average age",
-                  round(average_injury_age) if (tornados_injury_filtered[injury_column].sum() and pd.notna(average_injury_age)) > 0 else '-',
+                  with_ci(average_injury_age, average_injury_age_ci) if (selected_injuries and pd.notna(average_injury_age)) > 0 else '-',
                   help="Average age of injury")
     
     with cols[4]:
-        gender_mode = tornados_injury_filtered['fatality_sex'].mode()
-        most_gender = gender_mode[0] if (tornados_injury_filtered['injuries'].sum() > 0 and not gender_mode.empty) else '-'
+        gender_mode = load_estimate(tornados, tornados_version, view_tab6, 'mode', 'fatality_sex')
+        any_injuries = load_estimate(tornados, tornados_version, view_tab6, 'total', 'injuries')[0] > 0
+        most_gender = gender_mode[0] if (any_injuries and not gender_mode.empty) else '-'
         st.metric("Usual gender",
                   most_gender,
                   help="Most frequent gender of injury")
     
     with cols[5]:
-        fatality_mode = tornados_injury_filtered['fatality_location'].dropna().mode()
-        most_fatality = fatality_mode[0] if (tornados_injury_filtered[injury_column].sum() > 0 and not fatality_mode.empty) else '-'
+        fatality_mode = load_estimate(tornados, tornados_version, view_tab6, 'mode', 'fatality_location')
+        most_fatality = fatality_mode[0] if (selected_injuries > 0 and not fatality_mode.empty) else '-'
         st.metric("Usual place",
                   most_fatality if injury_column != 'injuries_indirect' else '-',
                   help="Place of the most often injury")
@@ -814,6 +1245,9 @@ with tab6:
                 st.session_state["injury_type"] = 'injuries_indirect'
                 st.rerun()
 
+        st.toggle('Approximate', key='approximate_tab6', help=approximate_help)
+        export_popover(tornados_injury_filtered, 'tab6', 'tornados_injuries')
+
         col21, col22 = st.columns(2)
         
         with col21:
@@ -827,8 +1261,18 @@ with tab6:
             fscale_selected_tab6 = st.multiselect('F-scale', fscale_list, key='fscale_filter_tab6')
 
     with col2:
-        tornados_injuries = tornados_injury_filtered.groupby('state').agg(injuries_sum=(injury_column, 'sum')).reset_index()
-        fig_tab6 = draw_map(tornados_injuries, 'injuries_sum')
+        col31, col32 = st.columns([3, 1])
+
+        with col31:
+            resolution_tab6 = st.selectbox('Map resolution', map_resolution_list, key='map_resolution_tab6')
+
+        with col32:
+            tracks_tab6 = st.toggle('Along tracks', key='map_tracks_tab6', disabled=resolution_tab6 == 'States',
+                                    help='Count every tornado in each grid cell its path crosses')
+
+        totals_tab6, column_tab6 = load_map_totals(tornados, tornados_version, view_tab6, resolution_tab6, injury_column, 'injuries_sum',
+                                                   tracks_tab6 and resolution_tab6 != 'States')
+        fig_tab6 = draw_totals_map(totals_tab6, column_tab6, resolution_tab6)
         st.plotly_chart(fig_tab6, key='map_tab6')
 
     st.divider()
@@ -865,8 +1309,7 @@ with tab6:
                 distance_tab6 = 0 if input_2_tab6 == '' else np.log1p(float(input_2_tab6.replace(',', '.')))
                 duration_tab6 = 0 if input_3_tab6 == '' else np.log1p(float(input_3_tab6.replace(',', '.')))
                 
-                features_tab6 = ['event_narrative', 'log_tor_length', 'log_tor_width', 'log_tor_duration_minutes',
-                                 'tor_f_scale', 'state', 'month_name']
+                features_tab6 = MODELS["injuries_model"]["features"]
                 X_pred_tab6 = pd.DataFrame({'event_narrative': input_8_tab6,
                                             'log_tor_length': distance_tab6,
                                             'log_tor_width': width_tab6,
@@ -877,8 +1320,7 @@ with tab6:
                                             columns=features_tab6, 
                                             index=[0])
                 
-                injury_model_id = "18nTfaFBWt-qeHwxSyG9C_na7TSZPGQBo"
-                injury_model = load_model_from_gdrive(injury_model_id)
+                injury_model = load_model("injuries_model")
                 injury_probability = round(injury_model.predict_proba(X_pred_tab6)[0, 1], 3)
 
                 with col4:
@@ -888,6 +1330,27 @@ with tab6:
             except Exception as e:
                 st.error(f'Prediction failed: {e}')
 
+    if st.toggle('Sensitivity', key='sensitivity_tab6', help=sensitivity_help):
+        col41, col42 = st.columns([1, 3])
+        
+        with col41:
+            sensitivity_axes_tab6 = st.selectbox("Vary", sensitivity_options("injuries_model"), key='sensitivity_axes_tab6')
+        
+        with col42:
+            try:
+                sensitivity_inputs_tab6 = {'width': 0 if input_1_tab6 == '' else float(input_1_tab6.replace(',', '.')),
+                                           'length': 0 if input_2_tab6 == '' else float(input_2_tab6.replace(',', '.')),
+                                           'duration': 0 if input_3_tab6 == '' else float(input_3_tab6.replace(',', '.')),
+                                           'month': input_5_tab6,
+                                           'fscale': input_6_tab6,
+                                           'state': input_7_tab6,
+                                           'narrative': input_8_tab6}
+                st.plotly_chart(draw_sensitivity("injuries_model", sensitivity_axes_tab6, sensitivity_inputs_tab6,
+                                                 "Injury probability"),
+                                use_container_width=True)
+            except Exception as e:
+                st.error(f'Sensitivity failed: {e}')
+
 # <>>>--- TAB 7 ---<<<> DEATHS
 
 with tab7:
@@ -895,51 +1358,46 @@ with tab7:
     if st.session_state["active_tab"] != "Deaths":
         st.session_state["active_tab"] = "Deaths"
 
-    tornados_death_filtered = tornados.copy()
-    tornados_death_filtered['deaths'] = tornados_death_filtered['deaths_direct'] + tornados_death_filtered['deaths_indirect']
-    
-    tornados_death_filtered = tornados_death_filtered[tornados_death_filtered['year'].isin(year_selected_tab7)] if year_selected_tab7 else tornados_death_filtered
-    tornados_death_filtered = tornados_death_filtered[tornados_death_filtered['month_name'].isin(month_selected_tab7)] if month_selected_tab7 else tornados_death_filtered
-    tornados_death_filtered = tornados_death_filtered[tornados_death_filtered['begin_day'].isin(day_selected_tab7)] if day_selected_tab7 else tornados_death_filtered
-    tornados_death_filtered = tornados_death_filtered[tornados_death_filtered['begin_date_time'].dt.day_name().isin(weekday_selected_tab7)] if weekday_selected_tab7 else tornados_death_filtered
-    tornados_death_filtered = tornados_death_filtered[tornados_death_filtered["begin_time"].astype(str).str.zfill(4).str[:2].isin(str(h) for h in hour_selected_tab7)] if hour_selected_tab7 else tornados_death_filtered
-    tornados_death_filtered = tornados_death_filtered[tornados_death_filtered['tor_f_scale'].isin(fscale_selected_tab7)] if fscale_selected_tab7 else tornados_death_filtered
+    view_tab7 = filter_view(filter_key_tab7, approximate_selected_tab7)
+    tornados_death_filtered = load_filtered(tornados, tornados_version, view_tab7)
     
     cols = st.columns([0.14, 0.14, 0.14, 0.14, 0.14, 0.3])
 
     with cols[0]:
-        total_deaths = tornados_death_filtered[death_column].sum()
+        total_deaths, total_deaths_ci = load_estimate(tornados, tornados_version, view_tab7, 'total', death_column)
         st.metric("Total",
-                   total_deaths if (death_column == 'deaths'and pd.notna(total_deaths)) else '-',
+                   with_ci(total_deaths, total_deaths_ci) if (death_column == 'deaths'and pd.notna(total_deaths)) else '-',
                   help="Total amount of deaths")
     
     with cols[1]:
-        direct_deaths = tornados_death_filtered['deaths_direct'].sum()
+        direct_deaths, direct_deaths_ci = load_estimate(tornados, tornados_version, view_tab7, 'total', 'deaths_direct')
         st.metric("Direct",
-                   direct_deaths if (death_column != 'deaths_indirect' and pd.notna(direct_deaths)) else '-',
+                   with_ci(direct_deaths, direct_deaths_ci) if (death_column != 'deaths_indirect' and pd.notna(direct_deaths)) else '-',
                   help="Total amount of direct deaths")
     with cols[2]:
-        indirect_deaths = tornados_death_filtered['deaths_indirect'].sum()
+        indirect_deaths, indirect_deaths_ci = load_estimate(tornados, tornados_version, view_tab7, 'total', 'deaths_indirect')
         st.metric("Indirect",
-                   indirect_deaths if (death_column != 'deaths_direct' and pd.notna(indirect_deaths)) else '-',
+                   with_ci(indirect_deaths, indirect_deaths_ci) if (death_column != 'deaths_direct' and pd.notna(indirect_deaths)) else '-',
                   help="Total amount of indirect deaths")
     
     with cols[3]:
-        average_death_age = tornados_death_filtered['fatality_age'].mean(skipna=True)
+        average_death_age, average_death_age_ci = load_estimate(tornados, tornados_version, view_tab7, 'mean', 'fatality_age')
+        selected_deaths = load_estimate(tornados, tornados_version, view_tab7, 'total', death_column)[0]
         st.metric("Average age",
-                  round(average_death_age) if (tornados_death_filtered[death_column].sum() > 0 and pd.notna(average_death_age)) else '-',
+                  with_ci(average_death_age, average_death_age_ci) if (selected_deaths > 0 and pd.notna(average_death_age)) else '-',
                   help="Average age of death")
     
     with cols[4]:
-        gender_mode = tornados_death_filtered['fatality_sex'].mode()
-        most_gender = gender_mode[0] if (tornados_death_filtered['deaths'].sum() > 0 and not gender_mode.empty) else '-'
+        gender_mode = load_estimate(tornados, tornados_version, view_tab7, 'mode', 'fatality_sex')
+        any_deaths = load_estimate(tornados, tornados_version, view_tab7, 'total', 'deaths')[0] > 0
+        most_gender = gender_mode[0] if (any_deaths and not gender_mode.empty) else '-'
         st.metric("Usual gender",
                   most_gender,
                   help="Most frequent gender of death")
     
     with cols[5]:
-        fatality_mode = tornados_death_filtered['fatality_location'].dropna().mode()
-        most_fatality = fatality_mode[0] if (tornados_death_filtered[death_column].sum() > 0 and not fatality_mode.empty) else '-'
+        fatality_mode = load_estimate(tornados, tornados_version, view_tab7, 'mode', 'fatality_location')
+        most_fatality = fatality_mode[0] if (selected_deaths > 0 and not fatality_mode.empty) else '-'
         st.metric("Usual place",
                   most_fatality if death_column != 'deaths_indirect' else '-',
                   help="Place of the most often death")
@@ -974,6 +1432,9 @@ with tab7:
                 st.session_state["death_type"] = 'deaths_indirect'
                 st.rerun()
 
+        st.toggle('Approximate', key='approximate_tab7', help=approximate_help)
+        export_popover(tornados_death_filtered, 'tab7', 'tornados_deaths')
+
         col21, col22 = st.columns(2)
 
         with col21:
@@ -987,8 +1448,18 @@ with tab7:
             fscale_selected_tab7 = st.multiselect('F-scale', fscale_list, key='fscale_filter_tab7')
 
     with col2:
-        tornados_deaths = tornados_death_filtered.groupby('state').agg(deaths_sum=(death_column, 'sum')).reset_index()
-        fig_tab7 = draw_map(tornados_deaths, 'deaths_sum')
+        col31, col32 = st.columns([3, 1])
+
+        with col31:
+            resolution_tab7 = st.selectbox('Map resolution', map_resolution_list, key='map_resolution_tab7')
+
+        with col32:
+            tracks_tab7 = st.toggle('Along tracks', key='map_tracks_tab7', disabled=resolution_tab7 == 'States',
+                                    help='Count every tornado in each grid cell its path crosses')
+
+        totals_tab7, column_tab7 = load_map_totals(tornados, tornados_version, view_tab7, resolution_tab7, death_column, 'deaths_sum',
+                                                   tracks_tab7 and resolution_tab7 != 'States')
+        fig_tab7 = draw_totals_map(totals_tab7, column_tab7, resolution_tab7)
         st.plotly_chart(fig_tab7, key='map_tab7')
 
     st.divider()
@@ -1017,7 +1488,7 @@ with tab7:
                 duration_tab7 = 0 if input_3_tab7 == '' else float(input_3_tab7.replace(',', '.'))
                 area_tab7 = distance_tab7 * width_tab7 * 0.001
                     
-                features_tab7 = ['tor_area', 'tor_width', 'tor_length', 'path_distance_km', 'tor_duration_minutes', 'month_name']
+                features_tab7 = MODELS["any_death_model"]["features"]
                 X_pred_tab7 = pd.DataFrame({'tor_area': area_tab7,
                                             'tor_width': width_tab7,
                                             'tor_length': distance_tab7,
@@ -1027,12 +1498,10 @@ with tab7:
                                             columns=features_tab7, 
                                             index=[0])
 
-                total_death_model_id = "1_tdKJ2CvlV2t-pgGIiTef12iGEg12Rn5"
-                total_death_model = load_model_from_gdrive(total_death_model_id)
+                total_death_model = load_model("any_death_model")
                 total_death_probability = round(total_death_model.predict_proba(X_pred_tab7)[0, 1], 3)
 
-                indirect_death_model_id = "1zzoNai0-AvcYJ9UDu_59I9oZMj-FJAtV"
-                indirect_death_model = load_model_from_gdrive(indirect_death_model_id)
+                indirect_death_model = load_model("indirect_death_model")
                 indirect_death_probability = round(indirect_death_model.predict_proba(X_pred_tab7)[0, 1], 3)
                 
                 with col3:
@@ -1044,3 +1513,24 @@ with tab7:
                               help="Probability to get killed by a tornado indirectly with provided specifications")
             except Exception as e:
                 st.error(f'Prediction failed: {e}')
+
+    if st.toggle('Sensitivity', key='sensitivity_tab7', help=sensitivity_help):
+        col41, col42 = st.columns([1, 3])
+        
+        with col41:
+            sensitivity_model_map_tab7 = {"Any death": "any_death_model", "Indirect death": "indirect_death_model"}
+            sensitivity_model_tab7 = st.selectbox("Prediction", list(sensitivity_model_map_tab7.keys()), key='sensitivity_model_tab7')
+            sensitivity_name_tab7 = sensitivity_model_map_tab7[sensitivity_model_tab7]
+            sensitivity_axes_tab7 = st.selectbox("Vary", sensitivity_options(sensitivity_name_tab7), key='sensitivity_axes_tab7')
+        
+        with col42:
+            try:
+                sensitivity_inputs_tab7 = {'width': 0 if input_1_tab7 == '' else float(input_1_tab7.replace(',', '.')),
+                                           'length': 0 if input_2_tab7 == '' else float(input_2_tab7.replace(',', '.')),
+                                           'duration': 0 if input_3_tab7 == '' else float(input_3_tab7.replace(',', '.')),
+                                           'month': input_4_tab7}
+                st.plotly_chart(draw_sensitivity(sensitivity_name_tab7, sensitivity_axes_tab7, sensitivity_inputs_tab7,
+                                                 f"{sensitivity_model_tab7} probability"),
+                                use_container_width=True)
+            except Exception as e:
+                st.error(f'Sensitivity failed: {e}')
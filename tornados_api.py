@@ -0,0 +1,224 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from aiohttp import web
+from tornados_core import (DATA_DIR, MODELS, FILTERS, AGGREGATE_KEYS, AGGREGATE_MEASURES, METRICS, EXPORT_FORMATS, load_tornados,
+                           add_measures, filter_key, filter_by_key, aggregate_tornados, export_chunks, load_model,
+                           model_frame, predict)
+from tornados_scorer import MODELS_DIR
+
+
+# JSON API over tornados_core. Every endpoint takes the dashboard filters as query parameters, repeated or comma
+# separated (?year=2011&year=2013&fscale=F3,F4), for example:
+#   GET  /aggregates/state?measure=events,deaths&year=2011
+#   GET  /metrics/damages?month=May
+#   POST /predict/injuries_model  {"rows": [{"event_narrative": "...", "log_tor_length": 1.2, ...}]}
+#   GET  /export?format=parquet&columns=state,year,tor_f_scale&year=2011
+# Responses are computed on a thread pool so slow requests do not block the event loop, identical requests
+# in flight share one computation, and finished bodies are kept in an LRU cache with an ETag for pollers.
+# Exports are not cached: they are streamed chunk by chunk as they are serialized.
+
+MAX_BATCH_ROWS = 10_000
+
+
+def parse_list(query, name, cast=str):
+    return sorted({cast(value) for raw in query.getall(name, []) for value in raw.split(',') if value.strip() != ''})
+
+
+def parse_filters(query):
+    try:
+        return filter_key(*(parse_list(query, name, cast) for name, cast in FILTERS.items()))
+    except ValueError as e:
+        raise web.HTTPBadRequest(text=json.dumps({"error": f"Invalid filter: {e}"}), content_type='application/json')
+
+
+def jsonable(value):
+    if isinstance(value, dict):
+        return {str(k): jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [jsonable(v) for v in value]
+    if isinstance(value, (np.integer, np.bool_)):
+        return value.item()
+    if isinstance(value, (float, np.floating)):
+        return None if math.isnan(value) else float(value)
+    if value is pd.NA or value is pd.NaT:
+        return None
+    return value
+
+
+def error(status, message):
+    return web.json_response({"error": message}, status=status)
+
+
+class TornadosService:
+
+    def __init__(self, df, models_dir=MODELS_DIR, workers=4, cache_size=1024, max_age=60):
+        self.df = add_measures(df)
+        self.models_dir = models_dir
+        self.models = {}
+        self.models_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(workers)
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.max_age = max_age
+        self.pending = {}
+
+    def _model(self, name):
+        with self.models_lock:
+            if name not in self.models:
+                self.models[name] = load_model(name, self.models_dir)
+            return self.models[name]
+
+    def _filtered(self, filters):
+        return filter_by_key(self.df, filters)
+
+    async def _respond(self, request, key, compute):
+        entry = self.cache.get(key)
+        if entry is None:
+            entry = await self._compute(key, compute)
+        else:
+            self.cache.move_to_end(key)
+        body, etag = entry
+        headers = {"ETag": etag, "Cache-Control": f"max-age={self.max_age}"}
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=body, content_type='application/json', headers=headers)
+
+    async def _compute(self, key, compute):
+        future = self.pending.get(key)
+        if future is None:
+            def run():
+                body = json.dumps(jsonable(compute()), allow_nan=False).encode()
+                return body, f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+            future = asyncio.get_running_loop().run_in_executor(self.executor, run)
+            self.pending[key] = future
+            future.add_done_callback(lambda f: self._store(key, f))
+        return await asyncio.shield(future)
+
+    def _store(self, key, future):
+        self.pending.pop(key, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        self.cache[key] = future.result()
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    async def health(self, request):
+        return web.json_response({"status": "ok", "rows": len(self.df), "cached": len(self.cache)})
+
+    async def models_info(self, request):
+        return web.json_response({name: {"features": model["features"], "output": model["output"]} for name, model in MODELS.items()})
+
+    async def aggregates(self, request):
+        by = request.match_info['by']
+        if by not in AGGREGATE_KEYS:
+            return error(404, f"Unknown aggregate key {by}, expected one of {', '.join(AGGREGATE_KEYS)}")
+        measures = parse_list(request.query, 'measure') or ['events']
+        unknown = [measure for measure in measures if measure not in AGGREGATE_MEASURES]
+        if unknown:
+            return error(400, f"Unknown measures: {', '.join(unknown)}")
+        filters = parse_filters(request.query)
+
+        def compute():
+            return aggregate_tornados(self._filtered(filters), by, measures).to_dict('records')
+        return await self._respond(request, ('aggregates', by, tuple(measures), filters), compute)
+
+    async def metrics(self, request):
+        kind = request.match_info['kind']
+        if kind not in METRICS:
+            return error(404, f"Unknown metrics {kind}, expected one of {', '.join(METRICS)}")
+        filters = parse_filters(request.query)
+
+        def compute():
+            return METRICS[kind](self._filtered(filters))
+        return await self._respond(request, ('metrics', kind, filters), compute)
+
+    async def predict(self, request):
+        name = request.match_info['model']
+        if name not in MODELS:
+            return error(404, f"Unknown model {name}, expected one of {', '.join(MODELS)}")
+        try:
+            payload = await request.json()
+        except ValueError:
+            return error(400, "Request body must be JSON")
+        rows = payload.get('rows') if isinstance(payload, dict) else payload
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            return error(400, "Expected a list of feature objects in 'rows'")
+        if len(rows) > MAX_BATCH_ROWS:
+            return error(400, f"At most {MAX_BATCH_ROWS} rows per request")
+        try:
+            X = model_frame(name, rows)
+        except ValueError as e:
+            return error(400, str(e))
+        digest = hashlib.sha1(json.dumps(rows, sort_keys=True).encode()).hexdigest()
+
+        def compute():
+            return {"model": name, "predictions": predict(self._model(name), name, X)}
+        try:
+            return await self._respond(request, ('predict', name, digest), compute)
+        except RuntimeError as e:
+            return error(503, str(e))
+        except (ValueError, TypeError, KeyError) as e:
+            return error(400, f"Prediction failed: {e}")
+
+    async def export(self, request):
+        fmt = request.query.get('format', 'csv')
+        if fmt not in EXPORT_FORMATS:
+            return error(400, f"Unknown export format {fmt}, expected one of {', '.join(EXPORT_FORMATS)}")
+        columns = [column for raw in request.query.getall('columns', []) for column in raw.split(',') if column.strip() != '']
+        missing = [column for column in columns if column not in self.df]
+        if missing:
+            return error(400, f"Unknown columns: {', '.join(missing)}")
+        filters = parse_filters(request.query)
+        loop = asyncio.get_running_loop()
+        chunks = await loop.run_in_executor(self.executor, lambda: export_chunks(self._filtered(filters), columns, fmt))
+        response = web.StreamResponse(headers={"Content-Type": EXPORT_FORMATS[fmt],
+                                               "Content-Disposition": f'attachment; filename="tornados.{fmt}"'})
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        while (chunk := await loop.run_in_executor(self.executor, next, chunks, None)) is not None:
+            await response.write(chunk)
+        await response.write_eof()
+        return response
+
+
+def make_app(df, models_dir=MODELS_DIR, workers=4, cache_size=1024, max_age=60):
+    service = TornadosService(df, models_dir, workers, cache_size, max_age)
+    app = web.Application(client_max_size=16 * 1024 ** 2)
+    app.add_routes([web.get('/health', service.health),
+                    web.get('/models', service.models_info),
+                    web.get('/aggregates/{by}', service.aggregates),
+                    web.get('/metrics/{kind}', service.metrics),
+                    web.post('/predict/{model}', service.predict),
+                    web.get('/export', service.export)])
+
+    async def shutdown(app):
+        service.executor.shutdown(wait=False, cancel_futures=True)
+    app.on_cleanup.append(shutdown)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve tornado aggregates, metrics and predictions as JSON")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--workers", type=int, default=4, help="threads computing responses")
+    parser.add_argument("--cache-size", type=int, default=1024, help="responses kept in the LRU cache")
+    parser.add_argument("--max-age", type=int, default=60, help="Cache-Control max-age in seconds")
+    parser.add_argument("--keepalive", type=float, default=75.0, help="idle keep-alive timeout in seconds")
+    args = parser.parse_args()
+    app = make_app(load_tornados(args.data_dir), args.models_dir, args.workers, args.cache_size, args.max_age)
+    web.run_app(app, host=args.host, port=args.port, keepalive_timeout=args.keepalive)
+
+
+if __name__ == "__main__":
+    main()
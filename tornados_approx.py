@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+
+# Stratified sample for approximate metrics. Whole events (with all their fatality rows) are sampled
+# within every state and year, so each sampled row stands for N_h / n_h rows of its stratum and the
+# totals below are unbiased Horvitz-Thompson estimates with stratified (domain) variance.
+
+SAMPLE_COLUMNS = ['_stratum', '_event', '_weight']
+Z_95 = 1.959964
+
+
+class StratifiedSample:
+
+    def __init__(self, df, fraction=0.1, min_events=10, seed=0, strata=('state', 'year')):
+        rng = np.random.default_rng(seed)
+        events = df.drop_duplicates('event_id')[['event_id', *strata]]
+        stratum_codes, stratum_keys = pd.MultiIndex.from_frame(events[list(strata)]).factorize()
+        events_per_stratum = np.bincount(stratum_codes, minlength=len(stratum_keys))
+        to_sample = np.minimum(events_per_stratum, np.maximum(np.ceil(events_per_stratum * fraction), min_events)).astype(int)
+        # A random key per event, ranked within its stratum, picks the first n_h events of every stratum at once
+        order = np.lexsort((rng.random(len(events)), stratum_codes))
+        rank = np.empty(len(events), dtype=np.int64)
+        starts = np.cumsum(events_per_stratum) - events_per_stratum
+        rank[order] = np.arange(len(events)) - np.repeat(starts, events_per_stratum)
+        chosen = rank < to_sample[stratum_codes]
+        sampled_events = pd.Series(np.arange(chosen.sum()), index=events['event_id'].to_numpy()[chosen])
+        self.stratum_keys = stratum_keys
+        self.stratum_size = events_per_stratum.astype(np.float64)
+        self.stratum_sampled = to_sample.astype(np.float64)
+        self.event_stratum = stratum_codes[chosen]
+        frame = df[df['event_id'].isin(sampled_events.index)].copy()
+        frame['_event'] = sampled_events.loc[frame['event_id']].to_numpy()
+        frame['_stratum'] = self.event_stratum[frame['_event'].to_numpy()]
+        frame['_weight'] = (self.stratum_size / self.stratum_sampled)[frame['_stratum'].to_numpy()]
+        self.frame = frame
+        self.n_events = int(chosen.sum())
+
+    def _event_totals(self, df, values=None):
+        events = df['_event'].to_numpy()
+        if values is None:
+            # Distinct events: 1 for every sampled event with at least one row left after filtering
+            return (np.bincount(events, minlength=self.n_events) > 0).astype(np.float64)
+        values = np.nan_to_num(np.asarray(values, dtype=np.float64))
+        return np.bincount(events, weights=values, minlength=self.n_events)
+
+    def _strata(self, totals):
+        sums = np.bincount(self.event_stratum, weights=totals, minlength=len(self.stratum_size))
+        squares = np.bincount(self.event_stratum, weights=totals ** 2, minlength=len(self.stratum_size))
+        n, size = self.stratum_sampled, self.stratum_size
+        with np.errstate(invalid='ignore', divide='ignore'):
+            variance = np.where(n > 1, (squares - sums ** 2 / n) / (n - 1), 0.0)
+        estimate = size / n * sums
+        estimate_variance = size ** 2 * (1 - n / size) * np.maximum(variance, 0) / n
+        return estimate, estimate_variance
+
+    def total(self, df, values=None):
+        estimate, variance = self._strata(self._event_totals(df, values))
+        return estimate.sum(), Z_95 * np.sqrt(variance.sum())
+
+    def mean(self, df, values):
+        values = np.asarray(values, dtype=np.float64)
+        present = ~np.isnan(values)
+        value_totals = self._event_totals(df, np.where(present, values, 0))
+        count_totals = self._event_totals(df, present)
+        total, _ = self._strata(value_totals)
+        count, _ = self._strata(count_totals)
+        if count.sum() == 0:
+            return np.nan, np.nan
+        ratio = total.sum() / count.sum()
+        _, variance = self._strata(value_totals - ratio * count_totals)
+        return ratio, Z_95 * np.sqrt(variance.sum()) / count.sum()
+
+    def total_by(self, df, values=None, level=0):
+        estimate, variance = self._strata(self._event_totals(df, values))
+        groups = pd.DataFrame({'group': self.stratum_keys.get_level_values(level), 'estimate': estimate, 'variance': variance})
+        groups = groups.groupby('group', sort=True)[['estimate', 'variance']].sum()
+        return pd.DataFrame({'estimate': groups['estimate'], 'ci': Z_95 * np.sqrt(groups['variance'])})
+
+    def mode(self, df, values):
+        values = values.dropna()
+        if values.empty:
+            return pd.Series(dtype=object)
+        counts = df['_weight'].loc[values.index].groupby(values.to_numpy()).sum()
+        return pd.Series([counts.idxmax()])
+
+
+# Exact when sample is None, otherwise estimated from the filtered sample frame; all return the value
+# and the half width of its 95% confidence interval (None when exact)
+
+def estimate_total(df, values, sample=None):
+    if sample is None:
+        return values.sum(skipna=True), None
+    return sample.total(df, values)
+
+
+def estimate_events(df, sample=None):
+    if sample is None:
+        return df['event_id'].nunique(), None
+    return sample.total(df)
+
+
+def estimate_mean(df, values, sample=None):
+    if sample is None:
+        return values.mean(skipna=True), None
+    return sample.mean(df, values)
+
+
+def estimate_mode(df, values, sample=None):
+    if sample is None:
+        return values.dropna().mode()
+    return sample.mode(df, values)
+
+
+def estimate_total_by_state(df, values, name, sample=None):
+    if sample is None:
+        if values is None:
+            return df.groupby('state').agg(**{name: ('event_id', 'nunique')}).reset_index()
+        return values.groupby(df['state']).sum().rename(name).rename_axis('state').reset_index()
+    totals = sample.total_by(df, values, level=0)
+    totals = totals[totals.index.isin(df['state'].unique())]
+    return pd.DataFrame({'state': totals.index, name: totals['estimate'].to_numpy(), 'ci': totals['ci'].to_numpy()})
+
+
+def with_ci(value, half_width=None, digits=0):
+    if half_width is None:
+        return round(value, digits) if digits else round(value)
+    if digits:
+        return f"{round(value, digits)} ± {round(half_width, digits)}"
+    return f"{round(value)} ± {round(half_width)}"
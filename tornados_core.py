@@ -0,0 +1,442 @@
+import hashlib
+import io
+import numbers
+import os
+import duckdb
+import joblib
+import numpy as np
+import pandas as pd
+import requests
+from tornados_scorer import MODELS_DIR, load_scorer
+from tornados_grid import add_grid_cells
+
+
+# Data and model layer shared by the Streamlit app and the HTTP API, free of any st.* calls:
+# failures are raised as RuntimeError and the callers decide how to report them
+
+DATA_DIR = os.environ.get("TORNADOS_DATA_DIR", "data")
+DATA_FILE_ID = "1agsHgi2sd2DUP7RmuR6G1TuHmG_OW7EN"
+
+MODELS = {"next_date_model": {"file_id": "1xiX838Ox_ZoDL3k6EBIte_F3Tpx_Hiwu",
+                              "features": ['TOR_F_SCALE', 'TOR_LENGTH', 'TOR_WIDTH'],
+                              "output": "predict"},
+          "damage_property_model": {"file_id": "1anmECDiFGAFVewp23OQVbF-bKq3Q_kHP",
+                                    "features": ['tor_duration_minutes', 'state', 'event_yearmonth', 'tor_length', 'tor_width'],
+                                    "output": "predict"},
+          "damage_crops_model": {"file_id": "1z3BWuB44QbEE_u_NiMNTNv97jydFxKHA",
+                                 "features": ['tor_f_scale', 'tor_length', 'tor_width'],
+                                 "output": "predict"},
+          "injuries_model": {"file_id": "18nTfaFBWt-qeHwxSyG9C_na7TSZPGQBo",
+                             "features": ['event_narrative', 'log_tor_length', 'log_tor_width', 'log_tor_duration_minutes',
+                                          'tor_f_scale', 'state', 'month_name'],
+                             "output": "predict_proba"},
+          "any_death_model": {"file_id": "1_tdKJ2CvlV2t-pgGIiTef12iGEg12Rn5",
+                              "features": ['tor_area', 'tor_width', 'tor_length', 'path_distance_km', 'tor_duration_minutes', 'month_name'],
+                              "output": "predict_proba"},
+          "indirect_death_model": {"file_id": "1zzoNai0-AvcYJ9UDu_59I9oZMj-FJAtV",
+                                   "features": ['tor_area', 'tor_width', 'tor_length', 'path_distance_km', 'tor_duration_minutes', 'month_name'],
+                                   "output": "predict_proba"}}
+# Features read as strings; every other model feature is a number
+TEXT_FEATURES = ['event_narrative', 'state', 'month_name', 'tor_f_scale']
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+WEEKDAY_CODES = {weekday: code for code, weekday in enumerate(WEEKDAYS)}
+DAY_PARTS = ['Night', 'Morning', 'Day', 'Evening']
+# Offsets of zone names that come without one; most rows carry it, as in CST-6
+TIMEZONE_OFFSETS = {'EST': -5, 'EDT': -4, 'CST': -6, 'CDT': -5, 'MST': -7, 'MDT': -6, 'PST': -8, 'PDT': -7,
+                    'AKST': -9, 'AKDT': -8, 'HST': -10, 'AST': -4, 'SST': -11, 'GST': 10}
+
+FILTERS = {"year": int, "month": str, "day": int, "weekday": str, "hour": int, "fscale": str}
+FSCALE_NUMBERS = {'F0': 0, 'F1': 1, 'F2': 2, 'F3': 3, 'F4': 4, 'F5': 5, 'unknown': 0}
+
+EXPORT_FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+EXPORT_CHUNK_ROWS = 50_000
+# The app's download button holds the whole file in memory, larger selections go through GET /export
+EXPORT_APP_MAX_ROWS = 100_000
+
+AGGREGATE_KEYS = ['state', 'year', 'tor_f_scale']
+AGGREGATE_MEASURES = ['events', 'fatalities', 'damages', 'damage_property', 'damage_crops',
+                      'injuries', 'injuries_direct', 'injuries_indirect', 'deaths', 'deaths_direct', 'deaths_indirect']
+
+
+# <>>>--- DATA ---<<<>
+
+def gdrive_url(file_id):
+    return f"https://drive.google.com/uc?export=download&id={file_id}"
+
+
+def convert_damage(x):
+    if not isinstance(x, str) or x.strip() == '':
+        return np.nan
+    try:
+        if 'K' in x:
+            return int(float(x.replace('K', '')) * 1_000)
+        elif 'M' in x:
+            return int(float(x.replace('M', '')) * 1_000_000)
+        elif 'B' in x:
+            return int(float(x.replace('M', '')) * 1_000_000_000)
+        else:
+            return np.nan
+    except ValueError:
+        return np.nan
+
+
+def add_track_geometry(df):
+    lat1, lon1, lat2, lon2 = (np.radians(df[c].to_numpy(dtype=np.float64)) for c in ['begin_lat', 'begin_lon', 'end_lat', 'end_lon'])
+    dlon = lon2 - lon1
+    haversine = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    df['path_distance_km'] = (2 * 6371.0088 * np.arcsin(np.sqrt(np.clip(haversine, 0, 1)))).astype(np.float32)
+    bearing = np.arctan2(np.sin(dlon) * np.cos(lat2), np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon))
+    df['path_bearing'] = ((np.degrees(bearing) + 360) % 360).astype(np.float32)
+    bx, by = np.cos(lat2) * np.cos(dlon), np.cos(lat2) * np.sin(dlon)
+    df['path_mid_lat'] = np.degrees(np.arctan2(np.sin(lat1) + np.sin(lat2), np.sqrt((np.cos(lat1) + bx) ** 2 + by ** 2))).astype(np.float32)
+    df['path_mid_lon'] = np.degrees(lon1 + np.arctan2(by, np.cos(lat1) + bx)).astype(np.float32)
+    df['path_lat_min'] = df[['begin_lat', 'end_lat']].min(axis=1).astype(np.float32)
+    df['path_lat_max'] = df[['begin_lat', 'end_lat']].max(axis=1).astype(np.float32)
+    df['path_lon_min'] = df[['begin_lon', 'end_lon']].min(axis=1).astype(np.float32)
+    df['path_lon_max'] = df[['begin_lon', 'end_lon']].max(axis=1).astype(np.float32)
+    return df
+
+
+def timezone_offset(zone):
+    if not isinstance(zone, str):
+        return np.nan
+    zone = zone.strip().upper()
+    digits = zone.lstrip('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+    try:
+        return float(digits) if digits else TIMEZONE_OFFSETS.get(zone, np.nan)
+    except ValueError:
+        return np.nan
+
+
+def add_time_columns(df):
+    # Timestamps are local standard time of cz_timezone. Zones are parsed once per distinct value, UTC is one
+    # vectorized subtraction, and the hour, weekday and day part filters and metrics read small integer codes
+    # (-1 when the time is missing) instead of formatting timestamps on every rerun
+    codes, zones = pd.factorize(df['cz_timezone'])
+    offsets = np.append(np.array([timezone_offset(zone) for zone in zones], dtype=np.float64), np.nan)[codes]
+    offsets = pd.to_timedelta(offsets, unit='h')
+    df['begin_date_time_utc'] = df['begin_date_time'] - offsets
+    df['end_date_time_utc'] = df['end_date_time'] - offsets
+    hours = df['begin_date_time'].dt.hour.fillna(-1).to_numpy().astype(np.int8)
+    df['begin_hour'] = hours
+    df['begin_hour_utc'] = df['begin_date_time_utc'].dt.hour.fillna(-1).to_numpy().astype(np.int8)
+    df['begin_weekday'] = df['begin_date_time'].dt.weekday.fillna(-1).to_numpy().astype(np.int8)
+    hour_parts = np.array([DAY_PARTS.index(day_part(hour)) for hour in range(24)] + [-1], dtype=np.int8)
+    df['begin_day_part'] = hour_parts[hours]
+    return df
+
+
+def code_labels(codes, labels):
+    # Integer codes back to their labels, -1 to NaN
+    return pd.Series(np.array(list(labels) + [np.nan], dtype=object)[codes.to_numpy()], index=codes.index)
+
+
+def read_tornados(source):
+    pandas_df = pd.read_csv(source)
+    query = f"""SELECT * FROM pandas_df"""
+    df = duckdb.query(query).to_df()
+    df.columns = df.columns.map(lambda x: x.lower())
+    columns_to_keep = ['begin_yearmonth', 'begin_day', 'begin_time', 'end_yearmonth', 'end_day', 'end_time',
+                       'episode_id', 'event_id', 'state', 'year', 'month_name', 'begin_date_time',
+                       'cz_timezone', 'end_date_time', 'injuries_direct', 'injuries_indirect', 'deaths_direct', 'deaths_indirect',
+                       'damage_property', 'damage_crops', 'magnitude', 'magnitude_type', 'tor_f_scale', 'tor_length',
+                       'tor_width', 'begin_range', 'begin_azimuth', 'begin_location', 'end_range', 'end_azimuth',
+                       'end_location', 'begin_lat', 'begin_lon', 'end_lat', 'end_lon', 'episode_narrative',
+                       'event_narrative', 'fat_yearmonth', 'fat_day', 'fat_time', 'fatality_id', 'fatality_type',
+                       'fatality_date', 'fatality_age', 'fatality_sex', 'fatality_location', 'event_yearmonth']
+    df = df[columns_to_keep]
+    date_columns = ['begin_date_time', 'end_date_time', 'fatality_date']
+    df[date_columns[:2]] = df[date_columns[:2]].apply(lambda column: pd.to_datetime(column, format='%d-%b-%y %H:%M:%S', errors='coerce'))
+    df[date_columns[2]] = df[date_columns[2]].apply(lambda column: pd.to_datetime(column, format='%m/%d/%Y %H:%M:%S', errors='coerce'))
+    damage_columns = ['damage_property', 'damage_crops']
+    df[damage_columns] =df[damage_columns].fillna('')
+    df[damage_columns] = df[damage_columns].map(convert_damage)
+    fat_columns = ['fat_yearmonth', 'fat_day', 'fat_time', 'fatality_id']
+    df[fat_columns] =df[fat_columns].astype('Int32')
+    df['tor_f_scale'] = df['tor_f_scale'].map(lambda x: x.replace('E', '').replace('FU', 'unknown'))
+    df['tor_length'] = round(df['tor_length'] * 1.60934, 2)
+    df['tor_width'] = round(df['tor_width'] * 0.9144, 2)
+    df['state'] = df['state'].map(lambda x: x.title())
+    df['tor_duration_minutes'] = (df['end_date_time'] - df['begin_date_time']).map(lambda x: round(x.total_seconds() /60, 2))
+    df = add_time_columns(df)
+    df = add_track_geometry(df)
+    df = add_grid_cells(df)
+    return df
+
+
+def download_tornados():
+    response = requests.get(gdrive_url(DATA_FILE_ID))
+    if response.status_code != 200:
+        raise RuntimeError("Failed to download data file.")
+    return io.StringIO(response.content.decode('utf-8'))
+
+
+def load_tornados(data_dir=DATA_DIR):
+    local_path = os.path.join(data_dir, "tornados_usa_xxi.csv")
+    return read_tornados(local_path if os.path.exists(local_path) else download_tornados())
+
+
+def dataset_version(df):
+    hashes = pd.util.hash_pandas_object(df[['event_id', 'begin_date_time']], index=False).to_numpy()
+    return hashlib.sha1(hashes.tobytes()).hexdigest()[:16]
+
+
+def day_part(x):
+    if x in range(6, 13):
+        return 'Morning'
+    elif x in range(12, 19):
+        return 'Day'
+    elif x in range(18, 25):
+        return 'Evening'
+    else:
+        return 'Night'
+
+
+def filter_tornados(df, years, months, days, weekdays, hours, fscales):
+    df = df[df['year'].isin(years)] if years else df
+    df = df[df['month_name'].isin(months)] if months else df
+    df = df[df['begin_day'].isin(days)] if days else df
+    # Unknown weekdays match no rows, like any other unknown filter value
+    df = df[df['begin_weekday'].isin([WEEKDAY_CODES[w] for w in weekdays if w in WEEKDAY_CODES])] if weekdays else df
+    df = df[df['begin_hour'].isin(hours)] if hours else df
+    df = df[df['tor_f_scale'].isin(fscales)] if fscales else df
+    return df
+
+
+def filter_key(years=(), months=(), days=(), weekdays=(), hours=(), fscales=()):
+    # Canonical form of a filter selection: the same selection in any order or with repeats gives the same key
+    values = dict(zip(FILTERS, (years, months, days, weekdays, hours, fscales)))
+    return tuple((name, tuple(sorted({cast(value) for value in values[name]}))) for name, cast in FILTERS.items())
+
+
+def filter_by_key(df, key):
+    key = dict(key)
+    return filter_tornados(df, *(list(key[name]) for name in FILTERS))
+
+
+def encode_filter_key(key, prefix=''):
+    return {f"{prefix}{name}": ','.join(str(value) for value in values) for name, values in key if values}
+
+
+def decode_filter_key(params, prefix=''):
+    # Links may be edited by hand, so values that do not parse are dropped instead of failing
+    values = {name: [] for name in FILTERS}
+    for name, cast in FILTERS.items():
+        for value in str(params.get(f"{prefix}{name}", '')).split(','):
+            if value.strip() == '':
+                continue
+            try:
+                values[name].append(cast(value.strip()))
+            except ValueError:
+                continue
+    return filter_key(*values.values())
+
+
+# <>>>--- METRICS ---<<<>
+
+def add_measures(df):
+    df['damages'] = df[["damage_property", "damage_crops"]].sum(axis=1, min_count=1)
+    df['injuries'] = df['injuries_direct'] + df['injuries_indirect']
+    df['deaths'] = df['deaths_direct'] + df['deaths_indirect']
+    return df
+
+
+def aggregate_tornados(df, by, measures=('events',)):
+    grouped = df.groupby(by, sort=True)
+    columns = {}
+    for measure in measures:
+        if measure == 'events':
+            columns[measure] = grouped['event_id'].nunique()
+        elif measure == 'fatalities':
+            columns[measure] = grouped['fatality_id'].count()
+        else:
+            columns[measure] = grouped[measure].sum()
+    return pd.DataFrame(columns, index=grouped.size().index).reset_index()
+
+
+def _first(values):
+    values = values.dropna().mode()
+    return None if values.empty else values.iloc[0]
+
+
+def summary_metrics(df):
+    return {"total_amount": int(df['event_id'].nunique()),
+            "usual_weekday": _first(code_labels(df['begin_weekday'], WEEKDAYS)),
+            "usual_day_part": _first(code_labels(df['begin_day_part'], DAY_PARTS)),
+            "average_duration_minutes": df['tor_duration_minutes'].mean(),
+            "total_fatalities": int(df['fatality_id'].notna().sum()),
+            "usual_fatality_location": _first(df['fatality_location'])}
+
+
+def damage_metrics(df):
+    return {"total": df['damages'].sum(),
+            "property": df['damage_property'].sum(),
+            "crops": df['damage_crops'].sum(),
+            "average": df['damages'].mean(),
+            "maximum": df['damages'].max(),
+            "usual_place": _first(df['fatality_location'])}
+
+
+def injury_metrics(df):
+    return {"total": int(df['injuries'].sum()),
+            "direct": int(df['injuries_direct'].sum()),
+            "indirect": int(df['injuries_indirect'].sum()),
+            "average_age": df['fatality_age'].mean(),
+            "usual_gender": _first(df['fatality_sex']) if df['injuries'].sum() > 0 else None,
+            "usual_place": _first(df['fatality_location'])}
+
+
+def death_metrics(df):
+    return {"total": int(df['deaths'].sum()),
+            "direct": int(df['deaths_direct'].sum()),
+            "indirect": int(df['deaths_indirect'].sum()),
+            "average_age": df['fatality_age'].mean(),
+            "usual_gender": _first(df['fatality_sex']) if df['deaths'].sum() > 0 else None,
+            "usual_place": _first(df['fatality_location'])}
+
+
+METRICS = {"summary": summary_metrics, "damages": damage_metrics, "injuries": injury_metrics, "deaths": death_metrics}
+
+
+# <>>>--- EXPORT ---<<<>
+
+class _ChunkSink(io.RawIOBase):
+
+    # Collects what the Parquet writer emits so it can be handed out chunk by chunk; tell() keeps counting
+    # across drains because the writer records column chunk offsets from it
+
+    def __init__(self):
+        self.parts = []
+        self.written = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.written += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.written
+
+    def drain(self):
+        data, self.parts = b''.join(self.parts), []
+        return data
+
+
+def _parquet_schema(df):
+    import pyarrow as pa
+    schema = pa.Schema.from_pandas(df.head(0), preserve_index=False)
+    # Empty object columns infer as null, the object columns of this data hold strings
+    return pa.schema([pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f for f in schema], metadata=schema.metadata)
+
+
+def export_chunks(df, columns=None, fmt="csv", chunk_rows=EXPORT_CHUNK_ROWS):
+    # Serializes df[columns] one slice of rows at a time, so at most chunk_rows rows are ever copied
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt}, expected one of {', '.join(EXPORT_FORMATS)}")
+    columns = list(columns) if columns else list(df.columns)
+    missing = [column for column in columns if column not in df]
+    if missing:
+        raise ValueError(f"Unknown columns: {', '.join(missing)}")
+    starts = range(0, max(len(df), 1), chunk_rows)
+    if fmt == "csv":
+        for start in starts:
+            yield df.iloc[start:start + chunk_rows][columns].to_csv(index=False, header=start == 0).encode('utf-8')
+        return
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = _parquet_schema(df[columns].iloc[:0])
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for start in starts:
+            writer.write_table(pa.Table.from_pandas(df.iloc[start:start + chunk_rows][columns], schema=schema, preserve_index=False))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def export_bytes(df, columns=None, fmt="csv", chunk_rows=EXPORT_CHUNK_ROWS):
+    # The whole file in memory, for consumers that cannot take a stream
+    return b"".join(export_chunks(df, columns, fmt, chunk_rows))
+
+
+# <>>>--- MODELS ---<<<>
+
+def download_model(file_id):
+    response = requests.get(gdrive_url(file_id))
+    if response.status_code != 200:
+        raise RuntimeError(f"Failed to download model (status code: {response.status_code})")
+    return joblib.load(io.BytesIO(response.content))
+
+
+def load_model(name, models_dir=MODELS_DIR):
+    compiled_path = os.path.join(models_dir, f"{name}.npz")
+    if os.path.exists(compiled_path):
+        return load_scorer(compiled_path)
+    local_path = os.path.join(models_dir, f"{name}.joblib")
+    if os.path.exists(local_path):
+        return joblib.load(local_path)
+    return download_model(MODELS[name]["file_id"])
+
+
+def _valid_feature(feature, value):
+    if feature in TEXT_FEATURES:
+        return isinstance(value, str)
+    return isinstance(value, numbers.Real) and not isinstance(value, bool) and np.isfinite(value)
+
+
+def model_frame(name, rows):
+    features = MODELS[name]["features"]
+    missing = [feature for feature in features if not any(feature in row for row in rows)]
+    if missing:
+        raise ValueError(f"Missing features for {name}: {', '.join(missing)}")
+    # Client rows are checked here, as the pipelines fail on wrong types with arbitrary exceptions
+    for i, row in enumerate(rows):
+        invalid = [feature for feature in features if not _valid_feature(feature, row.get(feature))]
+        if invalid:
+            expected = ', '.join(f"{f} ({'a string' if f in TEXT_FEATURES else 'a finite number'})" for f in invalid)
+            raise ValueError(f"Invalid features in row {i} for {name}: {expected}")
+    return pd.DataFrame(rows, columns=features)
+
+
+def predict(model, name, X):
+    if MODELS[name]["output"] == "predict_proba":
+        return model.predict_proba(X)[:, 1]
+    return model.predict(X)
+
+
+def model_inputs(name, width=0.0, length=0.0, duration=0.0, state='Alabama', fscale='F0', month='January',
+                 yearmonth=20260101, narrative=''):
+    # The raw inputs of the prediction panels, scalars or arrays of one shape, mapped to the features of a model
+    width, length, duration = (np.asarray(v, dtype=np.float64) for v in (width, length, duration))
+    fscale = np.asarray(fscale, dtype=object)
+    columns = {'TOR_F_SCALE': np.vectorize(FSCALE_NUMBERS.get, otypes=[np.int64])(fscale),
+               'TOR_LENGTH': length,
+               'TOR_WIDTH': width,
+               'tor_duration_minutes': duration,
+               'state': np.asarray(state, dtype=object),
+               'event_yearmonth': np.asarray(yearmonth, dtype=np.int64),
+               'tor_length': length,
+               'tor_width': width,
+               'tor_f_scale': fscale,
+               'event_narrative': np.asarray(narrative, dtype=object),
+               'log_tor_length': np.log1p(length),
+               'log_tor_width': np.log1p(width),
+               'log_tor_duration_minutes': np.log1p(duration),
+               'month_name': np.asarray(month, dtype=object),
+               'tor_area': length * width * 0.001,
+               'path_distance_km': length}
+    features = MODELS[name]["features"]
+    shape = np.broadcast_shapes(*(np.shape(columns[feature]) for feature in features))
+    return pd.DataFrame({feature: np.broadcast_to(columns[feature], shape).ravel() for feature in features})
+
+
+def sensitivity_surface(model, name, axes, **inputs):
+    # Predictions over the cartesian product of the axes ({input: values}) with the other inputs fixed,
+    # evaluated in one call; the result has one dimension per axis
+    mesh = np.meshgrid(*(np.asarray(values, dtype=object) for values in axes.values()), indexing='ij')
+    grid = {axis: values.astype(np.float64) if axis in ('width', 'length', 'duration') else values
+            for axis, values in zip(axes, mesh)}
+    return np.asarray(predict(model, name, model_inputs(name, **{**inputs, **grid}))).reshape(mesh[0].shape)
@@ -0,0 +1,81 @@
+import math
+import numpy as np
+import pandas as pd
+
+
+GRID_RESOLUTIONS = {"1°": 1.0, "0.5°": 0.5, "0.25°": 0.25, "0.1°": 0.1}
+LAT_MIN, LAT_MAX = 15.0, 72.0
+LON_MIN, LON_MAX = -180.0, -60.0
+
+
+def grid_shape(size):
+    return math.ceil((LAT_MAX - LAT_MIN) / size), math.ceil((LON_MAX - LON_MIN) / size)
+
+
+def grid_column(size):
+    return f"grid_cell_{str(size).replace('.', '_')}"
+
+
+def grid_cells(lat, lon, size):
+    n_rows, n_cols = grid_shape(size)
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        row = np.floor((lat - LAT_MIN) / size)
+        col = np.floor((lon - LON_MIN) / size)
+        inside = (row >= 0) & (row < n_rows) & (col >= 0) & (col < n_cols)
+    return np.where(inside, row * n_cols + col, -1).astype(np.int32)
+
+
+def add_grid_cells(df):
+    for size in GRID_RESOLUTIONS.values():
+        df[grid_column(size)] = grid_cells(df['begin_lat'], df['begin_lon'], size)
+    return df
+
+
+def track_cells(df, size):
+    # Every track is sampled at a quarter of the cell size, so each cell it crosses gets at least one point;
+    # fatality rows repeat their event, so only the first row of every event is traced and the (event, cell)
+    # pairs are deduplicated to count a track once per cell. Rows are positions of those first rows in df
+    first = np.flatnonzero(~df['event_id'].duplicated().to_numpy())
+    events = df.iloc[first]
+    begin_lat, begin_lon = events['begin_lat'].to_numpy(np.float64), events['begin_lon'].to_numpy(np.float64)
+    end_lat = np.where(np.isnan(events['end_lat']), begin_lat, events['end_lat'])
+    end_lon = np.where(np.isnan(events['end_lon']), begin_lon, events['end_lon'])
+    span = np.maximum(np.abs(end_lat - begin_lat), np.abs(end_lon - begin_lon))
+    n_points = np.where(np.isnan(span), 1, np.ceil(np.nan_to_num(span) / size * 4) + 1).astype(np.int64)
+    rows = np.repeat(np.arange(len(events)), n_points)
+    starts = np.repeat(np.cumsum(n_points) - n_points, n_points)
+    fraction = (np.arange(len(rows)) - starts) / np.maximum(n_points[rows] - 1, 1)
+    lat = begin_lat[rows] + (end_lat[rows] - begin_lat[rows]) * fraction
+    lon = begin_lon[rows] + (end_lon[rows] - begin_lon[rows]) * fraction
+    cells = grid_cells(lat, lon, size)
+    inside = cells >= 0
+    pairs = np.unique(rows[inside].astype(np.int64) << 32 | cells[inside].astype(np.int64))
+    return first[pairs >> 32].astype(np.int32), (pairs & 0xFFFFFFFF).astype(np.int32)
+
+
+def aggregate_grid(cells, size, values=None):
+    cells = np.asarray(cells)
+    valid = cells >= 0
+    unique_cells, inverse = np.unique(cells[valid], return_inverse=True)
+    _, n_cols = grid_shape(size)
+    grid = pd.DataFrame({'cell': unique_cells,
+                         'lat': LAT_MIN + (unique_cells // n_cols + 0.5) * size,
+                         'lon': LON_MIN + (unique_cells % n_cols + 0.5) * size,
+                         'tor_num': np.bincount(inverse, minlength=len(unique_cells))})
+    for name, weights in (values or {}).items():
+        weights = np.nan_to_num(np.asarray(weights, dtype=np.float64)[valid])
+        grid[name] = np.bincount(inverse, weights=weights, minlength=len(unique_cells))
+    return grid
+
+
+def grid_geojson(cells, size):
+    _, n_cols = grid_shape(size)
+    features = []
+    for cell in np.asarray(cells).tolist():
+        lat = LAT_MIN + (cell // n_cols) * size
+        lon = LON_MIN + (cell % n_cols) * size
+        ring = [[lon, lat], [lon, lat + size], [lon + size, lat + size], [lon + size, lat], [lon, lat]]
+        features.append({"type": "Feature", "id": cell, "properties": {}, "geometry": {"type": "Polygon", "coordinates": [ring]}})
+    return {"type": "FeatureCollection", "features": features}
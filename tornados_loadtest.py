@@ -0,0 +1,239 @@
+import argparse
+import json
+import os
+import resource
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+
+# Load test for the dashboard: every simulated session is a streamlit AppTest driving the real script
+# through widget interactions, all sessions of a process share its st.cache_* caches like a server does.
+# AppTest swaps process-global runtime state on every run, so reruns inside one process take turns on
+# RERUN_LOCK; under the GIL this is close to how one server process executes CPU-bound reruns anyway.
+# Latency includes the wait for the lock (what a user sees), service time excludes it. Scale out with
+# --processes. Tab switches happen in the browser without a rerun, so the scripts only model widgets.
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tornados.py")
+STATES = ['ALABAMA', 'ARKANSAS', 'GEORGIA', 'ILLINOIS', 'IOWA', 'KANSAS', 'MISSISSIPPI', 'NEBRASKA', 'OKLAHOMA', 'TEXAS']
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December']
+RERUN_LOCK = threading.Lock()
+WORDS = ['mobile', 'home', 'school', 'debris', 'trees', 'roof', 'damaged', 'barn', 'destroyed', 'power', 'lines', 'church']
+
+
+# <>>>--- STUB FILES ---<<<>
+
+def make_stub_data(n_rows=20_000, seed=0):
+    rng = np.random.default_rng(seed)
+    begin = pd.Timestamp('2000-01-01') + pd.to_timedelta(rng.integers(0, 25 * 365 * 24 * 60, n_rows), unit='min')
+    end = begin + pd.to_timedelta(rng.integers(0, 60, n_rows), unit='min')
+    fatal = rng.random(n_rows) < 0.05
+    begin_lat, begin_lon = rng.uniform(30, 45, n_rows), rng.uniform(-100, -82, n_rows)
+    df = pd.DataFrame({
+        'BEGIN_YEARMONTH': begin.strftime('%Y%m').astype(int), 'BEGIN_DAY': begin.day, 'BEGIN_TIME': begin.hour * 100 + begin.minute,
+        'END_YEARMONTH': end.strftime('%Y%m').astype(int), 'END_DAY': end.day, 'END_TIME': end.hour * 100 + end.minute,
+        'EPISODE_ID': rng.integers(1, n_rows // 4, n_rows), 'EVENT_ID': np.arange(n_rows) + 100_000,
+        'STATE': rng.choice(STATES, n_rows), 'YEAR': begin.year, 'MONTH_NAME': begin.month_name(),
+        'BEGIN_DATE_TIME': begin.strftime('%d-%b-%y %H:%M:%S'), 'CZ_TIMEZONE': rng.choice(['CST-6', 'EST-5', 'MST-7'], n_rows),
+        'END_DATE_TIME': end.strftime('%d-%b-%y %H:%M:%S'),
+        'INJURIES_DIRECT': rng.poisson(0.3, n_rows), 'INJURIES_INDIRECT': rng.poisson(0.02, n_rows),
+        'DEATHS_DIRECT': rng.poisson(0.03, n_rows), 'DEATHS_INDIRECT': rng.poisson(0.005, n_rows),
+        'DAMAGE_PROPERTY': rng.choice(['0.00K', '10.00K', '250.00K', '1.50M', ''], n_rows),
+        'DAMAGE_CROPS': rng.choice(['0.00K', '5.00K', ''], n_rows),
+        'MAGNITUDE': np.nan, 'MAGNITUDE_TYPE': None, 'TOR_F_SCALE': rng.choice(['EF0', 'EF1', 'EF2', 'EF3', 'EF4', 'EFU'], n_rows),
+        'TOR_LENGTH': np.round(rng.exponential(3, n_rows), 2), 'TOR_WIDTH': np.round(rng.exponential(100, n_rows)),
+        'BEGIN_RANGE': 1, 'BEGIN_AZIMUTH': 'N', 'BEGIN_LOCATION': 'STUB', 'END_RANGE': 1, 'END_AZIMUTH': 'N', 'END_LOCATION': 'STUB',
+        'BEGIN_LAT': begin_lat, 'BEGIN_LON': begin_lon,
+        'END_LAT': begin_lat + rng.normal(0.02, 0.05, n_rows), 'END_LON': begin_lon + rng.normal(0.05, 0.05, n_rows),
+        'EPISODE_NARRATIVE': [' '.join(w) for w in rng.choice(WORDS, (n_rows, 20))],
+        'EVENT_NARRATIVE': [' '.join(w) for w in rng.choice(WORDS, (n_rows, 12))],
+        'FAT_YEARMONTH': np.where(fatal, begin.strftime('%Y%m').astype(int), np.nan),
+        'FAT_DAY': np.where(fatal, begin.day, np.nan), 'FAT_TIME': np.where(fatal, 1200, np.nan),
+        'FATALITY_ID': np.where(fatal, np.arange(n_rows), np.nan), 'FATALITY_TYPE': np.where(fatal, 'D', None),
+        'FATALITY_DATE': np.where(fatal, begin.strftime('%m/%d/%Y %H:%M:%S'), None),
+        'FATALITY_AGE': np.where(fatal, rng.integers(1, 90, n_rows), np.nan),
+        'FATALITY_SEX': np.where(fatal, rng.choice(['M', 'F'], n_rows), None),
+        'FATALITY_LOCATION': np.where(fatal, rng.choice(['Mobile/Trailer Home', 'Permanent Home', 'Vehicle/Towed Trailer'], n_rows), None)})
+    df['EVENT_YEARMONTH'] = df['BEGIN_YEARMONTH']
+    return df
+
+
+def make_stub_models(seed=0, n_rows=500):
+    from sklearn.compose import ColumnTransformer
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression, Ridge
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder
+    rng = np.random.default_rng(seed)
+    states = [s.title() for s in STATES]
+    fscales = ['F0', 'F1', 'F2', 'F3', 'F4', 'F5', 'unknown']
+    X = pd.DataFrame({'tor_duration_minutes': rng.exponential(10, n_rows), 'tor_length': rng.exponential(5, n_rows),
+                      'tor_width': rng.exponential(100, n_rows), 'event_yearmonth': rng.integers(200001, 202412, n_rows),
+                      'state': rng.choice(states, n_rows), 'tor_f_scale': rng.choice(fscales, n_rows),
+                      'month_name': rng.choice(MONTHS, n_rows),
+                      'event_narrative': [' '.join(w) for w in rng.choice(WORDS, (n_rows, 8))]})
+    X['log_tor_length'], X['log_tor_width'] = np.log1p(X['tor_length']), np.log1p(X['tor_width'])
+    X['log_tor_duration_minutes'] = np.log1p(X['tor_duration_minutes'])
+    X['tor_area'] = X['tor_length'] * X['tor_width'] * 0.001
+    X['path_distance_km'] = X['tor_length']
+    y = X['tor_length'] * X['tor_width'] * 100 + rng.exponential(1e4, n_rows)
+    labels = (rng.random(n_rows) < 0.2).astype(int)
+
+    def onehot(categorical, estimator, text=False):
+        transformers = [('cat', OneHotEncoder(handle_unknown='ignore'), categorical)]
+        if text:
+            transformers.append(('text', TfidfVectorizer(), 'event_narrative'))
+        return Pipeline([('prep', ColumnTransformer(transformers, remainder='passthrough')), ('model', estimator)])
+
+    next_date = pd.DataFrame({'TOR_F_SCALE': rng.integers(0, 6, n_rows), 'TOR_LENGTH': X['tor_length'], 'TOR_WIDTH': X['tor_width']})
+    death_features = ['tor_area', 'tor_width', 'tor_length', 'path_distance_km', 'tor_duration_minutes', 'month_name']
+    injury_features = ['event_narrative', 'log_tor_length', 'log_tor_width', 'log_tor_duration_minutes', 'tor_f_scale', 'state', 'month_name']
+    return {
+        'next_date_model': Ridge().fit(next_date, rng.integers(1, 30, n_rows)),
+        'damage_property_model': onehot(['state'], Ridge()).fit(
+            X[['tor_duration_minutes', 'state', 'event_yearmonth', 'tor_length', 'tor_width']], y),
+        'damage_crops_model': onehot(['tor_f_scale'], Ridge()).fit(X[['tor_f_scale', 'tor_length', 'tor_width']], y / 10),
+        'injuries_model': onehot(['tor_f_scale', 'state', 'month_name'], LogisticRegression(max_iter=500), text=True).fit(
+            X[injury_features], labels),
+        'any_death_model': onehot(['month_name'], LogisticRegression(max_iter=500)).fit(X[death_features], labels),
+        'indirect_death_model': onehot(['month_name'], LogisticRegression(max_iter=500)).fit(X[death_features], labels)}
+
+
+def write_stub_files(data_dir, models_dir, n_rows, compiled=False):
+    import joblib
+    from tornados_scorer import export_model
+    os.makedirs(data_dir, exist_ok=True)
+    os.makedirs(models_dir, exist_ok=True)
+    make_stub_data(n_rows).to_csv(os.path.join(data_dir, "tornados_usa_xxi.csv"), index=False)
+    with open(os.path.join(data_dir, "us-states.json"), "w") as f:
+        json.dump({"type": "FeatureCollection", "features": []}, f)
+    for name, model in make_stub_models().items():
+        if compiled:
+            export_model(model, os.path.join(models_dir, f"{name}.npz"))
+        else:
+            joblib.dump(model, os.path.join(models_dir, f"{name}.joblib"))
+
+
+# <>>>--- SESSIONS ---<<<>
+
+def _button(at, label):
+    return next(b for b in at.button if b.label == label)
+
+
+def _selectbox(at, label):
+    return next(s for s in at.selectbox if s.label == label)
+
+
+def _filter(rng):
+    tab = rng.choice([3, 5, 6, 7])
+    widget, values = [('year', list(range(2000, 2025))), ('month', MONTHS), ('fscale', ['F0', 'F1', 'F2', 'F3'])][rng.integers(3)]
+    return lambda at: at.multiselect(key=f"{widget}_filter_tab{tab}").select(values[rng.integers(len(values))])
+
+
+def _clear(rng):
+    tab = rng.choice([3, 5, 6, 7])
+    return lambda at: at.button(key=f"clear_filters_tab{tab}").click()
+
+
+def _type_button(rng):
+    label, key = [('Property', None), ('Crop', None), (None, 'direct_tab6'), (None, 'indirect_tab6'),
+                  (None, 'direct_tab7'), (None, 'indirect_tab7')][rng.integers(6)]
+    return lambda at: (_button(at, label) if label else at.button(key=key)).click()
+
+
+def _dynamics(rng):
+    label = ['Group by', 'Measurement'][rng.integers(2)]
+    def action(at):
+        box = _selectbox(at, label)
+        box.select(box.options[rng.integers(len(box.options))])
+    return action
+
+
+def _predict(rng):
+    tab = rng.choice([4, 5, 6, 7])
+    labels = {4: "Predict next tornado date", 5: "Predict damage size", 6: "Predict injury probability", 7: "Predict death probability"}
+    def action(at):
+        at.text_input(key=f"input_1_tab{tab}").input(str(rng.integers(10, 500)))
+        at.text_input(key=f"input_2_tab{tab}").input(str(rng.integers(1, 30)))
+        _button(at, labels[tab]).click()
+    return action
+
+
+ACTIONS = [(_filter, 0.4), (_clear, 0.1), (_type_button, 0.15), (_dynamics, 0.15), (_predict, 0.2)]
+
+
+def _rerun(at, timings):
+    requested = time.perf_counter()
+    with RERUN_LOCK:
+        started = time.perf_counter()
+        at.run()
+        finished = time.perf_counter()
+    timings.append((finished - requested, finished - started))
+
+
+def run_session(steps, seed, timeout):
+    from streamlit.testing.v1 import AppTest
+    rng = np.random.default_rng(seed)
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    timings, failures = [], 0
+    _rerun(at, timings)
+    weights = np.array([w for _, w in ACTIONS])
+    for _ in range(steps):
+        make_action = ACTIONS[rng.choice(len(ACTIONS), p=weights / weights.sum())][0]
+        try:
+            make_action(rng)(at)
+        except (KeyError, StopIteration):
+            failures += 1
+            continue
+        _rerun(at, timings)
+        failures += len(at.exception)
+    return timings, failures
+
+
+def run_process(sessions, steps, seed, timeout):
+    os.chdir(os.path.dirname(APP_PATH))
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        results = list(pool.map(lambda i: run_session(steps, seed + i, timeout), range(sessions)))
+    timings = [timing for session, _ in results for timing in session]
+    failures = sum(f for _, f in results)
+    # ru_maxrss is reported in kilobytes on Linux
+    return timings, failures, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent dashboard sessions against stub data and models")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent sessions per process")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--steps", type=int, default=20, help="interactions per session")
+    parser.add_argument("--rows", type=int, default=20_000, help="rows of stub data")
+    parser.add_argument("--compiled", action="store_true", help="serve compiled NumPy scorers instead of joblib models")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        data_dir, models_dir = os.path.join(directory, "data"), os.path.join(directory, "models")
+        # The app and tornados_scorer read these when imported, so they are set before anything imports them
+        os.environ["TORNADOS_DATA_DIR"], os.environ["TORNADOS_MODELS_DIR"] = data_dir, models_dir
+        write_stub_files(data_dir, models_dir, args.rows, args.compiled)
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=args.processes) as pool:
+            futures = [pool.submit(run_process, args.sessions, args.steps, args.seed + p * args.sessions, args.timeout)
+                       for p in range(args.processes)]
+            results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+    timings = np.array([timing for process, _, _ in results for timing in process]) * 1000
+    print(f"sessions: {args.sessions * args.processes} in {args.processes} process(es), reruns: {len(timings)}, "
+          f"failures: {sum(f for _, f, _ in results)}")
+    for name, column in (("rerun latency", timings[:, 0]), ("service time", timings[:, 1])):
+        p50, p95, p99 = np.percentile(column, [50, 95, 99])
+        print(f"{name} ms: p50 {p50:.0f}, p95 {p95:.0f}, p99 {p99:.0f}, max {column.max():.0f}")
+    print(f"throughput: {len(timings) / elapsed:.1f} reruns/s over {elapsed:.1f} s")
+    for p, (_, _, rss) in enumerate(results):
+        print(f"process {p}: peak RSS {rss:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
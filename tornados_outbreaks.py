@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+
+EARTH_RADIUS_KM = 6371.0088
+OUTBREAK_HOURS = 6.0
+OUTBREAK_KM = 300.0
+OUTBREAK_MIN_EVENTS = 6
+
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    haversine = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(haversine, 0, 1)))
+
+
+def _components(n, a, b):
+    # Union-find over the edge list, vectorized: every edge hooks the larger of its two roots under the smaller
+    # one, then pointer jumping flattens the trees so that labels[i] is again the root of i
+    labels = np.arange(n)
+    while True:
+        root_a, root_b = labels[a], labels[b]
+        linked = root_a != root_b
+        if not linked.any():
+            return labels
+        low = np.minimum(root_a[linked], root_b[linked])
+        np.minimum.at(labels, root_a[linked], low)
+        np.minimum.at(labels, root_b[linked], low)
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+
+
+class Outbreaks:
+
+    # Events are linked when they begin within `hours` and `km` of each other and an outbreak is a connected
+    # group of at least `min_events` events. Candidate pairs come from a time-sorted sweep over buckets: time
+    # is cut in windows of `hours`, space (begin points as 3D points on the sphere, whose chord is never longer
+    # than the arc) in cubes of `km`, so an event is only compared with its own and the 26 adjacent cubes of
+    # its window and of the next one.
+
+    def __init__(self, df, hours=OUTBREAK_HOURS, km=OUTBREAK_KM, min_events=OUTBREAK_MIN_EVENTS):
+        self.hours, self.km, self.min_events = hours, km, min_events
+        events = df.drop_duplicates('event_id')
+        # Events in different time zones are compared in UTC
+        events = events[events['begin_date_time_utc'].notna() & events['begin_lat'].notna() & events['begin_lon'].notna()]
+        events = events.sort_values('begin_date_time_utc', kind='stable')
+        t = (events['begin_date_time_utc'] - pd.Timestamp('2000-01-01')).dt.total_seconds().to_numpy() / 3600
+        lat, lon = events['begin_lat'].to_numpy(np.float64), events['begin_lon'].to_numpy(np.float64)
+        a, b = self._pairs(t, lat, lon)
+        labels = _components(len(events), a, b)
+        sizes = np.bincount(labels, minlength=len(events))
+        # Labels are the earliest event of every group, so numbering the kept roots in order is chronological
+        roots = np.flatnonzero((sizes >= min_events) & (labels == np.arange(len(events))))
+        outbreak_of_root = np.full(len(events), -1, dtype=np.int32)
+        outbreak_of_root[roots] = np.arange(len(roots), dtype=np.int32)
+        event_outbreak = pd.Series(outbreak_of_root[labels], index=events['event_id'].to_numpy())
+        self.by_index = pd.Series(event_outbreak.reindex(df['event_id'].to_numpy()).fillna(-1).astype(np.int32).to_numpy(),
+                                  index=df.index)
+        self.table = self._aggregate(events, outbreak_of_root[labels])
+
+    def _pairs(self, t, lat, lon):
+        n = len(t)
+        if n == 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+        phi, lam = np.radians(lat), np.radians(lon)
+        xyz = EARTH_RADIUS_KM * np.column_stack([np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)])
+        offset = int(EARTH_RADIUS_KM // self.km) + 2
+        base = 2 * offset + 1
+        cube = np.floor(xyz / self.km).astype(np.int64) + offset
+        window = np.floor((t - t.min()) / self.hours).astype(np.int64)
+        keys = ((window * base + cube[:, 0]) * base + cube[:, 1]) * base + cube[:, 2]
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        pairs_a, pairs_b = [], []
+        for dw in (0, 1):
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    for dz in (-1, 0, 1):
+                        target = sorted_keys + ((dw * base + dx) * base + dy) * base + dz
+                        lo = np.searchsorted(sorted_keys, target, 'left')
+                        counts = np.searchsorted(sorted_keys, target, 'right') - lo
+                        if not counts.any():
+                            continue
+                        i = np.repeat(np.arange(n), counts)
+                        j = np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+                        i, j = order[i], order[j]
+                        # Inside one window every pair shows up twice, keep it once
+                        keep = (i < j) if dw == 0 else np.ones(len(i), dtype=bool)
+                        keep &= np.abs(t[i] - t[j]) <= self.hours
+                        i, j = i[keep], j[keep]
+                        near = _haversine_km(lat[i], lon[i], lat[j], lon[j]) <= self.km
+                        pairs_a.append(i[near])
+                        pairs_b.append(j[near])
+        return np.concatenate(pairs_a), np.concatenate(pairs_b)
+
+    def _aggregate(self, events, outbreak):
+        events = events.assign(outbreak=outbreak)
+        events = events[events['outbreak'] >= 0]
+        fscale = pd.to_numeric(events['tor_f_scale'].str[1], errors='coerce')
+        grouped = events.assign(damages=events[['damage_property', 'damage_crops']].sum(axis=1),
+                                deaths=events['deaths_direct'] + events['deaths_indirect'],
+                                injuries=events['injuries_direct'] + events['injuries_indirect'],
+                                fscale=fscale).groupby('outbreak')
+        table = pd.DataFrame({'start': grouped['begin_date_time'].min(),
+                              'end': grouped['begin_date_time'].max(),
+                              'events': grouped.size(),
+                              'n_states': grouped['state'].nunique(),
+                              'states': grouped['state'].agg(lambda states: ', '.join(sorted(states.unique()))),
+                              'max_f_scale': grouped['fscale'].max().map(lambda f: f"F{int(f)}" if pd.notna(f) else 'unknown'),
+                              'damages': grouped['damages'].sum(),
+                              'deaths': grouped['deaths'].sum(),
+                              'injuries': grouped['injuries'].sum()})
+        table.index.name = 'outbreak'
+        return table
+
+    def label(self, outbreak):
+        row = self.table.loc[outbreak]
+        return f"{row['start']:%Y-%m-%d}, {row['events']} tornados in {row['n_states']} states"
+
+    def select(self, df, outbreaks):
+        return df[self.by_index.loc[df.index].isin(outbreaks).to_numpy()]
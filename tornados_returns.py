@@ -0,0 +1,106 @@
+import datetime as dt
+import numpy as np
+import pandas as pd
+
+
+# Return periods per state and F-scale. Distinct calendar days with at least one tornado are sorted per
+# (state, F-scale) group, plus the groups of every state over all F-scales, every F-scale over all states and
+# everything, so any single state or F-scale selection is one slice. Counting days rather than events keeps an
+# outbreak from collapsing gaps to zero. Monthly counts give seasonal rates; the waiting time to the next
+# tornado day treats them as a Poisson process with the historical rate of every calendar month.
+
+ALL = 'All'
+SEASONS = {"All year": list(range(1, 13)),
+           "Winter": [12, 1, 2],
+           "Spring": [3, 4, 5],
+           "Summer": [6, 7, 8],
+           "Autumn": [9, 10, 11]}
+MONTH_DAYS = np.array([31, 28.25, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+HORIZON_MONTHS = 120
+
+
+class ReturnPeriods:
+
+    def __init__(self, df):
+        events = df.drop_duplicates('event_id')
+        events = events[events['begin_date_time'].notna() & events['state'].notna()]
+        days = (events['begin_date_time'].dt.floor('D') - pd.Timestamp('1970-01-01')).dt.days.to_numpy(np.float64)
+        months = events['begin_date_time'].dt.month.to_numpy(np.int8)
+        state = events['state'].to_numpy(object)
+        fscale = events['tor_f_scale'].fillna('unknown').to_numpy(object)
+        everything = np.full(len(events), ALL, dtype=object)
+        # Every event is indexed four times, once per grouping
+        keys = pd.MultiIndex.from_arrays([np.concatenate([state, state, everything, everything]),
+                                          np.concatenate([fscale, everything, fscale, everything])])
+        codes, groups = keys.factorize()
+        days, months = np.tile(days, 4), np.tile(months, 4)
+        order = np.lexsort((days, codes))
+        codes, days, months = codes[order], days[order], months[order]
+        first = np.concatenate([[True], (codes[1:] != codes[:-1]) | (days[1:] != days[:-1])])
+        codes, self.days, self.months = codes[first], days[first], months[first]
+        counts = np.bincount(codes, minlength=len(groups))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        self.group = {key: i for i, key in enumerate(groups)}
+        self.gaps = np.diff(self.days, prepend=np.nan)
+        self.gaps[self.offsets[:-1][counts > 0]] = np.nan
+        self.monthly = np.bincount(codes * 12 + self.months - 1, minlength=len(groups) * 12).reshape(len(groups), 12)
+        self.years = events['begin_date_time'].dt.year.nunique() if len(events) else 0
+        self.median_gaps = {tuple(sorted(months)): self._median_gaps(codes, months) for months in SEASONS.values()}
+
+    def _in_season_gaps(self, season, months, gaps):
+        # Gaps between consecutive in-season events of the same season, not across the off-season
+        if season.all():
+            return ~np.isnan(gaps)
+        in_season = season[months - 1]
+        off_season_days = 365 - MONTH_DAYS[season].sum()
+        return in_season & np.concatenate([[False], in_season[:-1]]) & (gaps < off_season_days)
+
+    def _median_gaps(self, codes, months):
+        season = np.isin(np.arange(1, 13), months)
+        within = self._in_season_gaps(season, self.months, self.gaps)
+        medians = pd.Series(self.gaps[within]).groupby(codes[within]).median()
+        return medians.reindex(range(len(self.offsets) - 1)).to_numpy()
+
+    def query(self, state=ALL, fscale=ALL, months=None, today=None):
+        months = SEASONS["All year"] if months is None else months
+        today = dt.date.today() if today is None else today
+        group = self.group.get((state, fscale))
+        season = np.zeros(12, dtype=bool)
+        season[np.asarray(months) - 1] = True
+        monthly = np.zeros(12) if group is None else self.monthly[group]
+        event_days = int(monthly[season].sum())
+        per_year = event_days / self.years if self.years else 0.0
+        season_days = MONTH_DAYS[season].sum()
+        result = {"event_days": event_days,
+                  "per_year": per_year,
+                  "return_days": season_days / per_year if per_year else np.nan,
+                  "median_gap_days": np.nan,
+                  "last": None}
+        if group is not None and event_days:
+            start, end = self.offsets[group], self.offsets[group + 1]
+            median_gaps = self.median_gaps.get(tuple(sorted(months)))
+            if median_gaps is not None:
+                result["median_gap_days"] = median_gaps[group]
+            else:
+                gaps = self.gaps[start:end]
+                within = self._in_season_gaps(season, self.months[start:end], gaps)
+                if within.any():
+                    result["median_gap_days"] = float(np.median(gaps[within]))
+            in_season_days = self.days[start:end][season[self.months[start:end] - 1]]
+            result["last"] = (pd.Timestamp('1970-01-01') + pd.Timedelta(days=float(in_season_days[-1]))).date()
+        # Poisson waiting time: the daily rate is constant within a calendar month (zero outside the season), so
+        # the expected count is piecewise linear in the days from today
+        sequence = (today.month - 1 + np.arange(HORIZON_MONTHS)) % 12
+        lengths = MONTH_DAYS[sequence]
+        lengths[0] = max(lengths[0] - (today.day - 1), 0)
+        daily = np.where(season, monthly / max(self.years, 1) / MONTH_DAYS, 0.0)
+        ends = np.concatenate([[0], np.cumsum(lengths)])
+        expected = np.concatenate([[0], np.cumsum(daily[sequence] * lengths)])
+        result["chance_30_days"] = 1 - np.exp(-np.interp(30, ends, expected))
+        if expected[-1] < np.log(2):
+            result["median_wait_date"] = None
+        else:
+            i = np.searchsorted(expected, np.log(2))
+            wait = ends[i - 1] + (np.log(2) - expected[i - 1]) / (expected[i] - expected[i - 1]) * (ends[i] - ends[i - 1])
+            result["median_wait_date"] = today + dt.timedelta(days=int(wait))
+        return result
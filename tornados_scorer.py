@@ -0,0 +1,680 @@
+import argparse
+import io
+import json
+import os
+import re
+import time
+import unicodedata
+import numpy as np
+
+
+# Compiled scorers replace the joblib sklearn pipelines at serving time: every fitted
+# transformer and estimator is flattened into plain NumPy arrays plus a small JSON spec,
+# so scoring needs neither pandas nor sklearn. Compilation only inspects fitted attributes
+# (by class name), hence sklearn is imported only by joblib when a model is unpickled.
+
+SCORER_VERSION = 1
+MODELS_DIR = os.environ.get("TORNADOS_MODELS_DIR", "models")
+
+
+# <>>>--- COMPILING ---<<<>
+
+class _Arrays:
+
+    def __init__(self):
+        self.arrays = {}
+
+    def add(self, values, dtype=None):
+        key = f"a{len(self.arrays)}"
+        self.arrays[key] = np.asarray(values, dtype=dtype)
+        return key
+
+
+def _category_array(categories):
+    categories = np.asarray(categories)
+    if categories.dtype.kind in "biuf":
+        return categories.astype(np.float64)
+    if any(not isinstance(c, str) for c in categories):
+        raise ValueError("OneHotEncoder with missing or mixed-type categories is not supported")
+    return categories.astype(str)
+
+
+def _compile_text(vectorizer, arrays):
+    if vectorizer.analyzer != "word" or vectorizer.preprocessor is not None or vectorizer.tokenizer is not None:
+        raise ValueError("Only the default word analyzer is supported for text features")
+    if vectorizer.strip_accents not in (None, "unicode"):
+        raise ValueError(f"strip_accents={vectorizer.strip_accents!r} is not supported")
+    terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    stop_words = vectorizer.get_stop_words() or []
+    op = {"op": "text",
+          "vocabulary": arrays.add(np.array(terms, dtype=str)),
+          "stop_words": arrays.add(np.array(sorted(stop_words), dtype=str)),
+          "lowercase": bool(vectorizer.lowercase),
+          "strip_accents": vectorizer.strip_accents,
+          "token_pattern": vectorizer.token_pattern,
+          "ngram_range": list(vectorizer.ngram_range),
+          "binary": bool(vectorizer.binary),
+          "idf": None,
+          "sublinear_tf": False,
+          "norm": None}
+    if type(vectorizer).__name__ == "TfidfVectorizer":
+        op["idf"] = arrays.add(vectorizer.idf_, np.float64) if vectorizer.use_idf else None
+        op["sublinear_tf"] = bool(vectorizer.sublinear_tf)
+        op["norm"] = vectorizer.norm
+    return op
+
+
+def _compile_step(step, arrays, n_columns):
+    name = type(step).__name__
+    if name == "SimpleImputer":
+        if step.add_indicator:
+            raise ValueError("SimpleImputer(add_indicator=True) is not supported")
+        statistics = np.asarray(step.statistics_)
+        fill = statistics.astype(str) if statistics.dtype.kind == "O" else statistics.astype(np.float64)
+        return {"op": "impute", "fill": arrays.add(fill)}
+    if name == "StandardScaler":
+        mean = step.mean_ if step.with_mean else np.zeros(n_columns)
+        scale = step.scale_ if step.with_std else np.ones(n_columns)
+        return {"op": "scale", "mean": arrays.add(mean, np.float64), "scale": arrays.add(scale, np.float64)}
+    if name == "MinMaxScaler":
+        if step.clip:
+            raise ValueError("MinMaxScaler(clip=True) is not supported")
+        return {"op": "affine", "mul": arrays.add(step.scale_, np.float64), "add": arrays.add(step.min_, np.float64)}
+    if name == "MaxAbsScaler":
+        return {"op": "scale", "mean": arrays.add(np.zeros(n_columns)), "scale": arrays.add(step.scale_, np.float64)}
+    if name == "FunctionTransformer":
+        if step.func in (np.log1p, np.log, np.sqrt, np.expm1, np.exp) and not step.kw_args:
+            return {"op": "ufunc", "func": step.func.__name__}
+        if step.func is None:
+            return None
+        raise ValueError(f"FunctionTransformer({step.func!r}) is not supported")
+    if name in ("SelectKBest", "SelectPercentile", "VarianceThreshold", "SelectFromModel", "RFE", "RFECV"):
+        return {"op": "select", "support": arrays.add(np.flatnonzero(step.get_support()), np.int64)}
+    raise ValueError(f"Unsupported transformer: {name}")
+
+
+def _steps(transformer):
+    if type(transformer).__name__ == "Pipeline":
+        return [step for _, step in transformer.steps if step not in (None, "passthrough")]
+    return [transformer]
+
+
+def _compile_block(columns, transformer, arrays, inputs):
+    steps = _steps(transformer)
+    ops = []
+    width = len(columns)
+    kind = "numeric"
+    for step in steps:
+        name = type(step).__name__
+        if name == "OneHotEncoder":
+            if getattr(step, "_infrequent_enabled", False):
+                raise ValueError("OneHotEncoder with infrequent categories is not supported")
+            if step.handle_unknown not in ("ignore", "error", "infrequent_if_exist"):
+                raise ValueError(f"handle_unknown={step.handle_unknown!r} is not supported")
+            drop_idx = getattr(step, "drop_idx_", None)
+            categories = [arrays.add(_category_array(c)) for c in step.categories_]
+            drops = [-1 if drop_idx is None or drop_idx[i] is None else int(drop_idx[i]) for i in range(len(columns))]
+            ops.append({"op": "onehot",
+                        "categories": categories,
+                        "drop": drops,
+                        "unknown": "error" if step.handle_unknown == "error" else "ignore"})
+            width = sum(len(arrays.arrays[c]) - (d >= 0) for c, d in zip(categories, drops))
+            kind = "category"
+            for column, category in zip(columns, categories):
+                inputs[column] = {"kind": "category", "categories": category}
+        elif name in ("TfidfVectorizer", "CountVectorizer"):
+            if isinstance(columns, list) and len(columns) != 1:
+                raise ValueError("Text vectorizers must be applied to a single column")
+            op = _compile_text(step, arrays)
+            ops.append(op)
+            width = len(arrays.arrays[op["vocabulary"]])
+            kind = "text"
+            inputs[columns[0]] = {"kind": "text", "vocabulary": op["vocabulary"]}
+        else:
+            op = _compile_step(step, arrays, width)
+            if op is not None:
+                ops.append(op)
+                if op["op"] == "select":
+                    width = len(arrays.arrays[op["support"]])
+    if kind == "numeric":
+        for column in columns:
+            inputs.setdefault(column, {"kind": "numeric"})
+    return {"columns": list(columns), "ops": ops, "width": width}
+
+
+def _compile_preprocessor(preprocessor, arrays, inputs):
+    names = list(getattr(preprocessor, "feature_names_in_", []))
+    blocks = []
+    for _, transformer, columns in preprocessor.transformers_:
+        if transformer == "drop":
+            continue
+        if isinstance(columns, str):
+            columns = [columns]
+        elif isinstance(columns, slice) or callable(columns):
+            raise ValueError("ColumnTransformer column selectors must be explicit column lists")
+        columns = list(columns)
+        if columns and np.asarray(columns).dtype == bool:
+            columns = [n for n, keep in zip(names, columns) if keep]
+        columns = [names[c] if isinstance(c, (int, np.integer)) else c for c in columns]
+        if not len(columns):
+            continue
+        if transformer == "passthrough":
+            blocks.append({"columns": columns, "ops": [], "width": len(columns)})
+            for column in columns:
+                inputs.setdefault(column, {"kind": "numeric"})
+        else:
+            blocks.append(_compile_block(columns, transformer, arrays, inputs))
+    return blocks
+
+
+def _compile_trees(trees, arrays, values, cast32):
+    offsets = np.cumsum([0] + [len(left) for left, _, _, _, _ in trees])
+    left = np.concatenate([np.where(t[0] >= 0, t[0] + o, -1) for t, o in zip(trees, offsets)])
+    right = np.concatenate([np.where(t[1] >= 0, t[1] + o, -1) for t, o in zip(trees, offsets)])
+    feature = np.concatenate([np.maximum(t[2], 0) for t in trees])
+    threshold = np.concatenate([t[3] for t in trees])
+    missing_left = np.concatenate([t[4] for t in trees])
+    depth = 0
+    for t in trees:
+        level, nodes = 0, np.array([0])
+        while nodes.size:
+            children = np.concatenate([t[0][nodes], t[1][nodes]])
+            nodes = children[children >= 0]
+            level += bool(nodes.size)
+        depth = max(depth, level)
+    return {"roots": arrays.add(offsets[:-1], np.int64),
+            "left": arrays.add(left, np.int64),
+            "right": arrays.add(right, np.int64),
+            "feature": arrays.add(feature, np.int64),
+            "threshold": arrays.add(threshold, np.float64),
+            "missing_left": arrays.add(missing_left, bool),
+            "values": arrays.add(np.concatenate(values), np.float64),
+            "depth": int(depth),
+            "cast32": cast32}
+
+
+def _sklearn_tree(tree, classifier):
+    t = tree.tree_
+    missing_left = getattr(t, "missing_go_to_left", np.zeros(t.node_count, dtype=bool))
+    nodes = (t.children_left, t.children_right, t.feature, t.threshold, np.asarray(missing_left, dtype=bool))
+    value = t.value[:, 0, :]
+    if classifier:
+        value = value / np.maximum(value.sum(axis=1, keepdims=True), 1e-300)
+    else:
+        value = value[:, 0]
+    return nodes, value
+
+
+def _compile_estimator(estimator, arrays):
+    name = type(estimator).__name__
+    classifier = hasattr(estimator, "classes_")
+    if hasattr(estimator, "coef_") and hasattr(estimator, "intercept_"):
+        coef = np.atleast_2d(np.asarray(estimator.coef_, dtype=np.float64))
+        intercept = np.atleast_1d(np.asarray(estimator.intercept_, dtype=np.float64))
+        link = "identity"
+        if classifier:
+            if name != "LogisticRegression":
+                link = "decision"
+            elif coef.shape[0] == 1:
+                link = "logistic"
+            elif getattr(estimator, "multi_class", "auto") == "ovr" or estimator.solver == "liblinear":
+                link = "ovr"
+            else:
+                link = "softmax"
+        return {"type": "linear", "coef": arrays.add(coef.T), "intercept": arrays.add(intercept), "link": link}
+    if name in ("DecisionTreeRegressor", "DecisionTreeClassifier", "ExtraTreeRegressor", "ExtraTreeClassifier"):
+        trees = [_sklearn_tree(estimator, classifier)]
+    elif name in ("RandomForestRegressor", "RandomForestClassifier", "ExtraTreesRegressor", "ExtraTreesClassifier"):
+        trees = [_sklearn_tree(tree, classifier) for tree in estimator.estimators_]
+    elif name in ("GradientBoostingRegressor", "GradientBoostingClassifier"):
+        if not (estimator.init_ == "zero" or type(estimator.init_).__name__.startswith("Dummy")):
+            raise ValueError("GradientBoosting with a custom init estimator is not supported")
+        stages = estimator.estimators_
+        init = estimator._raw_predict_init(np.zeros((1, estimator.n_features_in_), dtype=np.float32))[0]
+        trees, values, tree_class = [], [], []
+        for stage in stages:
+            for k, tree in enumerate(stage):
+                nodes, value = _sklearn_tree(tree, False)
+                trees.append(nodes)
+                values.append(value * estimator.learning_rate)
+                tree_class.append(k)
+        link = "identity" if not classifier else ("logistic" if len(init) == 1 else "softmax")
+        spec = _compile_trees(trees, arrays, values, True)
+        spec.update({"type": "boosting", "init": arrays.add(init, np.float64),
+                     "tree_class": arrays.add(tree_class, np.int64), "link": link})
+        return spec
+    elif name in ("HistGradientBoostingRegressor", "HistGradientBoostingClassifier"):
+        if getattr(estimator, "_preprocessor", None) is not None:
+            raise ValueError("HistGradientBoosting with categorical features is not supported")
+        trees, values, tree_class = [], [], []
+        for predictors in estimator._predictors:
+            for k, predictor in enumerate(predictors):
+                nodes = predictor.nodes
+                if nodes["is_categorical"].any():
+                    raise ValueError("HistGradientBoosting with categorical splits is not supported")
+                leaf = nodes["is_leaf"].astype(bool)
+                trees.append((np.where(leaf, -1, nodes["left"].astype(np.int64)),
+                              np.where(leaf, -1, nodes["right"].astype(np.int64)),
+                              nodes["feature_idx"].astype(np.int64),
+                              nodes["num_threshold"].astype(np.float64),
+                              nodes["missing_go_to_left"].astype(bool)))
+                values.append(nodes["value"].astype(np.float64))
+                tree_class.append(k)
+        links = {"IdentityLink": "identity", "LogLink": "exp", "LogitLink": "logistic", "MultinomialLogit": "softmax"}
+        link = links.get(type(estimator._loss.link).__name__)
+        if link is None:
+            raise ValueError(f"Unsupported HistGradientBoosting link: {type(estimator._loss.link).__name__}")
+        spec = _compile_trees(trees, arrays, values, False)
+        spec.update({"type": "boosting", "init": arrays.add(np.ravel(estimator._baseline_prediction), np.float64),
+                     "tree_class": arrays.add(tree_class, np.int64), "link": link})
+        return spec
+    else:
+        raise ValueError(f"Unsupported estimator: {name}")
+    nodes = [t for t, _ in trees]
+    values = [v for _, v in trees]
+    spec = _compile_trees(nodes, arrays, values, True)
+    spec.update({"type": "forest", "link": "proba" if classifier else "identity"})
+    return spec
+
+
+def _fold_linear(estimator, post, arrays):
+    # Post-preprocessing steps are folded into the coefficients so that linear
+    # models can be scored block by block without materializing the feature matrix
+    coef = arrays.arrays[estimator["coef"]]
+    intercept = arrays.arrays[estimator["intercept"]].copy()
+    for op in reversed(post):
+        if op["op"] == "select":
+            support = arrays.arrays[op["support"]]
+            full = np.zeros((int(op["width"]), coef.shape[1]))
+            full[support] = coef
+            coef = full
+        elif op["op"] == "scale":
+            scale = arrays.arrays[op["scale"]]
+            mean = arrays.arrays[op["mean"]]
+            coef = coef / scale[:, None]
+            intercept = intercept - mean @ coef
+        elif op["op"] == "affine":
+            intercept = intercept + arrays.arrays[op["add"]] @ coef
+            coef = coef * arrays.arrays[op["mul"]][:, None]
+        else:
+            raise ValueError(f"Cannot fold {op['op']} into a linear model")
+    estimator["coef"] = arrays.add(coef)
+    estimator["intercept"] = arrays.add(intercept)
+    return estimator
+
+
+def compile_model(model):
+    arrays = _Arrays()
+    inputs = {}
+    target = None
+    if type(model).__name__ == "TransformedTargetRegressor":
+        if model.transformer_ is not None and type(model.transformer_).__name__ != "FunctionTransformer":
+            raise ValueError("TransformedTargetRegressor with a fitted transformer is not supported")
+        inverse = model.transformer_.inverse_func if model.transformer_ is not None else None
+        if inverse not in (None, np.expm1, np.exp):
+            raise ValueError(f"Unsupported target inverse function: {inverse!r}")
+        target = inverse.__name__ if inverse is not None else None
+        model = model.regressor_
+    steps = _steps(model)
+    preprocessor, estimator = None, steps[-1]
+    steps = steps[:-1]
+    if steps and type(steps[0]).__name__ == "ColumnTransformer":
+        preprocessor = steps.pop(0)
+    if preprocessor is not None:
+        blocks = _compile_preprocessor(preprocessor, arrays, inputs)
+    else:
+        columns = list(getattr(model, "feature_names_in_", getattr(estimator, "feature_names_in_", [])))
+        if not columns:
+            raise ValueError("Model was not fitted on named columns")
+        blocks = [{"columns": columns, "ops": [], "width": len(columns)}]
+        inputs = {column: {"kind": "numeric"} for column in columns}
+    width = sum(block["width"] for block in blocks)
+    post = []
+    for step in steps:
+        op = _compile_step(step, arrays, width)
+        if op is None:
+            continue
+        op["width"] = width
+        post.append(op)
+        if op["op"] == "select":
+            width = len(arrays.arrays[op["support"]])
+    compiled = _compile_estimator(estimator, arrays)
+    if compiled["type"] == "linear" and post:
+        compiled = _fold_linear(compiled, post, arrays)
+        post = []
+    classes = getattr(estimator, "classes_", None)
+    spec = {"version": SCORER_VERSION,
+            "inputs": [dict(name=name, **info) for name, info in inputs.items()],
+            "blocks": blocks,
+            "post": post,
+            "estimator": compiled,
+            "classes": None if classes is None else np.asarray(classes).tolist(),
+            "target": target}
+    return CompiledScorer(spec, arrays.arrays)
+
+
+# <>>>--- SCORING ---<<<>
+
+def _strip_accents(text):
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def _sigmoid(x):
+    # exp of a non-positive margin cannot overflow, whatever the sign of x
+    e = np.exp(-np.abs(x))
+    return np.where(x >= 0, 1.0 / (1.0 + e), e / (1.0 + e))
+
+
+def _softmax(x):
+    x = np.exp(x - x.max(axis=1, keepdims=True))
+    return x / x.sum(axis=1, keepdims=True)
+
+
+class CompiledScorer:
+
+    def __init__(self, spec, arrays):
+        self.spec = spec
+        self.arrays = arrays
+        self.classes_ = None if spec["classes"] is None else np.asarray(spec["classes"])
+        self.feature_names_in_ = np.array([i["name"] for i in spec["inputs"]], dtype=object)
+        self._text = {}
+        for block in spec["blocks"]:
+            for op in block["ops"]:
+                if op["op"] == "text":
+                    vocabulary = arrays[op["vocabulary"]]
+                    self._text[op["vocabulary"]] = ({term: i for i, term in enumerate(vocabulary.tolist())},
+                                                    frozenset(arrays[op["stop_words"]].tolist()),
+                                                    re.compile(op["token_pattern"]))
+
+    def _columns(self, X, columns):
+        values = [np.atleast_1d(np.asarray(X[column])) for column in columns]
+        n_rows = max(len(v) for v in values)
+        return [np.broadcast_to(v, (n_rows,)) if len(v) == 1 else v for v in values], n_rows
+
+    def _onehot(self, op, values, n_rows):
+        parts = []
+        for key, drop, column in zip(op["categories"], op["drop"], values):
+            categories = self.arrays[key]
+            # Cast to an unbounded str, not the categories' fixed width, which would cut longer unknown values
+            column = column.astype(str) if categories.dtype.kind == "U" else column.astype(categories.dtype)
+            index = np.searchsorted(categories, column)
+            index_clipped = np.minimum(index, len(categories) - 1)
+            known = (index < len(categories)) & (categories[index_clipped] == column)
+            if op["unknown"] == "error" and not known.all():
+                raise ValueError(f"Found unknown categories {np.unique(column[~known]).tolist()}")
+            encoded = np.zeros((n_rows, len(categories)))
+            encoded[np.flatnonzero(known), index_clipped[known]] = 1.0
+            parts.append(np.delete(encoded, drop, axis=1) if drop >= 0 else encoded)
+        return np.hstack(parts)
+
+    def _tokens(self, op, text):
+        vocabulary, stop_words, pattern = self._text[op["vocabulary"]]
+        if op["lowercase"]:
+            text = text.lower()
+        if op["strip_accents"] == "unicode":
+            text = _strip_accents(text)
+        words = [w for w in pattern.findall(text) if w not in stop_words]
+        min_n, max_n = op["ngram_range"]
+        terms = words if min_n == 1 else []
+        for n in range(max(min_n, 2), max_n + 1):
+            terms += [" ".join(words[i: i + n]) for i in range(len(words) - n + 1)]
+        return [vocabulary[t] for t in terms if t in vocabulary]
+
+    def _vectorize(self, op, texts):
+        width = len(self.arrays[op["vocabulary"]])
+        texts = np.asarray(texts, dtype=object)
+        # Like the sklearn vectorizers, refuse missing documents rather than scoring them as the text "None"
+        if any(not isinstance(text, str) for text in texts):
+            raise ValueError("Text features must be strings, missing values are not supported")
+        unique, inverse = np.unique(texts.astype(str), return_inverse=True)
+        matrix = np.zeros((len(unique), width))
+        for row, text in enumerate(unique):
+            np.add.at(matrix[row], self._tokens(op, text), 1.0)
+        if op["binary"]:
+            matrix = np.minimum(matrix, 1.0)
+        elif op["sublinear_tf"]:
+            counted = matrix > 0
+            matrix[counted] = np.log(matrix[counted]) + 1.0
+        if op["idf"] is not None:
+            matrix *= self.arrays[op["idf"]]
+        if op["norm"] == "l2":
+            matrix /= np.maximum(np.sqrt((matrix ** 2).sum(axis=1, keepdims=True)), 1e-300)
+        elif op["norm"] == "l1":
+            matrix /= np.maximum(np.abs(matrix).sum(axis=1, keepdims=True), 1e-300)
+        return matrix, inverse.ravel()
+
+    def _impute(self, column, fill):
+        if isinstance(fill, str):
+            missing = np.fromiter((v is None or v != v for v in column), dtype=bool, count=len(column))
+            return np.where(missing, fill, column.astype(object))
+        column = column.astype(np.float64)
+        return np.where(np.isnan(column), fill, column)
+
+    def _apply(self, op, matrix):
+        if op["op"] == "impute":
+            return np.where(np.isnan(matrix), self.arrays[op["fill"]], matrix)
+        if op["op"] == "scale":
+            return (matrix - self.arrays[op["mean"]]) / self.arrays[op["scale"]]
+        if op["op"] == "affine":
+            return matrix * self.arrays[op["mul"]] + self.arrays[op["add"]]
+        if op["op"] == "ufunc":
+            return getattr(np, op["func"])(matrix)
+        if op["op"] == "select":
+            return matrix[:, self.arrays[op["support"]]]
+        raise ValueError(f"Unknown operation: {op['op']}")
+
+    def _block(self, block, X):
+        # Raw columns stay a list until an encoder or a numeric step turns them into a matrix
+        data, n_rows = self._columns(X, block["columns"])
+        rows = None
+        for op in block["ops"]:
+            if op["op"] == "onehot":
+                data = self._onehot(op, data, n_rows)
+            elif op["op"] == "text":
+                data, rows = self._vectorize(op, data[0])
+            elif op["op"] == "impute" and isinstance(data, list):
+                fill = self.arrays[op["fill"]].tolist()
+                data = [self._impute(column, value) for column, value in zip(data, fill)]
+            else:
+                if isinstance(data, list):
+                    data = np.column_stack([column.astype(np.float64) for column in data])
+                data = self._apply(op, data)
+        if isinstance(data, list):
+            data = np.column_stack([column.astype(np.float64) for column in data])
+        # Text blocks keep one row per distinct document, rows maps them back
+        return data, rows, n_rows
+
+    def transform(self, X):
+        parts = []
+        for block in self.spec["blocks"]:
+            matrix, rows, n_rows = self._block(block, X)
+            parts.append(matrix[rows] if rows is not None else matrix)
+        n_rows = max(len(p) for p in parts)
+        matrix = np.hstack([np.broadcast_to(p, (n_rows, p.shape[1])) for p in parts])
+        for op in self.spec["post"]:
+            matrix = self._apply(op, matrix)
+        return matrix
+
+    def _linear(self, X):
+        estimator = self.spec["estimator"]
+        coef = self.arrays[estimator["coef"]]
+        score, start = 0.0, 0
+        for block in self.spec["blocks"]:
+            matrix, rows, n_rows = self._block(block, X)
+            width = matrix.shape[1]
+            part = matrix @ coef[start: start + width]
+            score = score + (part[rows] if rows is not None else part)
+            start += width
+        return np.atleast_2d(score + self.arrays[estimator["intercept"]])
+
+    def _leaves(self, matrix):
+        estimator = self.spec["estimator"]
+        a = self.arrays
+        left, right = a[estimator["left"]], a[estimator["right"]]
+        feature, threshold, missing_left = a[estimator["feature"]], a[estimator["threshold"]], a[estimator["missing_left"]]
+        if estimator["cast32"]:
+            matrix = matrix.astype(np.float32)
+        roots = a[estimator["roots"]]
+        nodes = np.broadcast_to(roots, (len(matrix), len(roots))).copy()
+        rows = np.arange(len(matrix))[:, None]
+        for _ in range(estimator["depth"]):
+            x = matrix[rows, feature[nodes]]
+            go_left = (x <= threshold[nodes]) | (np.isnan(x) & missing_left[nodes])
+            child = np.where(go_left, left[nodes], right[nodes])
+            nodes = np.where(child >= 0, child, nodes)
+        return a[estimator["values"]][nodes]
+
+    def _raw(self, X):
+        estimator = self.spec["estimator"]
+        if estimator["type"] == "linear":
+            return self._linear(X)
+        leaves = self._leaves(self.transform(X))
+        if estimator["type"] == "forest":
+            return leaves.mean(axis=1) if leaves.ndim == 3 else leaves.mean(axis=1)[:, None]
+        init = self.arrays[estimator["init"]]
+        tree_class = self.arrays[estimator["tree_class"]]
+        return init + np.column_stack([leaves[:, tree_class == k].sum(axis=1) for k in range(len(init))])
+
+    def _proba(self, raw):
+        link = self.spec["estimator"]["link"]
+        if link == "proba":
+            return raw
+        if link == "logistic":
+            p = _sigmoid(raw[:, 0])
+            return np.column_stack([1 - p, p])
+        if link == "softmax":
+            return _softmax(raw)
+        if link == "ovr":
+            p = _sigmoid(raw)
+            return p / p.sum(axis=1, keepdims=True)
+        raise ValueError("This model does not support predict_proba")
+
+    def predict_proba(self, X):
+        if self.classes_ is None:
+            raise ValueError("predict_proba is only available for classifiers")
+        return self._proba(self._raw(X))
+
+    def predict(self, X):
+        raw = self._raw(X)
+        if self.classes_ is not None:
+            if self.spec["estimator"]["link"] == "decision":
+                index = (raw[:, 0] > 0).astype(int) if raw.shape[1] == 1 else raw.argmax(axis=1)
+            else:
+                index = self._proba(raw).argmax(axis=1)
+            return self.classes_[index]
+        link = self.spec["estimator"]["link"]
+        prediction = np.exp(raw[:, 0]) if link == "exp" else raw[:, 0]
+        if self.spec["target"] is not None:
+            prediction = getattr(np, self.spec["target"])(prediction)
+        return prediction
+
+
+def save_scorer(scorer, path):
+    arrays = dict(scorer.arrays)
+    arrays["spec"] = np.array(json.dumps(scorer.spec))
+    np.savez_compressed(path, **arrays)
+
+
+def load_scorer(path):
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {key: data[key] for key in data.files}
+    spec = json.loads(str(arrays.pop("spec")))
+    if spec["version"] != SCORER_VERSION:
+        raise ValueError(f"Scorer {path} has version {spec['version']}, expected {SCORER_VERSION}")
+    return CompiledScorer(spec, arrays)
+
+
+# <>>>--- EXPORT ---<<<>
+
+def sample_inputs(scorer, n_rows=256, seed=0):
+    rng = np.random.default_rng(seed)
+    sample = {}
+    for column in scorer.spec["inputs"]:
+        if column["kind"] == "category":
+            sample[column["name"]] = rng.choice(scorer.arrays[column["categories"]], n_rows)
+        elif column["kind"] == "text":
+            vocabulary = scorer.arrays[column["vocabulary"]]
+            words = rng.choice(vocabulary, (n_rows, 12))
+            sample[column["name"]] = np.array([" ".join(w) for w in words], dtype=object)
+        else:
+            sample[column["name"]] = np.round(rng.lognormal(3, 2, n_rows), 2)
+    return sample
+
+
+def check_parity(model, scorer, X, method="predict", rtol=1e-6, atol=1e-8):
+    import pandas as pd
+    expected = getattr(model, method)(pd.DataFrame(X))
+    actual = getattr(scorer, method)(X)
+    if expected.dtype.kind in "OUSb" or (method == "predict" and scorer.classes_ is not None):
+        mismatches = int((np.asarray(expected) != np.asarray(actual)).sum())
+    else:
+        mismatches = int((~np.isclose(np.asarray(expected, dtype=np.float64), actual, rtol=rtol, atol=atol)).sum())
+    return mismatches
+
+
+def benchmark(model, scorer, X, repeat=200):
+    import pandas as pd
+    row = {column: [np.asarray(values)[0]] for column, values in X.items()}
+    timings = {}
+    for name, predict in (("sklearn", lambda: model.predict(pd.DataFrame(row))),
+                          ("compiled", lambda: scorer.predict(row))):
+        runs = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            predict()
+            runs.append(time.perf_counter() - start)
+        timings[name] = np.median(runs) * 1e6
+    return timings
+
+
+def export_model(model, path, n_check=256):
+    scorer = compile_model(model)
+    save_scorer(scorer, path)
+    scorer = load_scorer(path)
+    X = sample_inputs(scorer, n_check)
+    methods = ["predict"] + (["predict_proba"] if scorer.classes_ is not None and scorer.spec["estimator"]["link"] != "decision" else [])
+    for method in methods:
+        mismatches = check_parity(model, scorer, X, method)
+        if mismatches:
+            os.remove(path)
+            raise ValueError(f"Compiled scorer disagrees with {method} on {mismatches} of {n_check} rows")
+    return scorer, benchmark(model, scorer, X)
+
+
+def read_model_links(path="links.txt"):
+    links = {}
+    with open(path, "r") as f:
+        for line in f:
+            name, _, url = line.partition(":")
+            if name.strip().endswith("_model"):
+                links[name.strip()] = url.strip()
+    return links
+
+
+def main():
+    import joblib
+    import requests
+    parser = argparse.ArgumentParser(description="Compile the joblib models from links.txt into NumPy-only scorers")
+    parser.add_argument("models", nargs="*", help="model names from links.txt, all by default")
+    parser.add_argument("--source", help="directory with local <name>.joblib files instead of Google Drive")
+    parser.add_argument("--output", default=MODELS_DIR)
+    args = parser.parse_args()
+    os.makedirs(args.output, exist_ok=True)
+    links = read_model_links()
+    for name in args.models or links:
+        if args.source:
+            model = joblib.load(os.path.join(args.source, f"{name}.joblib"))
+        else:
+            response = requests.get(links[name])
+            response.raise_for_status()
+            model = joblib.load(io.BytesIO(response.content))
+        try:
+            _, timings = export_model(model, os.path.join(args.output, f"{name}.npz"))
+        except ValueError as e:
+            print(f"{name}: not compiled, {e}")
+            continue
+        print(f"{name}: sklearn {timings['sklearn']:.0f} us, compiled {timings['compiled']:.0f} us per row")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import re
+import numpy as np
+import pandas as pd
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+PHRASE_PATTERN = re.compile(r'"([^"]*)"')
+
+
+def tokenize(text):
+    if not isinstance(text, str):
+        return []
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def canonical_query(query):
+    # Queries that match the same rows with the same scores give the same string: lowercased terms in sorted
+    # order, then the phrases of several words, quoted
+    phrases = [tokenize(p) for p in PHRASE_PATTERN.findall(query)]
+    words = tokenize(PHRASE_PATTERN.sub(' ', query)) + [p[0] for p in phrases if len(p) == 1]
+    phrases = sorted({' '.join(p) for p in phrases if len(p) > 1})
+    return ' '.join(sorted(set(words)) + [f'"{p}"' for p in phrases])
+
+
+class SearchIndex:
+
+    # Inverted index over the narrative columns, one document per row of the data frame.
+    # Postings are kept in CSR-like arrays: term_ptr[t]:term_ptr[t + 1] slices the documents
+    # (and term frequencies) of term t, occ_ptr slices its (document, position) occurrences.
+
+    def __init__(self, df, columns=('event_narrative', 'episode_narrative'), k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.n_docs = len(df)
+        tokens, docs, positions = [], [], []
+        for doc, texts in enumerate(zip(*(df[column].tolist() for column in columns))):
+            offset = 0
+            for text in texts:
+                words = tokenize(text)
+                tokens += words
+                docs += [doc] * len(words)
+                positions += range(offset, offset + len(words))
+                # A gap keeps phrases from matching across the end of one narrative and the start of the next
+                offset += len(words) + 1
+        term_ids, terms = pd.factorize(pd.Series(tokens, dtype=object))
+        self.terms = {term: i for i, term in enumerate(terms)}
+        docs = np.asarray(docs, dtype=np.int32)
+        positions = np.asarray(positions, dtype=np.int32)
+        order = np.lexsort((positions, docs, term_ids))
+        self.occ_terms = term_ids[order].astype(np.int32)
+        self.occ_docs = docs[order]
+        self.occ_pos = positions[order]
+        self.occ_ptr = np.searchsorted(self.occ_terms, np.arange(len(terms) + 1)).astype(np.int64)
+        self.position_stride = int(positions.max()) + 2 if len(positions) else 1
+        pair_start = np.ones(len(order), dtype=bool)
+        pair_start[1:] = (self.occ_terms[1:] != self.occ_terms[:-1]) | (self.occ_docs[1:] != self.occ_docs[:-1])
+        starts = np.flatnonzero(pair_start)
+        self.post_docs = self.occ_docs[starts]
+        self.post_tf = np.diff(np.append(starts, len(order))).astype(np.int32)
+        self.term_ptr = np.searchsorted(self.occ_terms[starts], np.arange(len(terms) + 1)).astype(np.int64)
+        self.doc_len = np.bincount(docs, minlength=self.n_docs).astype(np.float32)
+        self.avg_doc_len = float(self.doc_len.mean()) if self.n_docs else 0.0
+        document_frequency = np.diff(self.term_ptr)
+        self.idf = np.log(1 + (self.n_docs - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def _postings(self, term_id):
+        start, end = self.term_ptr[term_id], self.term_ptr[term_id + 1]
+        return self.post_docs[start:end], self.post_tf[start:end]
+
+    def _phrase_docs(self, term_ids):
+        keys = None
+        for shift, term_id in enumerate(term_ids):
+            start, end = self.occ_ptr[term_id], self.occ_ptr[term_id + 1]
+            term_keys = self.occ_docs[start:end].astype(np.int64) * self.position_stride + self.occ_pos[start:end] - shift
+            keys = term_keys if keys is None else np.intersect1d(keys, term_keys, assume_unique=True)
+        return np.unique(keys // self.position_stride)
+
+    def search(self, query):
+        phrases = [tokenize(p) for p in PHRASE_PATTERN.findall(query)]
+        words = tokenize(PHRASE_PATTERN.sub(' ', query))
+        terms = list(dict.fromkeys(words + [w for p in phrases for w in p]))
+        if not terms:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+        if any(term not in self.terms for term in terms):
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        matches = np.zeros(self.n_docs, dtype=np.int32)
+        for term in terms:
+            term_id = self.terms[term]
+            docs, tf = self._postings(term_id)
+            norm = self.k1 * (1 - self.b + self.b * self.doc_len[docs] / self.avg_doc_len)
+            scores[docs] += self.idf[term_id] * tf * (self.k1 + 1) / (tf + norm)
+            matches[docs] += 1
+        hits = matches == len(terms)
+        for phrase in phrases:
+            if len(phrase) > 1:
+                phrase_hits = np.zeros(self.n_docs, dtype=bool)
+                phrase_hits[self._phrase_docs([self.terms[w] for w in phrase])] = True
+                hits &= phrase_hits
+        docs = np.flatnonzero(hits)
+        order = np.argsort(-scores[docs], kind='stable')
+        return docs[order], scores[docs[order]]
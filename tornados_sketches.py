@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+from tornados_core import WEEKDAYS, DAY_PARTS, code_labels
+
+
+# Mergeable summaries per (year, month, F-scale) cell, the dimensions every tab filters on. Sums, non-null
+# counts and maxima merge exactly and categorical modes merge as count vectors. Quantiles come from
+# log-bucketed histograms (DDSketch): a value x falls in bucket ceil(log_gamma |x|), so the value read back
+# from a bucket is within ALPHA relative error of the exact quantile however many cells are merged.
+
+CELL_COLUMNS = ['year', 'month_name', 'tor_f_scale']
+SUM_MEASURES = ['fatalities', 'damages', 'damage_property', 'damage_crops', 'injuries', 'injuries_direct',
+                'injuries_indirect', 'deaths', 'deaths_direct', 'deaths_indirect', 'fatality_age',
+                'tor_duration_minutes', 'tor_width', 'tor_length']
+QUANTILE_MEASURES = ['damages', 'damage_property', 'damage_crops', 'tor_duration_minutes', 'tor_width', 'tor_length']
+MODE_MEASURES = ['weekday', 'day_part', 'fatality_location', 'fatality_sex']
+PERCENTILES = (0.5, 0.9, 0.99)
+
+ALPHA = 0.01
+GAMMA = (1 + ALPHA) / (1 - ALPHA)
+MIN_VALUE = 1e-6
+# Keys are ZERO_KEY for |x| < MIN_VALUE and ZERO_KEY +- (bucket + OFFSET) otherwise, so sorting keys sorts values
+OFFSET = 1024
+ZERO_KEY = 4096
+KEYSPACE = 2 * ZERO_KEY
+
+
+def _bucket_keys(values):
+    magnitude = np.abs(values)
+    bucket = np.ceil(np.log(np.maximum(magnitude, MIN_VALUE)) / np.log(GAMMA))
+    bucket = np.clip(bucket, 1 - OFFSET, ZERO_KEY - OFFSET - 1) + OFFSET
+    return np.where(magnitude < MIN_VALUE, ZERO_KEY, ZERO_KEY + np.sign(values) * bucket).astype(np.int64)
+
+
+def _bucket_values(keys):
+    offset = keys - ZERO_KEY
+    return np.where(offset == 0, 0.0, np.sign(offset) * 2 * GAMMA ** (np.abs(offset) - OFFSET) / (GAMMA + 1))
+
+
+def _ranked(sorted_values, counts, qs):
+    # Lower quantile: the value at rank floor(q * (n - 1)) of the expanded, sorted values
+    cumulative = np.cumsum(counts)
+    if len(cumulative) == 0 or cumulative[-1] == 0:
+        return np.full(len(qs), np.nan)
+    ranks = np.asarray(qs, dtype=np.float64) * (cumulative[-1] - 1)
+    return sorted_values[np.minimum(np.searchsorted(cumulative, ranks, 'right'), len(sorted_values) - 1)]
+
+
+def exact_quantiles(values, qs=PERCENTILES, weights=None):
+    values = np.asarray(values, dtype=np.float64)
+    present = ~np.isnan(values)
+    weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=np.float64)
+    order = np.argsort(values[present], kind='stable')
+    return _ranked(values[present][order], weights[present][order], qs)
+
+
+def metric_values(df, name):
+    # The rows behind a metric; weekday, day part and fatalities are derived from other columns
+    if name == 'weekday':
+        return code_labels(df['begin_weekday'], WEEKDAYS)
+    if name == 'day_part':
+        return code_labels(df['begin_day_part'], DAY_PARTS)
+    if name == 'fatalities':
+        return df['fatality_id'].notna().astype(np.float64)
+    return df[name]
+
+
+def sketch_values(df):
+    values = pd.DataFrame({'fatalities': metric_values(df, 'fatalities'),
+                           'damages': df[['damage_property', 'damage_crops']].sum(axis=1, min_count=1),
+                           'injuries': df['injuries_direct'] + df['injuries_indirect'],
+                           'deaths': df['deaths_direct'] + df['deaths_indirect']}, index=df.index)
+    values = pd.concat([values, df[[m for m in SUM_MEASURES if m not in values]]], axis=1)[SUM_MEASURES].astype(np.float64)
+    categories = pd.DataFrame({name: metric_values(df, name) for name in MODE_MEASURES}, index=df.index)
+    return values, categories
+
+
+class SketchCube:
+
+    def __init__(self, df):
+        grouped = df.groupby(CELL_COLUMNS, dropna=False, sort=True)
+        cell = grouped.ngroup().to_numpy()
+        self.keys = grouped.size().index
+        n = len(self.keys)
+        values, categories = sketch_values(df)
+        first = ~df['event_id'].duplicated().to_numpy() & df['event_id'].notna().to_numpy()
+        self.events = np.bincount(cell[first], minlength=n)
+        by_cell = values.groupby(cell)
+        self.sums = by_cell.sum().to_numpy()
+        self.counts = by_cell.count().to_numpy()
+        self.maxima = by_cell.max().to_numpy()
+        self.modes = {}
+        for name in MODE_MEASURES:
+            codes, labels = pd.factorize(categories[name], sort=True)
+            present = codes >= 0
+            counts = np.bincount(cell[present] * len(labels) + codes[present], minlength=n * len(labels))
+            self.modes[name] = (labels, counts.reshape(n, len(labels)))
+        self.sketches = {}
+        for name in QUANTILE_MEASURES:
+            column = values[name].to_numpy()
+            present = ~np.isnan(column)
+            entries, counts = np.unique(cell[present] * KEYSPACE + _bucket_keys(column[present]), return_counts=True)
+            self.sketches[name] = (entries // KEYSPACE, entries % KEYSPACE, counts)
+
+    def select(self, years=None, months=None, fscales=None):
+        mask = np.ones(len(self.keys), dtype=bool)
+        for level, selected in enumerate([years, months, fscales]):
+            if selected:
+                mask &= self.keys.get_level_values(level).isin(selected)
+        return SketchSelection(self, mask)
+
+
+class SketchSelection:
+
+    # Same return shapes as the estimate_* functions of tornados_approx, with no confidence interval
+
+    def __init__(self, cube, mask):
+        self.cube = cube
+        self.mask = mask
+
+    def events(self):
+        return int(self.cube.events[self.mask].sum()), None
+
+    def total(self, name, scale=1):
+        return self.cube.sums[self.mask, SUM_MEASURES.index(name)].sum() / scale, None
+
+    def mean(self, name, scale=1):
+        column = SUM_MEASURES.index(name)
+        count = self.cube.counts[self.mask, column].sum()
+        if count == 0:
+            return np.nan, None
+        return self.cube.sums[self.mask, column].sum() / count / scale, None
+
+    def max(self, name, scale=1):
+        maxima = self.cube.maxima[self.mask, SUM_MEASURES.index(name)]
+        return np.nanmax(maxima) / scale if (~np.isnan(maxima)).any() else np.nan
+
+    def top(self, name, k=3):
+        labels, counts = self.cube.modes[name]
+        counts = pd.Series(counts[self.mask].sum(axis=0), index=labels)
+        # A stable sort keeps ties in label order, as pandas mode() does
+        return counts[counts > 0].sort_values(ascending=False, kind='stable').head(k)
+
+    def mode(self, name):
+        top = self.top(name, 1)
+        return pd.Series(top.index, dtype=object)
+
+    def quantiles(self, name, qs=PERCENTILES, scale=1):
+        cells, keys, counts = self.cube.sketches[name]
+        merged = self.mask[cells]
+        histogram = np.bincount(keys[merged], weights=counts[merged], minlength=KEYSPACE)
+        present = np.flatnonzero(histogram)
+        return _ranked(_bucket_values(present), histogram[present], qs) / scale
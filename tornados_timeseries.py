@@ -0,0 +1,117 @@
+import threading
+import numpy as np
+import pandas as pd
+
+
+# Daily rollups of distinct events with sums and non-null counts of every measure; weekly, monthly and yearly
+# rollups are sums of the daily ones. Appending events adds them to their days and re-rolls only the coarser
+# periods from the first touched one on.
+
+LEVELS = {"Daily": "D", "Weekly": "W", "Monthly": "M", "Yearly": "Y"}
+PERIODS_PER_YEAR = {"D": 365, "W": 52, "M": 12, "Y": 1}
+MEASURES = ['tor_duration_minutes', 'tor_length', 'tor_width', 'path_distance_km', 'path_bearing',
+            'path_mid_lat', 'path_mid_lon', 'damages', 'injuries', 'deaths']
+
+
+def _daily(events):
+    values = pd.DataFrame({'damages': events[['damage_property', 'damage_crops']].sum(axis=1, min_count=1),
+                           'injuries': events['injuries_direct'] + events['injuries_indirect'],
+                           'deaths': events['deaths_direct'] + events['deaths_indirect']}, index=events.index)
+    values = pd.concat([events[MEASURES[:7]].astype(np.float64), values.astype(np.float64)], axis=1)
+    columns = {'events': np.ones(len(events))}
+    for measure in MEASURES:
+        columns[f'{measure}_sum'] = values[measure].fillna(0).to_numpy()
+        columns[f'{measure}_n'] = values[measure].notna().to_numpy(np.float64)
+    day = events['begin_date_time'].dt.floor('D').to_numpy()
+    return pd.DataFrame(columns).groupby(day).sum()
+
+
+def _roll(daily, period):
+    rolled = daily.groupby(daily.index.to_period(period)).sum()
+    rolled.index = rolled.index.to_timestamp()
+    return rolled
+
+
+class RollupStore:
+
+    def __init__(self, df=None):
+        self.lock = threading.Lock()
+        self.version = None
+        self._reset()
+        if df is not None:
+            self.append(df)
+
+    def _reset(self):
+        self.event_ids = pd.Index([])
+        self.levels = {period: None for period in LEVELS.values()}
+
+    def append(self, df):
+        events = df.drop_duplicates('event_id')
+        events = events[~events['event_id'].isin(self.event_ids) & events['begin_date_time'].notna()]
+        if events.empty:
+            return self
+        self.event_ids = self.event_ids.append(pd.Index(events['event_id'].unique()))
+        new = _daily(events)
+        daily = self.levels["D"]
+        if daily is None:
+            daily = new
+        else:
+            days = daily.index.union(new.index)
+            daily = daily.reindex(days, fill_value=0) + new.reindex(days, fill_value=0)
+        # Days without tornados are kept as zeros so windows and lags count calendar periods
+        daily = daily.reindex(pd.date_range(daily.index.min(), daily.index.max(), freq='D'), fill_value=0)
+        self.levels["D"] = daily
+        first_day = new.index.min()
+        for period in ["W", "M", "Y"]:
+            start = first_day.to_period(period).start_time
+            level = self.levels[period]
+            tail = _roll(daily[daily.index >= start], period)
+            self.levels[period] = tail if level is None else pd.concat([level[level.index < start], tail])
+        return self
+
+    def update(self, df, version):
+        # Appends the events not seen yet; when events disappeared the data was replaced and everything is rebuilt
+        with self.lock:
+            if version == self.version:
+                return self
+            known = df['event_id'].drop_duplicates().isin(self.event_ids).sum()
+            if known < len(self.event_ids):
+                self._reset()
+            self.append(df)
+            self.version = version
+            return self
+
+    def series(self, level, measure=None, stat='mean'):
+        rollup = self.levels[LEVELS.get(level, level)]
+        if rollup is None:
+            return pd.Series(dtype=np.float64)
+        if measure is None:
+            return rollup['events']
+        if stat == 'sum':
+            return rollup[f'{measure}_sum']
+        return rollup[f'{measure}_sum'] / rollup[f'{measure}_n'].replace(0, np.nan)
+
+
+def rolling(series, window):
+    return series.rolling(window, min_periods=1).mean()
+
+
+def year_over_year(series, level):
+    previous = series.shift(PERIODS_PER_YEAR[LEVELS.get(level, level)])
+    return pd.DataFrame({'current': series, 'previous': previous, 'change': (series - previous) / previous.replace(0, np.nan) * 100})
+
+
+def seasonal_decomposition(series, level):
+    # Classical additive decomposition: centered moving average trend (2 x period for even periods), seasonal
+    # means of the detrended values per position in the cycle, and the residual
+    period = PERIODS_PER_YEAR[LEVELS.get(level, level)]
+    if period < 2 or series.notna().sum() < 2 * period:
+        raise ValueError("Seasonal decomposition needs at least two years of sub-yearly periods")
+    values = series.interpolate(limit_direction='both')
+    trend = values.rolling(period, center=True).mean()
+    if period % 2 == 0:
+        trend = trend.rolling(2).mean().shift(-1)
+    position = np.arange(len(values)) % period
+    seasonal_means = (values - trend).groupby(position).mean()
+    seasonal = pd.Series((seasonal_means - seasonal_means.mean()).to_numpy()[position], index=values.index)
+    return pd.DataFrame({'observed': series, 'trend': trend, 'seasonal': seasonal, 'residual': values - trend - seasonal})
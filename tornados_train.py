@@ -0,0 +1,261 @@
+import argparse
+import datetime as dt
+import hashlib
+import io
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.compose import ColumnTransformer, TransformedTargetRegressor
+from sklearn.ensemble import HistGradientBoostingClassifier, HistGradientBoostingRegressor
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import check_scoring
+from sklearn.model_selection import KFold, ParameterGrid, StratifiedKFold
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+from tornados_core import DATA_DIR, MODELS, download_tornados, read_tornados
+from tornados_scorer import MODELS_DIR, SCORER_VERSION, export_model
+
+
+# Retrains the six models of the app from the preprocessed dataset. Every (model, parameters, fold) fit is a task
+# of one process pool; the training frame is cached per dataset hash and the fitted preprocessing of every fold
+# is cached on disk (Pipeline memory), so the hyperparameter candidates of a fold share one feature matrix.
+# Artifacts go to <models-dir>/versions/<version>/ with a metadata.json and are then published next to the
+# app's models, compiled to .npz when tornados_scorer supports the pipeline.
+
+TRAIN_VERSION = 2
+CACHE_DIR = os.environ.get("TORNADOS_CACHE_DIR", os.path.join(".cache", "train"))
+
+
+def _onehot(columns):
+    return ('cat', OneHotEncoder(handle_unknown='ignore', sparse_output=False), columns)
+
+
+def _regressor(categorical, memory=None):
+    pipeline = Pipeline([('prep', ColumnTransformer([_onehot(categorical)], remainder='passthrough')),
+                         ('model', HistGradientBoostingRegressor(random_state=0))], memory=memory)
+    return TransformedTargetRegressor(pipeline, func=np.log1p, inverse_func=np.expm1)
+
+
+def build_next_date(memory=None):
+    return HistGradientBoostingRegressor(loss='poisson', random_state=0)
+
+
+def build_damage_property(memory=None):
+    return _regressor(['state'], memory)
+
+
+def build_damage_crops(memory=None):
+    return _regressor(['tor_f_scale'], memory)
+
+
+def build_injuries(memory=None):
+    prep = ColumnTransformer([('text', TfidfVectorizer(min_df=2, sublinear_tf=True), 'event_narrative'),
+                              ('cat', OneHotEncoder(handle_unknown='ignore'), ['tor_f_scale', 'state', 'month_name'])],
+                             remainder='passthrough')
+    return Pipeline([('prep', prep), ('model', LogisticRegression(max_iter=2000, class_weight='balanced'))], memory=memory)
+
+
+def build_death(memory=None):
+    return Pipeline([('prep', ColumnTransformer([_onehot(['month_name'])], remainder='passthrough')),
+                     ('model', HistGradientBoostingClassifier(class_weight='balanced', random_state=0))], memory=memory)
+
+
+boosting_grid = {'learning_rate': [0.05, 0.1], 'max_leaf_nodes': [15, 31], 'l2_regularization': [0.0, 1.0]}
+
+SPECS = {"next_date_model": {"build": build_next_date, "target": 'days_to_next', "task": 'regression',
+                             "scoring": 'neg_mean_absolute_error', "grid": boosting_grid},
+         "damage_property_model": {"build": build_damage_property, "target": 'damage_property', "task": 'regression',
+                                   "scoring": 'neg_mean_absolute_error',
+                                   "grid": {f"regressor__model__{k}": v for k, v in boosting_grid.items()}},
+         "damage_crops_model": {"build": build_damage_crops, "target": 'damage_crops', "task": 'regression',
+                                "scoring": 'neg_mean_absolute_error',
+                                "grid": {f"regressor__model__{k}": v for k, v in boosting_grid.items()}},
+         "injuries_model": {"build": build_injuries, "target": 'any_injury', "task": 'classification',
+                            "scoring": 'roc_auc', "grid": {'model__C': [0.1, 0.3, 1.0, 3.0, 10.0]}},
+         "any_death_model": {"build": build_death, "target": 'any_death', "task": 'classification',
+                             "scoring": 'roc_auc', "grid": {f"model__{k}": v for k, v in boosting_grid.items()}},
+         "indirect_death_model": {"build": build_death, "target": 'any_indirect_death', "task": 'classification',
+                                  "scoring": 'roc_auc', "grid": {f"model__{k}": v for k, v in boosting_grid.items()}}}
+
+
+# <>>>--- FEATURES ---<<<>
+
+def read_source(data_dir):
+    local_path = os.path.join(data_dir, "tornados_usa_xxi.csv")
+    if os.path.exists(local_path):
+        with open(local_path, 'rb') as f:
+            return f.read()
+    return download_tornados().getvalue().encode('utf-8')
+
+
+def training_frame(df):
+    # One row per event (the data repeats events for every fatality), with the columns the UI builds for its inputs
+    df = df.sort_values('begin_date_time').drop_duplicates('event_id').reset_index(drop=True)
+    frame = pd.DataFrame({'state': df['state'].fillna('unknown'),
+                          'month_name': df['month_name'].fillna('unknown'),
+                          'tor_f_scale': df['tor_f_scale'].fillna('unknown'),
+                          'event_narrative': df['event_narrative'].fillna(''),
+                          'event_yearmonth': df['event_yearmonth'],
+                          'tor_length': df['tor_length'],
+                          'tor_width': df['tor_width'],
+                          'tor_duration_minutes': df['tor_duration_minutes'],
+                          # The app and the API send the path length, not the great-circle begin/end distance
+                          'path_distance_km': df['tor_length']})
+    frame['TOR_F_SCALE'] = pd.to_numeric(frame['tor_f_scale'].str[1], errors='coerce').fillna(0).astype(int)
+    frame['TOR_LENGTH'], frame['TOR_WIDTH'] = frame['tor_length'], frame['tor_width']
+    for column in ['tor_length', 'tor_width', 'tor_duration_minutes']:
+        frame[f'log_{column}'] = np.log1p(frame[column].clip(lower=0)).fillna(0)
+    frame['tor_area'] = frame['tor_length'] * frame['tor_width'] * 0.001
+    # Days until the next tornado of the same F-scale, the quantity the Dynamics tab predicts
+    begin = df['begin_date_time']
+    frame['days_to_next'] = (begin.groupby(frame['tor_f_scale']).shift(-1) - begin).dt.total_seconds() / 86400
+    frame['damage_property'] = df['damage_property']
+    frame['damage_crops'] = df['damage_crops']
+    frame['any_injury'] = ((df['injuries_direct'] + df['injuries_indirect']) > 0).astype(int)
+    frame['any_death'] = ((df['deaths_direct'] + df['deaths_indirect']) > 0).astype(int)
+    frame['any_indirect_death'] = (df['deaths_indirect'] > 0).astype(int)
+    return frame
+
+
+def load_training_frame(data_dir, cache_dir):
+    source = read_source(data_dir)
+    data_hash = hashlib.sha1(source).hexdigest()[:16]
+    cache_path = os.path.join(cache_dir, f"features-v{TRAIN_VERSION}-{data_hash}.joblib")
+    if os.path.exists(cache_path):
+        return joblib.load(cache_path), data_hash
+    frame = training_frame(read_tornados(io.BytesIO(source)))
+    os.makedirs(cache_dir, exist_ok=True)
+    joblib.dump(frame, cache_path)
+    return frame, data_hash
+
+
+def model_data(frame, name):
+    target = SPECS[name]["target"]
+    rows = frame[frame[target].notna()]
+    return rows[MODELS[name]["features"]], rows[target].to_numpy()
+
+
+def folds(name, X, y, n_folds, seed):
+    splitter = StratifiedKFold if SPECS[name]["task"] == 'classification' else KFold
+    return list(splitter(n_folds, shuffle=True, random_state=seed).split(X, y))
+
+
+# <>>>--- WORKERS ---<<<>
+
+_frame = None
+_memory = None
+
+
+def _init_worker(frame_path, memory_dir):
+    global _frame, _memory
+    _frame = joblib.load(frame_path)
+    _memory = joblib.Memory(memory_dir, verbose=0)
+
+
+def _fit_fold(name, params, fold, n_folds, seed):
+    start = time.perf_counter()
+    X, y = model_data(_frame, name)
+    train, test = folds(name, X, y, n_folds, seed)[fold]
+    model = SPECS[name]["build"](_memory).set_params(**params)
+    model.fit(X.iloc[train], y[train])
+    score = check_scoring(model, scoring=SPECS[name]["scoring"])(model, X.iloc[test], y[test])
+    return name, params, fold, float(score), time.perf_counter() - start
+
+
+def _fit_final(name, params):
+    start = time.perf_counter()
+    X, y = model_data(_frame, name)
+    model = SPECS[name]["build"]().set_params(**params).fit(X, y)
+    return name, model, len(y), time.perf_counter() - start
+
+
+# <>>>--- TRAINING ---<<<>
+
+def train(names, data_dir=DATA_DIR, models_dir=MODELS_DIR, cache_dir=CACHE_DIR, n_folds=5, jobs=None, seed=0):
+    started = time.perf_counter()
+    frame, data_hash = load_training_frame(data_dir, cache_dir)
+    frame_path = os.path.join(cache_dir, f"features-v{TRAIN_VERSION}-{data_hash}.joblib")
+    print(f"training frame: {len(frame)} events, data {data_hash} ({time.perf_counter() - started:.1f} s)")
+    grids = {name: list(ParameterGrid(SPECS[name]["grid"])) for name in names}
+    scores = {name: np.full((len(grids[name]), n_folds), np.nan) for name in names}
+    with ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(frame_path, os.path.join(cache_dir, "memory"))) as pool:
+        tasks = [pool.submit(_fit_fold, name, params, fold, n_folds, seed)
+                 for name in names for params in grids[name] for fold in range(n_folds)]
+        for task in tasks:
+            name, params, fold, score, _ = task.result()
+            scores[name][grids[name].index(params), fold] = score
+        best = {name: grids[name][int(np.argmax(scores[name].mean(axis=1)))] for name in names}
+        for name in names:
+            print(f"{name}: best {SPECS[name]['scoring']} {scores[name].mean(axis=1).max():.4f} with {best[name]}")
+        finals = [task.result() for task in [pool.submit(_fit_final, name, best[name]) for name in names]]
+    version = dt.datetime.now(dt.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    version_dir = os.path.join(models_dir, "versions", version)
+    os.makedirs(version_dir)
+    metadata = {"version": version, "train_version": TRAIN_VERSION, "data_hash": data_hash, "events": len(frame),
+                "sklearn": sklearn.__version__, "scorer_version": SCORER_VERSION, "folds": n_folds, "seed": seed,
+                "seconds": None, "models": {}}
+    for name, model, n_rows, seconds in finals:
+        joblib.dump(model, os.path.join(version_dir, f"{name}.joblib"))
+        try:
+            export_model(model, os.path.join(version_dir, f"{name}.npz"))
+            compiled = True
+        except ValueError as e:
+            print(f"{name}: not compiled, {e}")
+            compiled = False
+        mean_scores = scores[name].mean(axis=1)
+        metadata["models"][name] = {"features": MODELS[name]["features"], "target": SPECS[name]["target"],
+                                    "rows": n_rows, "params": best[name], "scoring": SPECS[name]["scoring"],
+                                    "cv_score": float(mean_scores.max()),
+                                    "cv_score_std": float(scores[name][int(np.argmax(mean_scores))].std()),
+                                    "candidates": len(grids[name]), "fit_seconds": seconds, "compiled": compiled}
+    metadata["seconds"] = time.perf_counter() - started
+    with open(os.path.join(version_dir, "metadata.json"), "w") as f:
+        json.dump(metadata, f, indent=2)
+    return version_dir, metadata
+
+
+def publish(version_dir, models_dir=MODELS_DIR):
+    # The app prefers <name>.npz over <name>.joblib, so a stale compiled scorer is removed when the new model has none
+    with open(os.path.join(version_dir, "metadata.json"), "r") as f:
+        metadata = json.load(f)
+    for name, model in metadata["models"].items():
+        for extension in ["joblib", "npz"]:
+            source, target = os.path.join(version_dir, f"{name}.{extension}"), os.path.join(models_dir, f"{name}.{extension}")
+            if os.path.exists(source):
+                shutil.copyfile(source, target + ".tmp")
+                os.replace(target + ".tmp", target)
+            elif os.path.exists(target):
+                os.remove(target)
+    shutil.copyfile(os.path.join(version_dir, "metadata.json"), os.path.join(models_dir, "metadata.json"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrain the app's models with cross-validated hyperparameter search")
+    parser.add_argument("models", nargs="*", help=f"model names, all by default: {', '.join(SPECS)}")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes, all cores by default")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-publish", action="store_true", help="only write the versioned artifacts")
+    args = parser.parse_args()
+    unknown = [name for name in args.models if name not in SPECS]
+    if unknown:
+        parser.error(f"unknown models: {', '.join(unknown)}")
+    version_dir, metadata = train(args.models or list(SPECS), args.data_dir, args.models_dir, args.cache_dir,
+                                  args.folds, args.jobs, args.seed)
+    if not args.no_publish:
+        publish(version_dir, args.models_dir)
+    print(f"wrote {version_dir} in {metadata['seconds']:.0f} s{'' if args.no_publish else ', published'}")
+
+
+if __name__ == "__main__":
+    main()